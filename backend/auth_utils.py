@@ -3,25 +3,39 @@ Authentication Utilities
 Password hashing, token generation, user verification
 """
 
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from cache import TTLCache
+from password_hasher import password_hasher
+import os
 import secrets
-
-# Password hashing
-pwd_context = CryptContext(schemes=["argon2"],deprecated="auto")
+import time
 
 # JWT Configuration
 SECRET_KEY = "your-secret-key-change-in-production"  # Change this!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
+# Verified token -> claims; each entry expires with its token's exp
+verified_token_cache = TTLCache(
+    maxsize=int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000)),
+    ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+
 def hash_password(password: str) -> str:
-    """Hash a password"""
-    return pwd_context.hash(password)
+    """Hash a password on the argon2 process pool
+
+    Raises PasswordHasherBusy when the pool's queue is full.
+    """
+    return password_hasher.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    verified, _ = password_hasher.verify_and_update(plain_password, hashed_password)
+    return verified
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple:
+    """(matches, new_hash); new_hash is set when the stored hash's cost is outdated"""
+    return password_hasher.verify_and_update(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """Create JWT access token"""
@@ -38,12 +52,20 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return encoded_jwt
 
 def decode_access_token(token: str):
-    """Decode JWT token"""
+    """Decode JWT token; verified claims are cached until the token expires"""
+    payload = verified_token_cache.get(token)
+    if payload is not None:
+        return payload
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+    
+    # Tokens without exp are verified every time rather than cached
+    if isinstance(payload.get("exp"), (int, float)):
+        verified_token_cache.set(token, payload, ttl=payload["exp"] - time.time())
+    return payload
 
 def generate_session_token() -> str:
     """Generate random session token"""
@@ -0,0 +1,683 @@
+"""
+Performance benchmarks and query-plan checks for the Flight Booking Simulator backend
+Run against a populated database: python benchmarks.py <benchmark> [options]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from database import get_db_connection, get_pool_stats
+
+
+def _report(title, rows):
+    """Print a small results table"""
+    print("=" * 50)
+    print(title)
+    print("=" * 50)
+    for label, value in rows:
+        print(f"{label:<32} {value}")
+    print("=" * 50)
+
+
+# ---------------------------------------------------------------------------
+# Seat map: blocking async handler vs executor offload
+# ---------------------------------------------------------------------------
+
+async def _seatmap_round(handler, flight_id, concurrency, requests):
+    """Issue `requests` seat-map reads with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await handler(flight_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return time.perf_counter() - started
+
+def bench_seatmap(args):
+    """Concurrent GET /flights/{id}/seats throughput before/after offloading"""
+    from routes_seats import fetch_flight_seats, get_flight_seats
+
+    async def blocking_handler(flight_id):
+        # Previous behaviour: synchronous query inside the coroutine
+        return fetch_flight_seats(flight_id)
+
+    async def run():
+        await _seatmap_round(get_flight_seats, args.flight_id, 1, 5)  # warm the pool
+        blocking = await _seatmap_round(blocking_handler, args.flight_id, args.concurrency, args.requests)
+        offloaded = await _seatmap_round(get_flight_seats, args.flight_id, args.concurrency, args.requests)
+        return blocking, offloaded
+
+    blocking, offloaded = asyncio.run(run())
+    _report(f"Seat map reads: {args.requests} requests, concurrency {args.concurrency}", [
+        ("blocking handler (req/s)", round(args.requests / blocking, 1)),
+        ("run_db offload (req/s)", round(args.requests / offloaded, 1)),
+        ("speedup", f"{blocking / offloaded:.2f}x"),
+        ("pool max wait (ms)", get_pool_stats()["max_wait_ms"])
+    ])
+
+
+# ---------------------------------------------------------------------------
+# Query plan regression check: flight search must use idx_route_departure
+# ---------------------------------------------------------------------------
+
+SEARCH_INDEX = "idx_route_departure"
+
+def check_explain_search(args):
+    """EXPLAIN the GET /flights query and fail unless it uses idx_route_departure"""
+    from routes_flights import SEARCH_PAGE_SIZE, build_search_query
+
+    departure_date = date.fromisoformat(args.date) if args.date else date.today() + timedelta(days=7)
+    failures = []
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        for sort_by in ("price", "duration", "departure"):
+            query, params = build_search_query(
+                args.origin, args.destination, departure_date, sort_by, "asc",
+                limit=SEARCH_PAGE_SIZE + 1
+            )
+            cursor.execute("EXPLAIN " + query, params)
+            plan = cursor.fetchall()
+            flights_step = next(step for step in plan if step["table"] == "flights")
+            print(f"sort_by={sort_by:<10} type={flights_step['type']:<6} "
+                  f"key={flights_step['key']} rows={flights_step['rows']}")
+            if flights_step["key"] != SEARCH_INDEX:
+                failures.append(sort_by)
+        cursor.close()
+
+    if failures:
+        print(f"❌ Flight search is not using {SEARCH_INDEX} for: {', '.join(failures)}")
+        sys.exit(1)
+    print(f"✅ Flight search uses {SEARCH_INDEX}")
+
+
+# ---------------------------------------------------------------------------
+# Seat bitmap round trip: claims and releases must stay binary-string bit ops
+# ---------------------------------------------------------------------------
+
+def _stored_occupancy(cursor, flight_id):
+    cursor.execute(
+        "SELECT occupancy FROM flight_seat_maps WHERE flight_id = %s", (flight_id,)
+    )
+    row = cursor.fetchone()
+    return bytes(row[0]) if row else None
+
+def _bitmap_test_seats(seat_map):
+    """Free seats spread so the mask has high bytes, 0xFF-style bytes and bits past 64"""
+    free = [index for index in range(seat_map.total_seats) if seat_map.is_free(index)]
+    return sorted(set(free[:2] + free[-9:]))
+
+def check_seat_bitmap(args):
+    """Claim and release seats on one flight and fail unless the stored bitmap matches"""
+    from seat_allocator import SeatMap, claim_seats, load_seat_map, release_seats
+
+    failures = []
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        conn.start_transaction()
+        try:
+            cursor.execute("SELECT total_seats FROM flights WHERE id = %s FOR UPDATE", (args.flight_id,))
+            total_seats = cursor.fetchone()[0]
+            seat_map = load_seat_map(cursor, args.flight_id, total_seats)
+            before = SeatMap(total_seats, seat_map.occupied)
+            seats = _bitmap_test_seats(seat_map)
+            if not seats:
+                print(f"❌ Flight {args.flight_id} has no free seats to test with")
+                sys.exit(1)
+
+            claim_seats(cursor, args.flight_id, seat_map, seats)
+            claimed = _stored_occupancy(cursor, args.flight_id)
+            print(f"claimed {len(seats)} seats: stored {claimed.hex()}")
+            if claimed != seat_map.to_bytes():
+                failures.append(f"after claim expected {seat_map.to_bytes().hex()}")
+
+            release_seats(cursor, args.flight_id, seat_map, seats)
+            released = _stored_occupancy(cursor, args.flight_id)
+            print(f"released: stored {released.hex()}")
+            if released != before.to_bytes():
+                failures.append(f"after release expected {before.to_bytes().hex()}")
+        finally:
+            conn.rollback()   # leave the flight untouched
+            cursor.close()
+
+    if args.party_size:
+        failures.extend(_group_cancel_round_trip(args.flight_id, args.party_size))
+
+    if failures:
+        print(f"❌ Stored seat bitmap is wrong: {'; '.join(failures)}")
+        sys.exit(1)
+    print(f"✅ Seat bitmap claims and releases round-trip on flight {args.flight_id}")
+
+def _group_cancel_round_trip(flight_id, party_size):
+    """Book a party through the group endpoint, cancel every PNR and compare the bitmap"""
+    import routes_bookings
+    from routes_bookings import GroupBookingCreate
+    from seat_allocator import load_seat_map
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        snapshot = _flight_snapshot(cursor, flight_id)
+        cursor.execute("SELECT total_seats FROM flights WHERE id = %s", (flight_id,))
+        before = snapshot[1] or load_seat_map(cursor, flight_id, cursor.fetchone()[0]).to_bytes()
+        cursor.close()
+
+    simulate_payment = routes_bookings.simulate_payment
+    routes_bookings.simulate_payment = lambda method: (True, "BENCHSEATBITMAP")
+    pnrs = []
+    try:
+        group = GroupBookingCreate(
+            flight_id=flight_id,
+            passengers=[_bench_passenger(n) for n in range(party_size)],
+            payment_method="upi"
+        )
+        pnrs = routes_bookings.create_group_booking(group)["pnrs"]
+        for pnr in pnrs:
+            routes_bookings.cancel_booking(pnr)
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            after = _stored_occupancy(cursor, flight_id)
+            cursor.close()
+    finally:
+        routes_bookings.simulate_payment = simulate_payment
+        _restore_flight(flight_id, snapshot, pnrs)
+
+    print(f"group of {party_size} booked and cancelled: stored {after.hex()}")
+    if after != before:
+        return [f"after group cancel expected {before.hex()}"]
+    return []
+
+
+# ---------------------------------------------------------------------------
+# Seat assignment: flight-row lock hold time, booking scan vs seat bitmap
+# ---------------------------------------------------------------------------
+
+def _legacy_seat_scan(cursor, flight_id):
+    """Seat assignment as create_booking did it before seat_allocator"""
+    cursor.execute(
+        """
+        SELECT total_seats,
+               (SELECT COUNT(*) FROM bookings WHERE flight_id = %s AND status != 'cancelled') as booked
+        FROM flights WHERE id = %s
+        """,
+        (flight_id, flight_id)
+    )
+    total_seats, _ = cursor.fetchone()
+    cursor.execute(
+        "SELECT seat_number FROM bookings WHERE flight_id = %s AND status != 'cancelled'",
+        (flight_id,)
+    )
+    booked_seats = {row[0] for row in cursor.fetchall() if row[0]}
+    for seat_num in range(1, total_seats + 1):
+        seat = f"{(seat_num - 1) // 6 + 1}{'ABCDEF'[(seat_num - 1) % 6]}"
+        if seat not in booked_seats:
+            return seat
+    return None
+
+def _bitmap_assign(cursor, flight_id, total_seats):
+    from seat_allocator import load_seat_map, claim_seats
+
+    seat_map = load_seat_map(cursor, flight_id, total_seats)
+    seat = seat_map.first_free('window')
+    claim_seats(cursor, flight_id, seat_map, [] if seat is None else [seat])
+    return seat
+
+def _lock_hold_times(conn, flight_id, iterations, assign):
+    """Milliseconds between taking the flight row lock and releasing it"""
+    cursor = conn.cursor()
+    samples = []
+    for _ in range(iterations):
+        conn.start_transaction()
+        cursor.execute(
+            "SELECT total_seats FROM flights WHERE id = %s FOR UPDATE", (flight_id,)
+        )
+        total_seats = cursor.fetchone()[0]
+        started = time.perf_counter()
+        assign(cursor, flight_id, total_seats)
+        conn.rollback()   # leave the flight untouched
+        samples.append((time.perf_counter() - started) * 1000)
+    cursor.close()
+    return samples
+
+def bench_seat_lock(args):
+    """Lock hold time of seat assignment on one (ideally full) flight"""
+    from seat_allocator import SeatMap, seat_label
+
+    with get_db_connection() as conn:
+        legacy = _lock_hold_times(
+            conn, args.flight_id, args.iterations,
+            lambda cursor, flight_id, _: _legacy_seat_scan(cursor, flight_id)
+        )
+        bitmap = _lock_hold_times(conn, args.flight_id, args.iterations, _bitmap_assign)
+
+    # CPU-only comparison on a full 189-seat aircraft, independent of the database
+    labels = {seat_label(index) for index in range(189)}
+    seat_map = SeatMap.from_labels(189, labels)
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        next((seat_label(i) for i in range(189) if seat_label(i) not in labels), None)
+    scan_us = (time.perf_counter() - started) / args.iterations * 1e6
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        seat_map.first_free('window')
+    bitmap_us = (time.perf_counter() - started) / args.iterations * 1e6
+
+    def percentile(samples, q):
+        return round(statistics.quantiles(samples, n=100)[q - 1], 3)
+
+    _report(f"Seat assignment lock hold: flight {args.flight_id}, {args.iterations} runs", [
+        ("booking scan p50 (ms)", percentile(legacy, 50)),
+        ("booking scan p95 (ms)", percentile(legacy, 95)),
+        ("seat bitmap p50 (ms)", percentile(bitmap, 50)),
+        ("seat bitmap p95 (ms)", percentile(bitmap, 95)),
+        ("full 189-seat scan, CPU (us)", round(scan_us, 2)),
+        ("full 189-seat bitmap, CPU (us)", round(bitmap_us, 2))
+    ])
+
+
+# ---------------------------------------------------------------------------
+# Booking contention: FOR UPDATE path vs optimistic decrement on one flight
+# ---------------------------------------------------------------------------
+
+def _flight_snapshot(cursor, flight_id):
+    cursor.execute(
+        "SELECT available_seats, current_price FROM flights WHERE id = %s", (flight_id,)
+    )
+    flight = cursor.fetchone()
+    cursor.execute(
+        "SELECT occupancy FROM flight_seat_maps WHERE flight_id = %s", (flight_id,)
+    )
+    seat_map = cursor.fetchone()
+    return flight, seat_map[0] if seat_map else None
+
+def _restore_flight(flight_id, snapshot, pnrs):
+    """Delete the benchmark's bookings and put the flight back as it was"""
+    (available_seats, current_price), occupancy = snapshot
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        pnrs = list(pnrs)
+        for start in range(0, len(pnrs), 500):
+            chunk = pnrs[start:start + 500]
+            cursor.execute(
+                f"DELETE FROM bookings WHERE pnr IN ({', '.join(['%s'] * len(chunk))})", chunk
+            )
+        cursor.execute(
+            "UPDATE flights SET available_seats = %s, current_price = %s WHERE id = %s",
+            (available_seats, current_price, flight_id)
+        )
+        if occupancy is None:
+            cursor.execute("DELETE FROM flight_seat_maps WHERE flight_id = %s", (flight_id,))
+        else:
+            cursor.execute(
+                "UPDATE flight_seat_maps SET occupancy = _binary %s WHERE flight_id = %s",
+                (occupancy, flight_id)
+            )
+        cursor.close()
+
+def _contention_round(create, flight_id, bookers):
+    """Start `bookers` threads at once against one flight"""
+    from fastapi import HTTPException
+    from routes_bookings import BookingCreate
+
+    start = threading.Barrier(bookers)
+
+    def book(n):
+        booking = BookingCreate(
+            flight_id=flight_id,
+            passenger={
+                "first_name": "Bench", "last_name": f"User{n}",
+                "email": f"bench{n}@example.com", "phone": "9000000000",
+                "age": 30, "gender": "other"
+            },
+            payment_method="upi"
+        )
+        start.wait()
+        began = time.perf_counter()
+        try:
+            result = create(booking)
+            outcome, pnr = 201, result["booking"]["pnr"]
+        except HTTPException as err:
+            outcome, pnr = err.status_code, None
+        return outcome, pnr, (time.perf_counter() - began) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=bookers) as executor:
+        results = list(executor.map(book, range(bookers)))
+    return time.perf_counter() - started, results
+
+def bench_booking_contention(args):
+    """Concurrent bookers on one flight: FOR UPDATE vs optimistic decrement"""
+    import routes_bookings
+
+    # Model a payment gateway round trip, which the locked path holds the row lock across
+    simulate_payment = routes_bookings.simulate_payment
+    def slow_payment(method):
+        time.sleep(args.payment_latency_ms / 1000)
+        return simulate_payment(method)
+    routes_bookings.simulate_payment = slow_payment
+
+    modes = [
+        ("for update", routes_bookings.create_booking_sync),
+        ("optimistic", routes_bookings.create_booking_optimistic)
+    ]
+    rows = []
+    try:
+        for label, create in modes:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                snapshot = _flight_snapshot(cursor, args.flight_id)
+                cursor.close()
+
+            elapsed, results = _contention_round(create, args.flight_id, args.bookers)
+            pnrs = [pnr for _, pnr, _ in results if pnr]
+
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                (available_after, _), _ = _flight_snapshot(cursor, args.flight_id)
+                cursor.close()
+            _restore_flight(args.flight_id, snapshot, pnrs)
+
+            latencies = [ms for _, _, ms in results]
+            outcomes = Counter(status for status, _, _ in results)
+            oversold = snapshot[0][0] - available_after != len(pnrs)
+            rows.extend([
+                (f"{label}: bookings/s", round(len(pnrs) / elapsed, 1)),
+                (f"{label}: p50 latency (ms)", round(statistics.median(latencies), 1)),
+                (f"{label}: p95 latency (ms)", round(statistics.quantiles(latencies, n=20)[18], 1)),
+                (f"{label}: outcomes", dict(sorted(outcomes.items()))),
+                (f"{label}: inventory consistent", not oversold)
+            ])
+    finally:
+        routes_bookings.simulate_payment = simulate_payment
+
+    _report(f"Booking contention: {args.bookers} bookers on flight {args.flight_id}, "
+            f"{args.payment_latency_ms}ms payment", rows + [
+        ("pool max wait (ms)", get_pool_stats()["max_wait_ms"])
+    ])
+
+
+# ---------------------------------------------------------------------------
+# Group booking: one request per party vs one request per passenger
+# ---------------------------------------------------------------------------
+
+def _bench_passenger(n):
+    return {
+        "first_name": "Bench", "last_name": f"Traveller{n}",
+        "email": f"bench{n}@example.com", "phone": "9000000000",
+        "age": 30, "gender": "other"
+    }
+
+def bench_group_booking(args):
+    """Throughput of POST /bookings/group vs sequential single bookings"""
+    import routes_bookings
+    from fastapi import HTTPException
+    from routes_bookings import BookingCreate, GroupBookingCreate
+
+    simulate_payment = routes_bookings.simulate_payment
+    def slow_payment(method):
+        time.sleep(args.payment_latency_ms / 1000)
+        return simulate_payment(method)
+    routes_bookings.simulate_payment = slow_payment
+
+    def sequential(party, pnrs):
+        for n in party:
+            booking = BookingCreate(
+                flight_id=args.flight_id, passenger=_bench_passenger(n), payment_method="upi"
+            )
+            pnrs.append(routes_bookings.create_booking_sync(booking)["booking"]["pnr"])
+
+    def grouped(party, pnrs):
+        group = GroupBookingCreate(
+            flight_id=args.flight_id,
+            passengers=[_bench_passenger(n) for n in party],
+            payment_method="upi"
+        )
+        pnrs.extend(routes_bookings.create_group_booking(group)["pnrs"])
+
+    rows = []
+    try:
+        for label, book in (("sequential singles", sequential), ("group endpoint", grouped)):
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                snapshot = _flight_snapshot(cursor, args.flight_id)
+                cursor.close()
+
+            pnrs, failures = [], 0
+            started = time.perf_counter()
+            for group_index in range(args.groups):
+                party = range(group_index * args.party_size, (group_index + 1) * args.party_size)
+                try:
+                    book(party, pnrs)
+                except HTTPException:
+                    failures += 1
+            elapsed = time.perf_counter() - started
+            _restore_flight(args.flight_id, snapshot, pnrs)
+
+            rows.extend([
+                (f"{label}: passengers/s", round(len(pnrs) / elapsed, 1)),
+                (f"{label}: ms per party", round(elapsed / args.groups * 1000, 1)),
+                (f"{label}: failed parties", failures)
+            ])
+    finally:
+        routes_bookings.simulate_payment = simulate_payment
+
+    _report(f"Group booking: {args.groups} parties of {args.party_size} on flight "
+            f"{args.flight_id}, {args.payment_latency_ms}ms payment", rows)
+
+
+# ---------------------------------------------------------------------------
+# Response encoding: dict rows + jsonable_encoder vs tuple rows + orjson
+# ---------------------------------------------------------------------------
+
+FLIGHT_ROW_COLUMNS = (
+    "id", "flight_number", "airline", "origin", "destination",
+    "departure_time", "arrival_time", "base_price", "current_price",
+    "total_seats", "available_seats", "created_at", "duration_minutes"
+)
+
+def _flight_rows(count):
+    """Tuple rows shaped like the GET /flights query result"""
+    departure = datetime(2025, 12, 25, 6, 0)
+    return [
+        (
+            i, f"AI{1000 + i % 9000}", "Air India", "BLR", "DEL",
+            departure + timedelta(minutes=i), departure + timedelta(minutes=i + 165),
+            Decimal("4500.00"), Decimal(f"{4500 + i % 700}.50"),
+            180, 180 - i % 180, departure - timedelta(days=30), 165
+        )
+        for i in range(count)
+    ]
+
+def _encode_cost(encode, rows, repeat):
+    """Best-of-`repeat` seconds for one encode of the whole response"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode(rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def bench_encode(args):
+    """Per-row JSON encode cost of a large list response (no database needed)"""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from fast_json import FastJSONResponse, rows_as_dicts
+
+    rows = _flight_rows(args.rows)
+    dict_rows = [dict(zip(FLIGHT_ROW_COLUMNS, row)) for row in rows]
+
+    def default_path(_):
+        # What a route returning a dict of dict-cursor rows costs: FastAPI
+        # runs jsonable_encoder, then JSONResponse calls json.dumps
+        return JSONResponse(jsonable_encoder({"flights": dict_rows})).body
+
+    def fast_path(tuple_rows):
+        return FastJSONResponse({"flights": rows_as_dicts(FLIGHT_ROW_COLUMNS, tuple_rows)}).body
+
+    if default_path(rows) != fast_path(rows):
+        print("❌ Fast encoding does not match FastAPI's output")
+        sys.exit(1)
+
+    default = _encode_cost(default_path, rows, args.repeat)
+    fast = _encode_cost(fast_path, rows, args.repeat)
+    size = len(fast_path(rows))
+    _report(f"Response encoding: {args.rows} flight rows, best of {args.repeat}", [
+        ("jsonable_encoder + json (µs/row)", round(default / args.rows * 1e6, 2)),
+        ("tuple rows + orjson (µs/row)", round(fast / args.rows * 1e6, 2)),
+        ("jsonable_encoder + json (ms)", round(default * 1000, 1)),
+        ("tuple rows + orjson (ms)", round(fast * 1000, 1)),
+        ("response size (KB)", round(size / 1024, 1)),
+        ("speedup", f"{default / fast:.1f}x")
+    ])
+
+
+# ---------------------------------------------------------------------------
+# Login throughput: argon2 in request threads vs the bounded process pool
+# ---------------------------------------------------------------------------
+
+def _login_round(verify, password, hashed, concurrency, logins):
+    """Run `logins` verifications from `concurrency` threads; (seconds, latencies, rejected)"""
+    from password_hasher import PasswordHasherBusy
+
+    latencies = []
+    rejected = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal rejected
+        started = time.perf_counter()
+        try:
+            verify(password, hashed)
+        except PasswordHasherBusy:
+            with lock:
+                rejected += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(logins)))
+    return time.perf_counter() - started, latencies, rejected
+
+def bench_login(args):
+    """Password verification throughput for concurrent logins (no database needed)"""
+    from password_hasher import ARGON2_CONFIG, PasswordHasher, pwd_context
+
+    password = "benchmark-password"
+    hashed = pwd_context.hash(password)
+    hasher = PasswordHasher(workers=args.workers, max_queue=args.max_queue)
+    hasher.start()
+    hasher.verify_and_update(password, hashed)   # wait for the workers to be up
+
+    rows = []
+    try:
+        for label, verify in (("request threads", pwd_context.verify_and_update),
+                              ("process pool", hasher.verify_and_update)):
+            elapsed, latencies, rejected = _login_round(
+                verify, password, hashed, args.concurrency, args.logins
+            )
+            completed = len(latencies)
+            p95 = sorted(latencies)[int(completed * 0.95) - 1] if completed else 0.0
+            rows.extend([
+                (f"{label} (logins/s)", round(completed / elapsed, 1)),
+                (f"{label} p95 (ms)", round(p95 * 1000, 1)),
+                (f"{label} rejected (503)", rejected)
+            ])
+    finally:
+        hasher.close()
+
+    _report(f"Login verification: {args.logins} logins, concurrency {args.concurrency}, "
+            f"{args.workers} workers, argon2 t={ARGON2_CONFIG['time_cost']} "
+            f"m={ARGON2_CONFIG['memory_cost']}", rows)
+
+
+BENCHMARKS = {
+    "seatmap": bench_seatmap,
+    "explain-search": check_explain_search,
+    "seat-bitmap": check_seat_bitmap,
+    "seat-lock": bench_seat_lock,
+    "booking-contention": bench_booking_contention,
+    "group-booking": bench_group_booking,
+    "encode": bench_encode,
+    "login": bench_login,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend performance benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    seatmap = subparsers.add_parser("seatmap", help=bench_seatmap.__doc__)
+    seatmap.add_argument("--flight-id", type=int, required=True)
+    seatmap.add_argument("--concurrency", type=int, default=20)
+    seatmap.add_argument("--requests", type=int, default=500)
+
+    explain = subparsers.add_parser("explain-search", help=check_explain_search.__doc__)
+    explain.add_argument("--origin", default="BLR")
+    explain.add_argument("--destination", default="DEL")
+    explain.add_argument("--date", help="YYYY-MM-DD (default: a week from today)")
+
+    seat_bitmap = subparsers.add_parser(
+        "seat-bitmap", help=check_seat_bitmap.__doc__,
+        description="Runs in a transaction that is rolled back; the flight needs free seats. "
+                    "With --party-size, a group booking is also made and cancelled, then "
+                    "its bookings deleted and the flight restored."
+    )
+    seat_bitmap.add_argument("--flight-id", type=int, required=True)
+    seat_bitmap.add_argument("--party-size", type=int, default=0)
+
+    seat_lock = subparsers.add_parser(
+        "seat-lock", help=bench_seat_lock.__doc__,
+        description="Use a full flight, e.g. one generated with "
+                    "synthetic_data.py --load-factor 1.0, to measure the worst case."
+    )
+    seat_lock.add_argument("--flight-id", type=int, required=True)
+    seat_lock.add_argument("--iterations", type=int, default=200)
+
+    contention = subparsers.add_parser(
+        "booking-contention", help=bench_booking_contention.__doc__,
+        description="Bookings made by the benchmark are deleted and the flight's "
+                    "seat count, price and seat map restored after each round."
+    )
+    contention.add_argument("--flight-id", type=int, required=True)
+    contention.add_argument("--bookers", type=int, default=200)
+    contention.add_argument("--payment-latency-ms", type=float, default=50)
+
+    group = subparsers.add_parser(
+        "group-booking", help=bench_group_booking.__doc__,
+        description="Bookings made by the benchmark are deleted and the flight "
+                    "restored after each round; the flight needs groups * party-size free seats."
+    )
+    group.add_argument("--flight-id", type=int, required=True)
+    group.add_argument("--groups", type=int, default=20)
+    group.add_argument("--party-size", type=int, default=5)
+    group.add_argument("--payment-latency-ms", type=float, default=50)
+
+    encode = subparsers.add_parser("encode", help=bench_encode.__doc__)
+    encode.add_argument("--rows", type=int, default=10000)
+    encode.add_argument("--repeat", type=int, default=5)
+
+    login = subparsers.add_parser(
+        "login", help=bench_login.__doc__,
+        description="Concurrency above workers + max-queue shows fast 503 rejection."
+    )
+    login.add_argument("--logins", type=int, default=200)
+    login.add_argument("--concurrency", type=int, default=16)
+    login.add_argument("--workers", type=int, default=4)
+    login.add_argument("--max-queue", type=int, default=32)
+
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+In-memory caching
+Bounded TTL/LRU cache with single-flight loading and tag invalidation,
+plus the flight search result cache built on it
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+
+class _Flight:
+    """A load in progress that concurrent callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        # Invalidations seen while loading; the result is not stored if they
+        # cover its key or any of its tags
+        self.stale = False
+        self.invalidated_tags = set()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a TTL
+
+    Entries can carry tags; invalidate_tags() drops every entry carrying
+    any of the given tags. get_or_load() coalesces concurrent misses for
+    the same key into a single call of the loader.
+    """
+
+    def __init__(self, maxsize=1024, ttl=30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._entries = OrderedDict()   # key -> (value, expires_at, tags)
+        self._tag_index = {}            # tag -> set of keys
+        self._loading = {}              # key -> _Flight
+        self._lock = threading.Lock()
+
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    def _lookup(self, key, now):
+        """Return the live entry value or raise KeyError; caller holds the lock"""
+        value, expires_at, tags = self._entries[key]
+        if expires_at <= now:
+            self._remove(key)
+            self._stats["expirations"] += 1
+            raise KeyError(key)
+        self._entries.move_to_end(key)
+        return value
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def _store(self, key, value, ttl, tags):
+        if key in self._entries:
+            self._remove(key)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        tags = tuple(tags)
+        self._entries[key] = (value, expires_at, tags)
+        for tag in tags:
+            self._tag_index.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    def get(self, key, default=None):
+        """Return a cached value, or `default` when missing or expired"""
+        with self._lock:
+            try:
+                value = self._lookup(key, time.monotonic())
+            except KeyError:
+                self._stats["misses"] += 1
+                return default
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key, value, ttl=None, tags=()):
+        """Store a value; `ttl` overrides the cache default for this entry"""
+        if ttl is not None and ttl <= 0:
+            return
+        with self._lock:
+            self._store(key, value, ttl, tags)
+
+    def get_or_load(self, key, loader, ttl=None, tags=None):
+        """Return the cached value or call `loader()` once for all concurrent misses
+
+        `tags` may be a callable receiving the loaded value, so tags can be
+        derived from the result (e.g. the flight ids a search returned).
+        """
+        with self._lock:
+            try:
+                value = self._lookup(key, time.monotonic())
+                self._stats["hits"] += 1
+                return value
+            except KeyError:
+                pass
+
+            flight = self._loading.get(key)
+            if flight is not None:
+                self._stats["coalesced"] += 1
+                owner = False
+            else:
+                self._stats["misses"] += 1
+                flight = self._loading[key] = _Flight()
+                owner = True
+
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            entry_tags = tuple(tags(flight.value) if callable(tags) else (tags or ()))
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            try:
+                with self._lock:
+                    del self._loading[key]
+                    # Skip storing if this key or one of its tags was invalidated while loading
+                    if (flight.error is None and not flight.stale
+                            and flight.invalidated_tags.isdisjoint(entry_tags)):
+                        self._store(key, flight.value, ttl, entry_tags)
+            finally:
+                flight.done.set()
+
+        return flight.value
+
+    def invalidate(self, key):
+        """Drop one key"""
+        with self._lock:
+            flight = self._loading.get(key)
+            if flight is not None:
+                flight.stale = True
+            if key in self._entries:
+                self._remove(key)
+                self._stats["invalidations"] += 1
+
+    def invalidate_tags(self, tags):
+        """Drop every entry carrying any of `tags`; returns the number dropped"""
+        dropped = 0
+        tags = list(tags)
+        with self._lock:
+            for flight in self._loading.values():
+                flight.invalidated_tags.update(tags)
+            for tag in tags:
+                for key in list(self._tag_index.get(tag, ())):
+                    self._remove(key)
+                    dropped += 1
+            self._stats["invalidations"] += dropped
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            for flight in self._loading.values():
+                flight.stale = True
+            self._entries.clear()
+            self._tag_index.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"] + self._stats["coalesced"]
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                **self._stats
+            }
+
+
+# ---------------------------------------------------------------------------
+# Flight search result cache (GET /flights)
+# ---------------------------------------------------------------------------
+
+flight_search_cache = TTLCache(
+    maxsize=int(os.getenv('SEARCH_CACHE_SIZE', 2048)),
+    ttl=float(os.getenv('SEARCH_CACHE_TTL_SECONDS', 30))
+)
+
+def search_cache_key(origin, destination, departure_date, sort_by, order,
+                     cursor=None, limit=None):
+    """Normalized key for one page of a flight search"""
+    return (
+        origin.upper() if origin else None,
+        destination.upper() if destination else None,
+        departure_date.isoformat() if departure_date else None,
+        sort_by,
+        order,
+        cursor,
+        limit
+    )
+
+def _route_tag(origin, destination, departure_date):
+    return f"route:{origin or '*'}:{destination or '*'}:{departure_date or '*'}"
+
+def search_tags(key, result):
+    """Tags for a cached search: its filter combination plus every returned flight"""
+    origin, destination, departure_date = key[:3]
+    tags = [_route_tag(origin, destination, departure_date)]
+    tags.extend(f"flight:{flight['id']}" for flight in result["flights"])
+    return tags
+
+def invalidate_flight_searches(flight_ids):
+    """Drop cached searches containing any of these flights (price/seat change)"""
+    return flight_search_cache.invalidate_tags(f"flight:{flight_id}" for flight_id in flight_ids)
+
+def invalidate_route_searches(origin, destination, departure_date):
+    """Drop cached searches a new or moved flight on this route/date would appear in"""
+    origin = origin.upper() if origin else None
+    destination = destination.upper() if destination else None
+    if isinstance(departure_date, datetime):
+        departure_date = departure_date.date()
+    if departure_date and not isinstance(departure_date, str):
+        departure_date = departure_date.isoformat()   # 'YYYY-MM-DD' strings pass through
+    tags = [
+        _route_tag(o, d, day)
+        for o in {origin, None}
+        for d in {destination, None}
+        for day in {departure_date, None}
+    ]
+    return flight_search_cache.invalidate_tags(tags)
@@ -1,12 +1,22 @@
 """
 Database connection configuration
+Pooled MySQL connections shared by all route handlers
 """
 
 import mysql.connector
 from mysql.connector import Error
 import os
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from metrics import record_db_time
+
 # Load environment variables
 load_dotenv()
 
@@ -20,29 +30,330 @@ DB_CONFIG = {
     'autocommit': True
 }
 
-def get_db_connection():
-    """Create and return a database connection"""
-    try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        if connection.is_connected():
-            return connection
+# Connection pool configuration
+DB_POOL_CONFIG = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),          # connections kept open
+    'max_overflow': int(os.getenv('DB_POOL_MAX_OVERFLOW', 10)),  # extra connections under load
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),       # seconds to wait for a checkout
+    'recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),       # reconnect connections older than this
+    'ping_after': float(os.getenv('DB_POOL_PING_AFTER', 5))   # ping connections idle longer than this
+}
+
+# Threads available to async handlers for blocking database work; defaults to
+# the pool capacity so an offloaded call never queues on a connection checkout
+DB_EXECUTOR_WORKERS = int(os.getenv(
+    'DB_EXECUTOR_WORKERS',
+    DB_POOL_CONFIG['pool_size'] + DB_POOL_CONFIG['max_overflow']
+))
+
+
+class PoolTimeoutError(Error):
+    """Raised when no pooled connection becomes free within the checkout timeout"""
+
+
+class PooledConnection:
+    """Proxy around a MySQL connection that returns it to the pool on close()"""
+
+    _own_attributes = ('_pool', '_raw', '_created_at', '_checked_out_at')
+
+    def __init__(self, pool, raw, created_at, checked_out_at=None):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_raw', raw)
+        object.__setattr__(self, '_created_at', created_at)
+        if checked_out_at is None:
+            checked_out_at = time.monotonic()
+        object.__setattr__(self, '_checked_out_at', checked_out_at)
+
+    def __getattr__(self, name):
+        raw = object.__getattribute__(self, '_raw')
+        if raw is None:
+            raise Error("Connection has already been returned to the pool")
+        return getattr(raw, name)
+
+    def __setattr__(self, name, value):
+        if name in self._own_attributes:
+            object.__setattr__(self, name, value)
+        elif self._raw is None:
+            raise Error("Connection has already been returned to the pool")
         else:
+            setattr(self._raw, name, value)
+
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)"""
+        raw = self._raw
+        if raw is not None:
+            object.__setattr__(self, '_raw', None)
+            self._pool._release(raw, self._created_at)
+            # Checkout wait plus hold time counts towards the request's DB time
+            record_db_time(time.monotonic() - self._checked_out_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __del__(self):
+        # Safety net for handlers that forget to close on an error path
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Thread-safe pool of MySQL connections with overflow, recycling and stats"""
+
+    def __init__(self, db_config, pool_size=10, max_overflow=10, timeout=30.0,
+                 recycle=1800, ping_after=5.0):
+        self.db_config = db_config
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+
+        self._idle = deque()          # (connection, created_at, returned_at)
+        self._cond = threading.Condition()
+        self._open = 0                # connections open or being opened
+        self._in_use = 0
+        self._waiting = 0
+
+        self._stats = {
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "connections_created": 0,
+            "connections_recycled": 0,
+            "connections_discarded": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0
+        }
+
+    def _connect(self):
+        connection = mysql.connector.connect(**self.db_config)
+        if not connection.is_connected():
             raise Error("Failed to connect to database")
-    except Error as e: #cathes only mysql error 
+        with self._cond:
+            self._stats["connections_created"] += 1
+        return connection
+
+    def _is_usable(self, connection, created_at, returned_at):
+        """Health check applied when a connection is borrowed"""
+        now = time.monotonic()
+        if self.recycle and now - created_at > self.recycle:
+            reason = "connections_recycled"
+        elif now - returned_at > self.ping_after:
+            try:
+                connection.ping(reconnect=False)
+                return True
+            except Error:
+                reason = "connections_discarded"
+        else:
+            return True
+
+        with self._cond:
+            self._stats[reason] += 1
+        return False
+
+    def checkout(self):
+        """Borrow a connection, waiting up to the configured timeout"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        reused = None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    reused = self._idle.pop()
+                    break
+                if self._open < self.pool_size + self.max_overflow:
+                    self._open += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["checkout_failures"] += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.timeout}s waiting for a database connection"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            self._in_use += 1
+
+        connection = None
+        created_at = None
+        if reused:
+            connection, created_at, returned_at = reused
+            if not self._is_usable(connection, created_at, returned_at):
+                self._close_quietly(connection)
+                connection = None
+
+        if connection is None:
+            try:
+                connection = self._connect()
+                created_at = time.monotonic()
+            except Error:
+                with self._cond:
+                    self._open -= 1
+                    self._in_use -= 1
+                    self._stats["checkout_failures"] += 1
+                    self._cond.notify()
+                raise
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._stats["checkouts"] += 1
+            self._stats["total_wait_seconds"] += waited
+            self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+
+        return PooledConnection(self, connection, created_at, started)
+
+    def _release(self, connection, created_at):
+        """Reset a returned connection and put it back on the idle stack"""
+        healthy = True
+        try:
+            if connection.unread_result:
+                connection.consume_results()
+            if connection.in_transaction:
+                connection.rollback()
+            if not connection.autocommit:
+                connection.autocommit = self.db_config.get('autocommit', True)
+        except Error:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy and len(self._idle) < self.pool_size:
+                self._idle.append((connection, created_at, time.monotonic()))
+                connection = None
+            else:
+                self._open -= 1
+                if not healthy:
+                    self._stats["connections_discarded"] += 1
+            self._cond.notify()
+
+        if connection is not None:
+            self._close_quietly(connection)
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def stats(self):
+        """Snapshot of pool usage"""
+        with self._cond:
+            checkouts = self._stats["checkouts"]
+            return {
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": checkouts,
+                "checkout_failures": self._stats["checkout_failures"],
+                "connections_created": self._stats["connections_created"],
+                "connections_recycled": self._stats["connections_recycled"],
+                "connections_discarded": self._stats["connections_discarded"],
+                "avg_wait_ms": round(self._stats["total_wait_seconds"] / checkouts * 1000, 3) if checkouts else 0.0,
+                "max_wait_ms": round(self._stats["max_wait_seconds"] * 1000, 3)
+            }
+
+    def close_all(self):
+        """Close every idle connection (used at shutdown)"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for connection, _, _ in idle:
+            self._close_quietly(connection)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_CONFIG, **DB_POOL_CONFIG)
+    return _pool
+
+def get_db_connection():
+    """Borrow a pooled database connection
+
+    The returned connection is a context manager; closing it (or leaving the
+    ``with`` block) returns it to the pool instead of dropping the socket.
+    """
+    try:
+        return get_pool().checkout()
+    except Error as e: #cathes only mysql error
         print(f"Error connecting to MySQL database: {e}")
         raise
 
+def get_pool_stats():
+    """Return connection pool statistics"""
+    return get_pool().stats()
+
+def close_pool():
+    """Close idle pooled connections"""
+    if _pool is not None:
+        _pool.close_all()
+
+
+_db_executor = None
+_db_executor_lock = threading.Lock()
+
+def get_db_executor():
+    """Return the bounded thread pool used to offload blocking DB calls"""
+    global _db_executor
+    if _db_executor is None:
+        with _db_executor_lock:
+            if _db_executor is None:
+                _db_executor = ThreadPoolExecutor(
+                    max_workers=DB_EXECUTOR_WORKERS,
+                    thread_name_prefix="db-worker"
+                )
+    return _db_executor
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database function without stalling the event loop
+
+    Async route handlers must use this for every mysql.connector call; the
+    call runs on the shared DB executor with the caller's context variables.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_db_executor(), call)
+
+def shutdown_db_executor():
+    """Stop the DB executor, waiting for in-flight calls"""
+    global _db_executor
+    if _db_executor is not None:
+        _db_executor.shutdown(wait=True)
+        _db_executor = None
+
 def test_connection():
     """Test database connection"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT VERSION()")
-        version = cursor.fetchone()
-        print(f"✅ Successfully connected to MySQL database")
-        print(f"Database version: {version[0]}")
-        cursor.close()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT VERSION()")
+            version = cursor.fetchone()
+            print(f"✅ Successfully connected to MySQL database")
+            print(f"Database version: {version[0]}")
+            cursor.close()
         return True
     except Error as e:
         print(f"❌ Database connection failed: {e}")
@@ -52,4 +363,4 @@ if __name__ == "__main__":
     print("Testing database connection...")
     print("="*50)
     test_connection()
-    print("="*50)
\ No newline at end of file
+    print("="*50)
@@ -0,0 +1,42 @@
+"""
+Fast JSON Responses
+Large list endpoints fetch tuple rows and encode them with orjson, instead
+of a dict-per-row cursor followed by FastAPI's jsonable_encoder walking
+every Decimal and datetime again before json.dumps
+"""
+
+from decimal import Decimal
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def encode_default(value):
+    """Types orjson does not encode natively (Decimal -> float, as FastAPI does)"""
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content):
+    """JSON bytes; datetimes and dates come out as ISO 8601 like FastAPI's encoder"""
+    return orjson.dumps(content, default=encode_default)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson
+
+    Return it directly from a route (not a plain dict) so FastAPI does not
+    run jsonable_encoder over the content first.
+    """
+
+    def render(self, content):
+        return dumps(content)
+
+
+def row_layout(cursor):
+    """Column names of a tuple cursor's current result, read once per query"""
+    return tuple(cursor.column_names)
+
+def rows_as_dicts(columns, rows):
+    """Tuple rows -> JSON objects keyed by a precomputed layout"""
+    return [dict(zip(columns, row)) for row in rows]
@@ -5,11 +5,26 @@ Generates flights dynamically for any future date
 
 from datetime import datetime, timedelta
 import random
+import zlib
+
+import numpy as np
+
+# Columns written by bulk_insert_flights, in order
+FLIGHT_INSERT_COLUMNS = (
+    'flight_number', 'airline', 'origin', 'destination', 'departure_time',
+    'arrival_time', 'base_price', 'current_price', 'total_seats',
+    'available_seats', 'demand_level'
+)
 
 class FlightGenerator:
     """Generate flights dynamically for any date"""
     
-    def __init__(self):
+    def __init__(self, seed=None):
+        # Every flight is drawn from an RNG seeded by (route, date, slot), so
+        # any two generations of a route and date agree row for row and
+        # duplicate inserts are absorbed by the uq_route_flight_departure key
+        self.seed = seed
+        
         self.airlines = [
             'Air India', 'IndiGo', 'SpiceJet', 'Vistara', 
             'Go First', 'AirAsia India'
@@ -38,10 +53,8 @@ class FlightGenerator:
             ('16:00', '18:30'), ('18:00', '20:30'),
             ('19:30', '22:00'), ('21:00', '23:30')
         ]
-    
-    def generate_flight_number(self, airline):
-        """Generate realistic flight number"""
-        prefixes = {
+        
+        self.airline_prefixes = {
             'Air India': 'AI',
             'IndiGo': '6E',
             'SpiceJet': 'SG',
@@ -49,9 +62,27 @@ class FlightGenerator:
             'Go First': 'G8',
             'AirAsia India': 'I5'
         }
-        prefix = prefixes.get(airline, 'XX')
-        number = random.randint(100, 999)
-        return f"{prefix}{number}"
+        
+        # 'HH:MM' slots parsed once into minutes after midnight
+        self.flight_time_minutes = [
+            (self._to_minutes(dep_time), self._to_minutes(arr_time))
+            for dep_time, arr_time in self.flight_times
+        ]
+    
+    @staticmethod
+    def _to_minutes(hh_mm):
+        hours, minutes = map(int, hh_mm.split(':'))
+        return hours * 60 + minutes
+    
+    def _rng(self, *parts):
+        """Deterministic RNG for one slice of the schedule"""
+        return random.Random(":".join(str(part) for part in (self.seed,) + parts))
+    
+    def generate_flight_number(self, airline, origin, destination, slot):
+        """3-digit flight number fixed per (route, time slot)"""
+        prefix = self.airline_prefixes.get(airline, 'XX')
+        route_code = zlib.crc32(f"{origin}{destination}".encode()) % 90
+        return f"{prefix}{100 + route_code * len(self.flight_time_minutes) + slot}"
     
     def calculate_duration(self, origin, destination):
         """Calculate approximate flight duration in minutes"""
@@ -64,7 +95,7 @@ class FlightGenerator:
         }
         return distances.get((origin, destination), 120)
     
-    def get_base_price(self, origin, destination):
+    def get_base_price(self, origin, destination, rng=random):
         """Get base price for route"""
         duration = self.calculate_duration(origin, destination)
         
@@ -75,34 +106,39 @@ class FlightGenerator:
         else:
             price_range = self.base_prices['domestic_long']
         
-        return random.randint(price_range[0], price_range[1])
+        return rng.randint(price_range[0], price_range[1])
     
     def generate_flights_for_route(self, origin, destination, date_str, num_flights=3):
-        """Generate multiple flights for a specific route and date"""
+        """Generate multiple flights for a specific route and date
+        
+        Time slots come from one fixed shuffle per (route, date), so asking
+        for fewer flights returns a subset of a larger request, and each
+        slot's flight depends only on (route, date, slot).
+        """
         flights = []
+        origin, destination = origin.upper(), destination.upper()
         date = datetime.strptime(date_str, '%Y-%m-%d')
         
         # Select random flight times
-        selected_times = random.sample(self.flight_times, min(num_flights, len(self.flight_times)))
+        slots = list(range(len(self.flight_time_minutes)))
+        self._rng(origin, destination, date_str).shuffle(slots)
         
-        for dep_time, arr_time in selected_times:
-            airline = random.choice(self.airlines)
-            flight_number = self.generate_flight_number(airline)
-            
-            # Parse times
-            dep_hour, dep_min = map(int, dep_time.split(':'))
-            arr_hour, arr_min = map(int, arr_time.split(':'))
+        for slot in slots[:num_flights]:
+            dep_minutes, arr_minutes = self.flight_time_minutes[slot]
+            rng = self._rng(origin, destination, date_str, slot)
+            airline = rng.choice(self.airlines)
+            flight_number = self.generate_flight_number(airline, origin, destination, slot)
             
-            departure_datetime = date.replace(hour=dep_hour, minute=dep_min, second=0)
-            arrival_datetime = date.replace(hour=arr_hour, minute=arr_min, second=0)
+            departure_datetime = date + timedelta(minutes=dep_minutes)
+            arrival_datetime = date + timedelta(minutes=arr_minutes)
             
             # If arrival is next day
             if arrival_datetime <= departure_datetime:
                 arrival_datetime += timedelta(days=1)
             
-            base_price = self.get_base_price(origin, destination)
-            total_seats = random.choice([150, 164, 180, 186, 189])
-            available_seats = random.randint(int(total_seats * 0.4), total_seats)
+            base_price = self.get_base_price(origin, destination, rng)
+            total_seats = rng.choice([150, 164, 180, 186, 189])
+            available_seats = rng.randint(int(total_seats * 0.4), total_seats)
             
             flight = {
                 'flight_number': flight_number,
@@ -115,27 +151,129 @@ class FlightGenerator:
                 'current_price': base_price,
                 'total_seats': total_seats,
                 'available_seats': available_seats,
-                'demand_level': random.choice(['low', 'medium', 'high'])
+                'demand_level': rng.choice(['low', 'medium', 'high'])
             }
             
             flights.append(flight)
         
         return flights
     
+    def routes_for_date(self, date_str, origin=None, destination=None):
+        """(origin, destination, num_flights) generated for a date search"""
+        if origin and destination:
+            # Specific route
+            return [(origin.upper(), destination.upper(), 5)]
+        # A fixed sample of routes for the date
+        return [
+            (route_origin, route_destination, 2)
+            for route_origin, route_destination in self._rng(date_str).sample(self.routes, 10)
+        ]
+    
     def generate_flights_for_date(self, date_str, origin=None, destination=None):
         """Generate flights for a specific date, optionally filtered by route"""
         all_flights = []
+        for route_origin, route_destination, num_flights in self.routes_for_date(date_str, origin, destination):
+            all_flights.extend(self.generate_flights_for_route(
+                route_origin, route_destination, date_str, num_flights=num_flights
+            ))
+        return all_flights
+    
+    def generate_flight_columns(self, flight_date, day_index, flights_per_route=5,
+                                seed=0, load_factor=None, first_id=None):
+        """Generate one day of flights for every route as numpy columns
         
-        if origin and destination:
-            # Generate for specific route
-            flights = self.generate_flights_for_route(origin, destination, date_str, num_flights=5)
-            all_flights.extend(flights)
+        Output depends only on (seed, day_index), so a date range can be split
+        across processes and still reproduce the same dataset. Flight numbers
+        are 4-digit and unique per (airline, route, slot), so they never clash
+        with the 3-digit numbers of on-demand generation. With `load_factor`
+        the available seats follow a binomial draw around that occupancy.
+        """
+        n_slots = len(self.flight_time_minutes)
+        if not 0 < flights_per_route <= n_slots:
+            raise ValueError(f"flights_per_route must be between 1 and {n_slots}")
+        
+        rng = np.random.default_rng([seed, day_index])
+        n_routes = len(self.routes)
+        shape = (n_routes, flights_per_route)
+        
+        # Distinct time slots per route: the first k of a random permutation
+        slots = np.argsort(rng.random((n_routes, n_slots)), axis=1)[:, :flights_per_route]
+        slot_minutes = np.array(self.flight_time_minutes, dtype=np.int64)
+        dep_minutes = slot_minutes[slots, 0]
+        arr_minutes = slot_minutes[slots, 1]
+        arr_minutes = np.where(arr_minutes <= dep_minutes, arr_minutes + 24 * 60, arr_minutes)
+        
+        midnight = np.datetime64(flight_date.isoformat(), 'm')
+        departure_time = midnight + dep_minutes.astype('timedelta64[m]')
+        arrival_time = midnight + arr_minutes.astype('timedelta64[m]')
+        
+        airline_idx = rng.integers(0, len(self.airlines), size=shape)
+        airlines = np.array(self.airlines)
+        prefixes = np.array([self.airline_prefixes.get(airline, 'XX') for airline in self.airlines])
+        route_idx = np.broadcast_to(np.arange(n_routes)[:, None], shape)
+        numbers = 1000 + route_idx * n_slots + slots
+        flight_number = np.char.add(prefixes[airline_idx], numbers.astype(str))
+        
+        price_ranges = []
+        for origin, destination in self.routes:
+            duration = self.calculate_duration(origin, destination)
+            if duration < 90:
+                price_ranges.append(self.base_prices['domestic_short'])
+            elif duration < 150:
+                price_ranges.append(self.base_prices['domestic_medium'])
+            else:
+                price_ranges.append(self.base_prices['domestic_long'])
+        price_ranges = np.array(price_ranges)
+        base_price = rng.integers(price_ranges[:, 0:1], price_ranges[:, 1:2] + 1, size=shape)
+        
+        total_seats = rng.choice(np.array([150, 164, 180, 186, 189]), size=shape)
+        if load_factor is None:
+            available_seats = rng.integers((total_seats * 0.4).astype(np.int64), total_seats + 1)
         else:
-            # Generate for all routes
-            for route_origin, route_destination in random.sample(self.routes, 10):
-                flights = self.generate_flights_for_route(
-                    route_origin, route_destination, date_str, num_flights=2
-                )
-                all_flights.extend(flights)
-        
-        return all_flights
\ No newline at end of file
+            available_seats = total_seats - rng.binomial(total_seats, load_factor)
+        
+        demand_level = rng.choice(np.array(['low', 'medium', 'high']), size=shape)
+        
+        origins = np.array([origin for origin, _ in self.routes])
+        destinations = np.array([destination for _, destination in self.routes])
+        columns = {
+            'flight_number': flight_number,
+            'airline': airlines[airline_idx],
+            'origin': np.broadcast_to(origins[:, None], shape),
+            'destination': np.broadcast_to(destinations[:, None], shape),
+            'departure_time': departure_time,
+            'arrival_time': arrival_time,
+            'base_price': base_price,
+            'current_price': base_price,
+            'total_seats': total_seats,
+            'available_seats': available_seats,
+            'demand_level': demand_level
+        }
+        columns = {name: np.ravel(values) for name, values in columns.items()}
+        if first_id is not None:
+            columns['id'] = np.arange(first_id, first_id + n_routes * flights_per_route)
+        return columns
+
+def bulk_insert_flights(cursor, flights, batch_size=500):
+    """Insert generated flights with multi-row INSERT IGNORE statements
+    
+    Rows that collide with an existing (origin, destination, departure_time,
+    flight_number) are skipped, which makes re-running a generation harmless. Returns the
+    number of rows actually inserted.
+    """
+    row_placeholder = "(" + ", ".join(["%s"] * len(FLIGHT_INSERT_COLUMNS)) + ")"
+    inserted = 0
+    
+    for start in range(0, len(flights), batch_size):
+        batch = flights[start:start + batch_size]
+        query = (
+            f"INSERT IGNORE INTO flights ({', '.join(FLIGHT_INSERT_COLUMNS)}) VALUES "
+            + ", ".join([row_placeholder] * len(batch))
+        )
+        params = []
+        for flight in batch:
+            params.extend(flight[column] for column in FLIGHT_INSERT_COLUMNS)
+        cursor.execute(query, params)
+        inserted += cursor.rowcount
+    
+    return inserted
@@ -0,0 +1,285 @@
+"""
+Idempotency Keys
+Stores the outcome of write requests carrying an Idempotency-Key header so
+client retries replay the stored response instead of re-running the write
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import secrets
+import threading
+
+import mysql.connector
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+from cache import TTLCache
+from database import get_db_connection
+
+IDEMPOTENCY_CONFIG = {
+    'ttl_seconds': int(os.getenv('IDEMPOTENCY_TTL_SECONDS', 86400)),
+    # How long an in-progress claim blocks retries; a claim left behind by a
+    # crashed worker is taken over after this. Keep it above the slowest handler
+    'lease_seconds': int(os.getenv('IDEMPOTENCY_LEASE_SECONDS', 60)),
+    'cache_size': int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 10000)),
+    'purge_interval_seconds': int(os.getenv('IDEMPOTENCY_PURGE_INTERVAL_SECONDS', 3600))
+}
+PURGE_BATCH_SIZE = 1000
+CLAIM_ATTEMPTS = 3   # a key deleted between statements is claimed again
+
+# Completed outcomes only; (scope, key) -> (request_hash, status_code, body)
+_recent_outcomes = TTLCache(
+    maxsize=IDEMPOTENCY_CONFIG['cache_size'],
+    ttl=IDEMPOTENCY_CONFIG['ttl_seconds']
+)
+
+_stats = {
+    "executed": 0,
+    "replayed_from_memory": 0,
+    "replayed_from_db": 0,
+    "in_progress_conflicts": 0,
+    "stale_claims_taken_over": 0,
+    "mismatched_requests": 0
+}
+_stats_lock = threading.Lock()
+
+
+class _Claim:
+    """An in-progress key held by this request; `token` proves ownership"""
+
+    def __init__(self, scope, key, request_hash, status_code):
+        self.scope = scope
+        self.key = key
+        self.request_hash = request_hash
+        self.status_code = status_code
+        self.token = secrets.token_hex(16)
+        self.outcome = None
+
+# The claim of the request being handled, for record_outcome
+_active_claim = contextvars.ContextVar("idempotency_claim", default=None)
+
+
+def _count(counter):
+    with _stats_lock:
+        _stats[counter] += 1
+
+def request_fingerprint(*parts):
+    """Stable hash of the request a key was first used with"""
+    payload = json.dumps(jsonable_encoder(parts), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _replay(request_hash, outcome):
+    stored_hash, status_code, body = outcome
+    if stored_hash != request_hash:
+        _count("mismatched_requests")
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used with a different request"
+        )
+    if status_code >= 400:
+        raise HTTPException(status_code=status_code, detail=body.get("detail"))
+    return body
+
+def _claim(claim):
+    """Insert an in-progress marker; returns a stored outcome if the key is taken
+
+    While in progress, expires_at is a short lease rather than the TTL, so
+    the takeover below also reclaims keys whose worker died mid-request.
+    """
+    lease = IDEMPOTENCY_CONFIG['lease_seconds']
+    scope, key, request_hash = claim.scope, claim.key, claim.request_hash
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            for _ in range(CLAIM_ATTEMPTS):
+                try:
+                    cursor.execute(
+                        """
+                        INSERT INTO idempotency_keys
+                            (scope, idem_key, request_hash, claim_token, status, expires_at)
+                        VALUES (%s, %s, %s, %s, 'in_progress', NOW() + INTERVAL %s SECOND)
+                        """,
+                        (scope, key, request_hash, claim.token, lease)
+                    )
+                    return None
+                except mysql.connector.Error as err:
+                    if err.errno != 1062:
+                        raise
+
+                # An expired outcome not yet purged, or an in-progress claim whose
+                # lease ran out, is taken over as if absent
+                cursor.execute(
+                    """
+                    UPDATE idempotency_keys
+                    SET request_hash = %s, claim_token = %s, status = 'in_progress',
+                        status_code = NULL, response = NULL,
+                        expires_at = NOW() + INTERVAL %s SECOND
+                    WHERE scope = %s AND idem_key = %s AND expires_at < NOW()
+                    """,
+                    (request_hash, claim.token, lease, scope, key)
+                )
+                if cursor.rowcount == 1:
+                    _count("stale_claims_taken_over")
+                    return None
+
+                cursor.execute(
+                    """
+                    SELECT request_hash, status, status_code, response
+                    FROM idempotency_keys
+                    WHERE scope = %s AND idem_key = %s
+                    """,
+                    (scope, key)
+                )
+                row = cursor.fetchone()
+                if row is not None:
+                    break
+                # Purged or released since the INSERT failed; claim it again
+            else:
+                # Keeps vanishing under concurrent releases; answer as busy
+                row = (request_hash, 'in_progress', None, None)
+        finally:
+            cursor.close()
+
+    stored_hash, status, status_code, response = row
+    if status != 'completed':
+        if stored_hash != request_hash:
+            _count("mismatched_requests")
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different request"
+            )
+        _count("in_progress_conflicts")
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still being processed"
+        )
+    return stored_hash, status_code, json.loads(response)
+
+def _store_outcome(cursor, claim, outcome):
+    """Mark the claim completed; False if it is no longer ours (lease taken over)"""
+    _, status_code, body = outcome
+    # Outcomes are kept for the full TTL from completion
+    cursor.execute(
+        """
+        UPDATE idempotency_keys
+        SET status = 'completed', status_code = %s, response = %s,
+            expires_at = NOW() + INTERVAL %s SECOND
+        WHERE scope = %s AND idem_key = %s AND claim_token = %s AND status = 'in_progress'
+        """,
+        (status_code, json.dumps(body), IDEMPOTENCY_CONFIG['ttl_seconds'],
+         claim.scope, claim.key, claim.token)
+    )
+    return cursor.rowcount == 1
+
+def _complete(claim, outcome):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        stored = _store_outcome(cursor, claim, outcome)
+        cursor.close()
+    if stored:
+        _recent_outcomes.set((claim.scope, claim.key), outcome)
+
+def _release(claim):
+    """Forget our in-progress key so the client can retry after a transient failure"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            DELETE FROM idempotency_keys
+            WHERE scope = %s AND idem_key = %s AND claim_token = %s AND status = 'in_progress'
+            """,
+            (claim.scope, claim.key, claim.token)
+        )
+        cursor.close()
+
+def record_outcome(cursor, result):
+    """Store the current request's outcome in the handler's own transaction
+
+    Call right before committing the write, so the write and its stored
+    outcome commit together and a retry can never re-run a committed write.
+    Raises 409 if the claim's lease was taken over meanwhile; the handler
+    must then roll back. Without an Idempotency-Key this does nothing.
+    """
+    claim = _active_claim.get()
+    if claim is None:
+        return result
+    outcome = (claim.request_hash, claim.status_code, jsonable_encoder(result))
+    if not _store_outcome(cursor, claim, outcome):
+        _count("in_progress_conflicts")
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still being processed"
+        )
+    claim.outcome = outcome
+    return result
+
+def _is_final(status_code):
+    """Outcomes replayed on retry: successes and client errors other than conflicts"""
+    return status_code < 400 or (status_code < 500 and status_code not in (408, 409, 429))
+
+def run_idempotent(scope, key, request_hash, handler, status_code=200):
+    """Run `handler()` at most once per (scope, key) and replay its outcome
+
+    Without a key the handler simply runs. Replays never reach the handler,
+    so they do not touch the flights row or any other booking state.
+    Transient failures (5xx, 409) release the key instead of storing them.
+    Handlers that commit a write should call record_outcome before their
+    commit; otherwise the outcome is stored after the handler returns.
+    """
+    if not key:
+        return handler()
+
+    outcome = _recent_outcomes.get((scope, key))
+    if outcome is not None:
+        _count("replayed_from_memory")
+        return _replay(request_hash, outcome)
+
+    claim = _Claim(scope, key, request_hash, status_code)
+    stored = _claim(claim)
+    if stored is not None:
+        _count("replayed_from_db")
+        _recent_outcomes.set((scope, key), stored)
+        return _replay(request_hash, stored)
+
+    _count("executed")
+    token = _active_claim.set(claim)
+    try:
+        result = handler()
+    except HTTPException as err:
+        if _is_final(err.status_code):
+            _complete(claim, (request_hash, err.status_code, {"detail": err.detail}))
+        else:
+            _release(claim)
+        raise
+    except BaseException:
+        _release(claim)
+        raise
+    finally:
+        _active_claim.reset(token)
+
+    if claim.outcome is not None:
+        # Stored by the handler in its own transaction
+        _recent_outcomes.set((scope, key), claim.outcome)
+        return claim.outcome[2]
+    body = jsonable_encoder(result)
+    _complete(claim, (request_hash, status_code, body))
+    return body
+
+def purge_expired_keys(cursor, connection, batch_size=PURGE_BATCH_SIZE):
+    """Delete expired keys in small batches; returns the number removed"""
+    removed = 0
+    while True:
+        cursor.execute(
+            "DELETE FROM idempotency_keys WHERE expires_at < NOW() LIMIT %s",
+            (batch_size,)
+        )
+        connection.commit()
+        removed += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            return removed
+
+def idempotency_stats():
+    with _stats_lock:
+        return {**_stats, "memory": _recent_outcomes.stats()}
@@ -5,17 +5,26 @@ import os
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from datetime import datetime
 import uvicorn
 
 from routes_flights import router as flights_router
 from routes_bookings import router as bookings_router
-from routes_auth import router as auth_router
+from routes_auth import router as auth_router, auth_cache_stats
+from routes_exports import router as exports_router, export_stats, shutdown_export_executor
 from pricing_engine import PricingEngine
-from database import get_db_connection
+from database import get_db_connection, get_pool_stats, close_pool, shutdown_db_executor
 import mysql.connector
-from routes_seats import router as seats_router
+from routes_seats import router as seats_router, encoded_seat_maps, seat_reservation_stats
+from scheduler import repricing_scheduler, SCHEDULER_CONFIG
+from cache import flight_search_cache
+from seat_allocator import seat_map_cache
+from pnr_allocator import pnr_allocator
+from idempotency import idempotency_stats
+from password_hasher import password_hasher
+from write_behind import start_write_behind, stop_write_behind, write_behind_stats
+from metrics import MetricsMiddleware, render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -42,10 +51,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency includes the other middleware
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(flights_router, prefix="/api")
 app.include_router(bookings_router, prefix="/api")
 app.include_router(auth_router, prefix="/api")
 app.include_router(seats_router, prefix="/api", tags=["seats"])
+app.include_router(exports_router, prefix="/api")
 
 # @app.get("/")
 # async def root():
@@ -90,6 +103,28 @@ async def root():
     }
 
     
+@app.get("/api/stats")
+def runtime_stats():
+    """Runtime statistics for capacity monitoring"""
+    return {
+        "db_pool": get_pool_stats(),
+        "repricing": repricing_scheduler.stats(),
+        "search_cache": flight_search_cache.stats(),
+        "seat_map_cache": seat_map_cache.stats(),
+        "seat_map_payloads": encoded_seat_maps.stats(),
+        "seat_reservations": seat_reservation_stats(),
+        "pnr_allocator": pnr_allocator.stats(),
+        "idempotency": idempotency_stats(),
+        "exports": export_stats(),
+        "auth": auth_cache_stats(),
+        "password_hasher": password_hasher.stats(),
+        "write_behind": write_behind_stats()
+    }
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Request, booking and repricing metrics in the Prometheus text format"""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
 
 @app.on_event("startup")
 async def startup_event():
@@ -100,6 +135,20 @@ async def startup_event():
     print("API Documentation: http://localhost:8000/api/docs")
     print("Health Check: http://localhost:8000/")
     print("="*50)
+    if SCHEDULER_CONFIG['enabled']:
+        repricing_scheduler.start()
+    password_hasher.start()
+    start_write_behind()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    repricing_scheduler.stop()
+    shutdown_export_executor()
+    shutdown_db_executor()
+    pnr_allocator.close()
+    password_hasher.close()
+    stop_write_behind()
+    close_pool()
 
 # import os
 
@@ -0,0 +1,274 @@
+"""
+Metrics
+Prometheus-style counters, gauges and histograms rendered in the text
+exposition format at GET /metrics.
+
+Every thread updates its own shard of each metric without taking a lock
+(plain dict updates under the GIL); a scrape sums the shards. The only
+lock is taken once per thread per metric, when its shard is registered.
+"""
+
+import bisect
+import contextvars
+import operator
+import threading
+import time
+
+# Starlette appends "; charset=utf-8" to text/ media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Request latency buckets (seconds), also used for DB time per request
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Background jobs such as repricing passes take much longer
+JOB_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Per-thread shards keyed by label values"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Label kwargs -> tuple key; itemgetter keeps this off the profile
+        if len(self.labelnames) > 1:
+            self._label_key = operator.itemgetter(*self.labelnames)
+        elif self.labelnames:
+            getter = operator.itemgetter(self.labelnames[0])
+            self._label_key = lambda labels: (getter(labels),)
+        else:
+            self._label_key = lambda labels: ()
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _new_shard(self):
+        shard = self._local.shard = {}
+        with self._shards_lock:
+            self._shards.append(shard)
+        return shard
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        try:
+            return self._label_key(labels)
+        except KeyError:
+            raise ValueError(f"{self.name} expects labels {self.labelnames}") from None
+
+    def _snapshot(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        # Copy each shard; its owner thread may add keys while we read
+        return [dict(shard) for shard in shards]
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}"
+        ]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = self._key(labels)
+        return sum(shard.get(key, 0) for shard in self._snapshot())
+
+    def _totals(self):
+        totals = {}
+        for shard in self._snapshot():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def _samples(self):
+        totals = self._totals()
+        if not totals and not self.labelnames:
+            totals = {(): 0}
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(totals.items())
+        ]
+
+
+class Gauge(Counter):
+    """Counter that can go down; shards are summed, so inc/dec may be on different threads"""
+
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        key = self._key(labels)
+        state = shard.get(key)
+        if state is None:
+            # [count per bucket (+Inf last), sum]
+            state = shard[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def _samples(self):
+        merged = {}
+        for shard in self._snapshot():
+            for key, (counts, total) in shard.items():
+                into = merged.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+                into[0] = [a + b for a, b in zip(into[0], counts)]
+                into[1] += total
+
+        lines = []
+        bounds = self.buckets + (float("inf"),)
+        for key, (counts, total) in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = ("le", _format_value(bound))
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, [le])} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+REGISTRY = []
+
+def render_metrics():
+    """Every registered metric in the Prometheus text format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Application metrics
+# ---------------------------------------------------------------------------
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time each request held pooled database connections",
+    ("method", "route")
+)
+BOOKINGS = Counter(
+    "bookings_total", "Booking attempts by endpoint and outcome",
+    ("kind", "outcome")
+)
+PAYMENTS = Counter(
+    "payments_total", "Simulated payment attempts by result",
+    ("result",)
+)
+REPRICING_PASS_SECONDS = Histogram(
+    "repricing_pass_duration_seconds", "Duration of incremental repricing passes",
+    buckets=JOB_BUCKETS
+)
+REPRICED_FLIGHTS = Counter(
+    "repriced_flights_total", "Flights whose price was recomputed by repricing passes"
+)
+GENERATED_FLIGHTS = Counter(
+    "generated_flights_total", "Flights inserted by schedule generation",
+    ("source",)
+)
+
+
+# ---------------------------------------------------------------------------
+# Per-request DB time. The middleware puts a fresh accumulator in a context
+# variable; sync routes and run_db calls run with a copy of the request's
+# context, so connections released on worker threads add to the same one.
+# ---------------------------------------------------------------------------
+
+_request_db_time = contextvars.ContextVar("request_db_time", default=None)
+
+def record_db_time(seconds):
+    """Add connection hold time to the current request, if any"""
+    accumulator = _request_db_time.get()
+    if accumulator is not None:
+        accumulator[0] += seconds
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request by its route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        db_time = [0.0]
+        token = _request_db_time.set(db_time)
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            _request_db_time.reset(token)
+
+            route = scope.get("route")
+            # Templates such as /api/bookings/{pnr} keep label cardinality bounded
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=method, route=path, status=status[0])
+            HTTP_REQUEST_DB_SECONDS.observe(db_time[0], method=method, route=path)
@@ -0,0 +1,5 @@
+-- Incremental repricing: track when each flight next needs a price refresh
+-- reprice_at <= NOW() marks a flight dirty (see pricing_engine.incremental_update_prices)
+ALTER TABLE flights
+    ADD COLUMN reprice_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ADD INDEX idx_reprice_at (reprice_at);
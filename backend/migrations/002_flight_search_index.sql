@@ -0,0 +1,11 @@
+-- Index-friendly flight search (see routes_flights.route_filters)
+-- Searches now compare airport codes by value instead of UPPER(column),
+-- so normalize any codes stored in lower or mixed case first
+UPDATE flights
+SET origin = UPPER(origin), destination = UPPER(destination)
+WHERE BINARY origin <> UPPER(origin) OR BINARY destination <> UPPER(destination);
+
+-- Route + departure range lookups; idx_origin is its leftmost prefix
+ALTER TABLE flights
+    ADD INDEX idx_route_departure (origin, destination, departure_time),
+    DROP INDEX idx_origin;
@@ -0,0 +1,8 @@
+-- One departure per flight number: generated schedules are deterministic per
+-- route/date, so a duplicate generation is dropped by INSERT IGNORE
+-- (see flight_generator.bulk_insert_flights).
+-- Existing duplicates must be resolved first; list them with:
+--   SELECT flight_number, departure_time, COUNT(*) FROM flights
+--   GROUP BY flight_number, departure_time HAVING COUNT(*) > 1;
+ALTER TABLE flights
+    ADD UNIQUE KEY uq_flight_departure (flight_number, departure_time);
@@ -0,0 +1,6 @@
+-- Checkpoints for pregenerate_flights.py: one row per fully loaded date
+CREATE TABLE IF NOT EXISTS schedule_pregeneration (
+    flight_date DATE PRIMARY KEY,
+    flights_inserted INT NOT NULL,
+    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,10 @@
+-- Seat occupancy bitmaps used by seat_allocator.py (bit i set = seat i taken,
+-- seats numbered row-major over A-F). Rows are created lazily from existing
+-- bookings the first time a flight's map is read, so no backfill is needed.
+CREATE TABLE IF NOT EXISTS flight_seat_maps (
+    flight_id INT PRIMARY KEY,
+    occupancy VARBINARY(64) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (flight_id) REFERENCES flights(id) ON DELETE CASCADE
+);
@@ -0,0 +1,9 @@
+-- Seat map version per flight, bumped by every seat reservation; it is the
+-- ETag of GET /api/flights/{id}/seats/map (see routes_seats.py).
+CREATE TABLE IF NOT EXISTS seat_map_versions (
+    flight_id INT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (flight_id) REFERENCES flights(id) ON DELETE CASCADE
+);
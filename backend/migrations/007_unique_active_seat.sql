@@ -0,0 +1,12 @@
+-- One active booking per seat: active_seat is NULL once a booking is
+-- cancelled, so the unique key only covers live bookings. The optimistic
+-- booking path (POST /api/bookings/optimistic) claims seats by inserting
+-- under this key instead of locking the flight row.
+-- Existing double-bookings must be resolved first; list them with:
+--   SELECT flight_id, seat_number, COUNT(*) FROM bookings
+--   WHERE status != 'cancelled' AND seat_number IS NOT NULL
+--   GROUP BY flight_id, seat_number HAVING COUNT(*) > 1;
+ALTER TABLE bookings
+    ADD COLUMN active_seat VARCHAR(10)
+        AS (IF(status = 'cancelled', NULL, seat_number)) STORED,
+    ADD UNIQUE KEY uq_flight_active_seat (flight_id, active_seat);
@@ -0,0 +1,8 @@
+-- Shared sequence behind pnr_allocator.py: each API process reserves blocks
+-- of sequence numbers and maps them through a keyed permutation to PNRs.
+CREATE TABLE IF NOT EXISTS pnr_sequence (
+    name VARCHAR(32) PRIMARY KEY,
+    next_value BIGINT NOT NULL
+);
+
+INSERT IGNORE INTO pnr_sequence (name, next_value) VALUES ('pnr', 0);
@@ -0,0 +1,14 @@
+-- Outcomes of write requests sent with an Idempotency-Key header
+-- (idempotency.py). Expired rows are purged by the scheduler.
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    scope VARCHAR(64) NOT NULL,
+    idem_key VARCHAR(128) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    status ENUM('in_progress', 'completed') NOT NULL DEFAULT 'in_progress',
+    status_code SMALLINT NULL,
+    response MEDIUMTEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at DATETIME NOT NULL,
+    PRIMARY KEY (scope, idem_key),
+    INDEX idx_expires_at (expires_at)
+);
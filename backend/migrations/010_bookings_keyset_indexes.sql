@@ -0,0 +1,10 @@
+-- Keyset pagination for GET /bookings (see routes_bookings.booking_list_query)
+-- Pages are ordered by (booking_time, id) DESC; idx_booking_time already
+-- serves the unfiltered list because InnoDB appends the primary key. The
+-- filtered lists get an index ending in booking_time so they can also walk
+-- the index from the cursor instead of sorting. idx_passenger_email is the
+-- leftmost prefix of the new email index.
+ALTER TABLE bookings
+    ADD INDEX idx_email_booking_time (passenger_email, booking_time),
+    ADD INDEX idx_status_booking_time (status, booking_time),
+    DROP INDEX idx_passenger_email;
@@ -0,0 +1,7 @@
+-- Scope the schedule key to the route: generated flight numbers are derived
+-- from (route, time slot) and may repeat on another route in the same slot,
+-- which (flight_number, departure_time) would reject and INSERT IGNORE would
+-- then silently drop (see flight_generator.bulk_insert_flights).
+ALTER TABLE flights
+    DROP INDEX uq_flight_departure,
+    ADD UNIQUE KEY uq_route_flight_departure (origin, destination, departure_time, flight_number);
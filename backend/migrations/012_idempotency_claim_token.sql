@@ -0,0 +1,5 @@
+-- Token of the worker holding an in-progress claim. Completing or releasing
+-- a claim checks it, so a worker whose lease was taken over cannot overwrite
+-- or delete the new claimant's row (see idempotency.py).
+ALTER TABLE idempotency_keys
+    ADD COLUMN claim_token CHAR(32) NULL AFTER request_hash;
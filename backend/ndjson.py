@@ -0,0 +1,99 @@
+"""
+NDJSON Streaming
+Newline-delimited JSON responses read from an unbuffered database cursor,
+so large result sets are sent batch by batch instead of built in memory.
+
+A stream lasts as long as the client takes to read it, so each one runs on
+a dedicated connection (not the request pool), and at most
+STREAM_MAX_CONCURRENT streams are open at once.
+"""
+
+import os
+import threading
+import weakref
+
+import mysql.connector
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from database import DB_CONFIG
+from fast_json import dumps, row_layout
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 500
+STREAM_MAX_CONCURRENT = int(os.getenv('STREAM_MAX_CONCURRENT', 8))
+
+_stream_slots = threading.BoundedSemaphore(STREAM_MAX_CONCURRENT)
+
+
+class _Stream:
+    """A stream's dedicated connection and slot, released exactly once"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            self.conn.close()
+        except mysql.connector.Error:
+            pass  # e.g. rows left unread after a client disconnect
+        finally:
+            _stream_slots.release()
+
+
+def ndjson_batches(stream, cursor, batch_size=STREAM_BATCH_SIZE):
+    """Yield one chunk of NDJSON lines per fetched batch of tuple rows
+
+    Only one batch is held in memory; the stream is closed when it ends or
+    the client disconnects.
+    """
+    try:
+        columns = row_layout(cursor)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield b''.join(dumps(dict(zip(columns, row))) + b'\n' for row in rows)
+        cursor.close()
+    finally:
+        stream.close()
+
+def ndjson_response(query, params, batch_size=STREAM_BATCH_SIZE):
+    """Run `query` and stream its rows as NDJSON
+
+    The query is executed before the response starts, so database errors
+    still reach the caller as mysql.connector.Error. Raises 503 when
+    STREAM_MAX_CONCURRENT streams are already open.
+    """
+    if not _stream_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503, detail="Too many streams in progress, retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    try:
+        conn = mysql.connector.connect(**DB_CONFIG)
+    except Exception:
+        _stream_slots.release()
+        raise
+    stream = _Stream(conn)
+    try:
+        cursor = conn.cursor(buffered=False)
+        cursor.execute(query, params)
+    except Exception:
+        stream.close()
+        raise
+    response = StreamingResponse(
+        ndjson_batches(stream, cursor, batch_size), media_type=NDJSON_MEDIA_TYPE,
+        background=BackgroundTask(stream.close)
+    )
+    # The body may never be iterated (early disconnect, a middleware error,
+    # a discarded response); release the stream when the response is freed
+    weakref.finalize(response, stream.close)
+    return response
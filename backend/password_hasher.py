@@ -0,0 +1,176 @@
+"""
+Password Hasher
+Argon2 hashing and verification on a bounded process pool, so login and
+signup bursts neither hold the GIL nor queue without limit
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from passlib.context import CryptContext
+
+# Cost parameters; hashes made with other values are upgraded on next login
+ARGON2_CONFIG = {
+    'time_cost': int(os.getenv('ARGON2_TIME_COST', 3)),
+    'memory_cost': int(os.getenv('ARGON2_MEMORY_COST', 65536)),   # KiB
+    'parallelism': int(os.getenv('ARGON2_PARALLELISM', 4))
+}
+PASSWORD_HASHER_CONFIG = {
+    'workers': int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 2)),
+    # Requests allowed to wait for a worker before new ones are rejected
+    'max_queue': int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 32)),
+    'timeout_seconds': float(os.getenv('PASSWORD_HASH_TIMEOUT_SECONDS', 10))
+}
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=ARGON2_CONFIG['time_cost'],
+    argon2__memory_cost=ARGON2_CONFIG['memory_cost'],
+    argon2__parallelism=ARGON2_CONFIG['parallelism']
+)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503"""
+
+
+# Run inside worker processes
+def _hash(password):
+    return pwd_context.hash(password)
+
+def _verify_and_update(password, hashed):
+    return pwd_context.verify_and_update(password, hashed)
+
+def _warm_up():
+    return os.getpid()
+
+
+class PasswordHasher:
+    """Bounded front for a process pool running argon2
+
+    At most workers + max_queue calls are admitted at once; further calls
+    fail immediately with PasswordHasherBusy instead of piling up behind
+    a login storm. A call's slot is held until its job finishes, even when
+    the caller gave up waiting, and a pool broken by a dead worker is
+    replaced rather than failing every later call.
+    """
+
+    def __init__(self, workers=2, max_queue=32, timeout=10.0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._executor = None
+        self._lock = threading.Lock()
+
+        self._stats = {
+            "hashes": 0,
+            "verifications": 0,
+            "rehashes": 0,
+            "rejected": 0,
+            "pool_restarts": 0,
+            "total_seconds": 0.0
+        }
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn, not fork: the API process is multi-threaded
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def _replace_executor(self, broken):
+        """Drop a pool whose worker died; the next call spawns a fresh one"""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = None
+            self._stats["pool_restarts"] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+        print("❌ Password hashing pool broke, restarting it")
+
+    def _submit(self, func, *args):
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(func, *args)
+        except BrokenProcessPool:
+            self._replace_executor(executor)
+        executor = self._get_executor()
+        return executor, executor.submit(func, *args)
+
+    def _run(self, counter, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise PasswordHasherBusy("Password hashing is saturated, retry shortly")
+
+        started = time.perf_counter()
+        try:
+            executor, future = self._submit(func, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            raise PasswordHasherBusy("Password hashing is restarting, retry shortly")
+        # Keep the slot until the worker is done, not just until we stop waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise PasswordHasherBusy("Password hashing timed out, retry shortly")
+        except BrokenProcessPool:
+            self._replace_executor(executor)
+            raise PasswordHasherBusy("Password hashing worker crashed, retry shortly")
+        finally:
+            with self._lock:
+                self._stats[counter] += 1
+                self._stats["total_seconds"] += time.perf_counter() - started
+
+    def hash(self, password):
+        return self._run("hashes", _hash, password)
+
+    def verify_and_update(self, password, hashed):
+        """(matches, new_hash); new_hash is set when `hashed` uses outdated parameters"""
+        verified, new_hash = self._run("verifications", _verify_and_update, password, hashed)
+        if new_hash:
+            with self._lock:
+                self._stats["rehashes"] += 1
+        return verified, new_hash
+
+    def start(self):
+        """Spawn the worker processes now rather than on the first login (non-blocking)"""
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(_warm_up)
+
+    def stats(self):
+        with self._lock:
+            calls = self._stats["hashes"] + self._stats["verifications"]
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "argon2": ARGON2_CONFIG,
+                "avg_ms": round(self._stats["total_seconds"] / calls * 1000, 2) if calls else None,
+                **self._stats,
+                "total_seconds": round(self._stats["total_seconds"], 3)
+            }
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    workers=PASSWORD_HASHER_CONFIG['workers'],
+    max_queue=PASSWORD_HASHER_CONFIG['max_queue'],
+    timeout=PASSWORD_HASHER_CONFIG['timeout_seconds']
+)
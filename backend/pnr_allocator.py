@@ -0,0 +1,143 @@
+"""
+PNR Allocator
+Unique-by-construction booking references: sequence numbers reserved in
+blocks from the database, scrambled by a keyed permutation of the 6-character
+PNR space so consecutive bookings still get random-looking codes
+"""
+
+import hashlib
+import os
+import string
+import threading
+
+import mysql.connector
+
+from database import DB_CONFIG
+
+PNR_ALPHABET = string.ascii_uppercase + string.digits
+PNR_LENGTH = 6
+PNR_SPACE = len(PNR_ALPHABET) ** PNR_LENGTH   # 36^6 = 2,176,782,336
+
+PNR_CONFIG = {
+    # Changing the secret changes the permutation; keep it stable per database
+    'secret': os.getenv('PNR_SECRET', 'flight-booking-simulator'),
+    'block_size': int(os.getenv('PNR_BLOCK_SIZE', 1000))
+}
+PNR_SEQUENCE_NAME = "pnr"
+
+_FEISTEL_ROUNDS = 4
+_HALF_BITS = 16
+_HALF_MASK = (1 << _HALF_BITS) - 1
+
+
+class PnrPermutation:
+    """Keyed bijection on [0, 36^6)
+
+    A 4-round Feistel network over 32-bit values, cycle-walked until the
+    output falls back inside the PNR space (about 2 passes on average).
+    """
+
+    def __init__(self, secret):
+        self._key = hashlib.sha256(secret.encode()).digest()
+
+    def _round(self, round_index, half):
+        digest = hashlib.blake2b(
+            bytes((round_index,)) + half.to_bytes(2, 'big'),
+            key=self._key, digest_size=2
+        ).digest()
+        return int.from_bytes(digest, 'big')
+
+    def _feistel(self, value):
+        left, right = value >> _HALF_BITS, value & _HALF_MASK
+        for round_index in range(_FEISTEL_ROUNDS):
+            left, right = right, left ^ self._round(round_index, right)
+        return left << _HALF_BITS | right
+
+    def permute(self, value):
+        if not 0 <= value < PNR_SPACE:
+            raise ValueError("PNR sequence exhausted")
+        value = self._feistel(value)
+        while value >= PNR_SPACE:
+            value = self._feistel(value)
+        return value
+
+
+def encode_pnr(value):
+    """Integer in [0, 36^6) -> 6-character PNR"""
+    chars = []
+    for _ in range(PNR_LENGTH):
+        value, digit = divmod(value, len(PNR_ALPHABET))
+        chars.append(PNR_ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+class PnrAllocator:
+    """Hands out PNRs from sequence blocks reserved in the pnr_sequence table
+
+    Blocks are reserved on the allocator's own connection, outside any
+    booking transaction and outside the request pool, so issuing a PNR
+    costs no database round trip except once per `block_size` bookings.
+    """
+
+    def __init__(self, secret, block_size=1000):
+        self.block_size = block_size
+        self._permutation = PnrPermutation(secret)
+        self._next = 0
+        self._end = 0
+        self._connection = None
+        self._lock = threading.Lock()
+
+        self._stats = {"issued": 0, "blocks_reserved": 0}
+
+    def _reserve_block(self):
+        """Atomically advance the shared sequence by one block; caller holds the lock"""
+        if self._connection is None or not self._connection.is_connected():
+            self._connection = mysql.connector.connect(**{**DB_CONFIG, 'autocommit': True})
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(
+                """
+                UPDATE pnr_sequence
+                SET next_value = LAST_INSERT_ID(next_value + %s)
+                WHERE name = %s
+                """,
+                (self.block_size, PNR_SEQUENCE_NAME)
+            )
+            if cursor.rowcount != 1:
+                raise mysql.connector.Error(msg="pnr_sequence is not initialised")
+            end = cursor.lastrowid
+        finally:
+            cursor.close()
+
+        self._next, self._end = end - self.block_size, end
+        self._stats["blocks_reserved"] += 1
+
+    def next_pnr(self):
+        """Return a PNR no other allocator (thread or process) will issue"""
+        with self._lock:
+            if self._next >= self._end:
+                self._reserve_block()
+            value = self._next
+            self._next += 1
+            self._stats["issued"] += 1
+        return encode_pnr(self._permutation.permute(value))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "block_size": self.block_size,
+                "remaining_in_block": self._end - self._next,
+                **self._stats
+            }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                try:
+                    self._connection.close()
+                except mysql.connector.Error:
+                    pass
+                self._connection = None
+
+
+pnr_allocator = PnrAllocator(PNR_CONFIG['secret'], PNR_CONFIG['block_size'])
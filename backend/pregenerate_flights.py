@@ -0,0 +1,155 @@
+"""
+Schedule Pre-generation
+Populates flights for every route over a rolling horizon so searches never
+have to generate at request time.
+
+Usage: python pregenerate_flights.py --days 90
+"""
+
+import argparse
+import time
+from datetime import date, timedelta
+
+import mysql.connector
+
+from database import get_db_connection
+from flight_generator import FlightGenerator, bulk_insert_flights
+
+# Flights per route per day; matches the on-demand route search in
+# check_and_generate_flights. On-demand generation draws a prefix of the same
+# per-(route, date) schedule, so rows it already inserted are skipped here
+FLIGHTS_PER_ROUTE = 5
+DEFAULT_HORIZON_DAYS = 90
+DEFAULT_CHUNK_ROWS = 2000
+
+
+def _completed_dates(cursor, start_date, end_date):
+    """Dates in [start_date, end_date] already checkpointed as generated"""
+    cursor.execute(
+        "SELECT flight_date FROM schedule_pregeneration WHERE flight_date BETWEEN %s AND %s",
+        (start_date, end_date)
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+def _checkpoint(cursor, conn, dates_inserted):
+    """Record fully written dates so an interrupted run resumes after them"""
+    cursor.executemany(
+        """
+        INSERT INTO schedule_pregeneration (flight_date, flights_inserted)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE flights_inserted = VALUES(flights_inserted),
+                                completed_at = CURRENT_TIMESTAMP
+        """,
+        list(dates_inserted.items())
+    )
+    conn.commit()
+
+def pregenerate_schedule(days=DEFAULT_HORIZON_DAYS, start_date=None,
+                         chunk_rows=DEFAULT_CHUNK_ROWS, restart=False, verbose=True):
+    """Generate and bulk-load all routes for `days` days starting at `start_date`
+
+    Rows are streamed to MySQL in chunks of about `chunk_rows`; each date is
+    checkpointed once all its rows are committed. Returns a run report.
+    """
+    start_date = start_date or date.today()
+    end_date = start_date + timedelta(days=days - 1)
+    generator = FlightGenerator()
+
+    started = time.monotonic()
+    generated = 0
+    inserted = 0
+    skipped_dates = 0
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        done = set() if restart else _completed_dates(cursor, start_date, end_date)
+
+        pending_rows = 0
+        pending_dates = {}   # date -> generated rows for that date
+
+        def flush():
+            nonlocal inserted, pending_rows
+            if pending_dates:
+                # One statement per date so the checkpoint records what
+                # INSERT IGNORE actually added, not what was generated
+                dates_inserted = {
+                    flight_date: bulk_insert_flights(cursor, rows)
+                    for flight_date, rows in pending_dates.items()
+                }
+                inserted += sum(dates_inserted.values())
+                conn.commit()
+                _checkpoint(cursor, conn, dates_inserted)
+            pending_rows = 0
+            pending_dates.clear()
+
+        for offset in range(days):
+            flight_date = start_date + timedelta(days=offset)
+            if flight_date in done:
+                skipped_dates += 1
+                continue
+
+            date_str = flight_date.strftime('%Y-%m-%d')
+            day_rows = []
+            for origin, destination in generator.routes:
+                day_rows.extend(generator.generate_flights_for_route(
+                    origin, destination, date_str, num_flights=FLIGHTS_PER_ROUTE
+                ))
+
+            generated += len(day_rows)
+            pending_rows += len(day_rows)
+            pending_dates[flight_date] = day_rows
+
+            if pending_rows >= chunk_rows:
+                flush()
+                if verbose:
+                    elapsed = time.monotonic() - started
+                    print(f"  through {date_str}: {generated} rows "
+                          f"({generated / elapsed:,.0f} rows/sec)")
+
+        flush()
+        cursor.close()
+
+    elapsed = time.monotonic() - started
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "dates_generated": days - skipped_dates,
+        "dates_skipped": skipped_dates,
+        "rows_generated": generated,
+        "rows_inserted": inserted,
+        "duration_seconds": round(elapsed, 3),
+        "rows_per_second": round(generated / elapsed, 1) if elapsed else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate flight schedules")
+    parser.add_argument("--days", type=int, default=DEFAULT_HORIZON_DAYS,
+                        help="number of days to populate (default: 90)")
+    parser.add_argument("--start-date", type=date.fromisoformat,
+                        help="first date, YYYY-MM-DD (default: today)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="rows buffered per bulk write (default: 2000)")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore checkpoints and regenerate every date")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print(f"Pre-generating {args.days} days of flights...")
+    print("=" * 50)
+    try:
+        report = pregenerate_schedule(
+            days=args.days,
+            start_date=args.start_date,
+            chunk_rows=args.chunk_rows,
+            restart=args.restart
+        )
+    except mysql.connector.Error as err:
+        print(f"❌ Pre-generation failed: {err}")
+        raise SystemExit(1)
+
+    for key, value in report.items():
+        print(f"{key:<20} {value}")
+    print("=" * 50)
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,19 @@ from datetime import datetime, timedelta
 from typing import Dict
 import random
 
+import numpy as np
+
+# Demand multipliers indexed by the flights.demand_level ENUM position
+# (0 = empty/invalid, 1 = low, 2 = medium, 3 = high, 4 = very_high)
+DEMAND_LEVELS = ["low", "medium", "high", "very_high"]
+DEMAND_FACTOR_BY_ENUM_INDEX = np.array([1.0, 0.9, 1.0, 1.4, 2.0])
+DEMAND_SHIFT_WEIGHTS = np.array([0.2, 0.5, 0.2, 0.1])
+
+# Rows read per SELECT and rows written per bulk UPDATE in vectorized repricing
+REPRICE_READ_CHUNK = 5000
+REPRICE_WRITE_CHUNK = 1000
+DEMAND_SHIFT_MAX_ROWS = 5000   # upper bound on flights re-drawn per demand-shift pass
+
 class PricingEngine:
     """Calculate dynamic flight prices based on multiple factors"""
     
@@ -109,6 +122,57 @@ class PricingEngine:
         }
         return demand_multipliers.get(demand_level.lower(), 1.0)
     
+    def calculate_prices(
+        self,
+        base_prices: np.ndarray,
+        total_seats: np.ndarray,
+        available_seats: np.ndarray,
+        seconds_until_departure: np.ndarray,
+        demand_factors: np.ndarray
+    ) -> np.ndarray:
+        """Vectorized calculate_price over whole columns, returns current prices"""
+        total_multiplier = (
+            self._seat_factors(total_seats, available_seats) * self.config["seat_weight"] +
+            self._time_factors(seconds_until_departure) * self.config["time_weight"] +
+            demand_factors * self.config["demand_weight"]
+        )
+        total_multiplier = np.clip(
+            total_multiplier,
+            self.config["min_price_multiplier"],
+            self.config["max_price_multiplier"]
+        )
+        return np.round(base_prices * total_multiplier, 2)
+    
+    def _seat_factors(self, total_seats: np.ndarray, available_seats: np.ndarray) -> np.ndarray:
+        """Array version of _calculate_seat_factor"""
+        occupancy = (total_seats - available_seats) / np.maximum(total_seats, 1)
+        factors = np.select(
+            [occupancy < 0.2, occupancy < 0.6, occupancy < 0.9],
+            [
+                0.8 + occupancy * 1.0,
+                1.0 + (occupancy - 0.2) * 1.25,
+                1.5 + (occupancy - 0.6) * 3.33
+            ],
+            default=2.5 + (occupancy - 0.9) * 5.0
+        )
+        return np.where(available_seats <= 0, 3.0, factors)
+    
+    def _time_factors(self, seconds_until_departure: np.ndarray) -> np.ndarray:
+        """Array version of _calculate_time_factor"""
+        days = seconds_until_departure / 86400
+        factors = np.select(
+            [days > 30, days > 15, days > 7, days > 3, days > 1],
+            [
+                np.full_like(days, 0.8),
+                0.8 + ((30 - days) / 15) * 0.2,
+                1.0 + ((15 - days) / 8) * 0.3,
+                1.3 + ((7 - days) / 4) * 0.4,
+                1.7 + ((3 - days) / 2) * 0.8
+            ],
+            default=2.5 + (1 - days) * 0.5
+        )
+        return np.where(seconds_until_departure < 0, 3.0, factors)
+    
     def simulate_demand_shift(self) -> str:
         """Simulate demand level changes randomly"""
         weights = {
@@ -160,4 +224,242 @@ def batch_update_prices(cursor, connection):
         updated_count += 1
     
     connection.commit()
-    return updated_count
\ No newline at end of file
+    return updated_count
+
+def _bulk_update_flights(cursor, ids, prices, demand_updates=None, reprice_schedule=None):
+    """Write many current_price (and optional demand_level / reprice_at) values in one UPDATE
+    
+    `reprice_schedule` holds one (next_reprice_at, available_seats_as_read)
+    pair per id; a flight whose seats changed since it was read keeps
+    reprice_at = NOW() so the concurrent booking is picked up next pass.
+    """
+    price_cases = " ".join(["WHEN %s THEN %s"] * len(ids))
+    params = []
+    for flight_id, price in zip(ids, prices):
+        params.extend((flight_id, price))
+    
+    query = f"UPDATE flights SET current_price = CASE id {price_cases} END"
+    
+    if demand_updates:
+        demand_cases = " ".join(["WHEN %s THEN %s"] * len(demand_updates))
+        query += f", demand_level = CASE id {demand_cases} ELSE demand_level END"
+        for flight_id, level in demand_updates.items():
+            params.extend((flight_id, level))
+    
+    if reprice_schedule:
+        schedule_cases = " ".join(
+            ["WHEN %s THEN IF(available_seats = %s, %s, NOW())"] * len(ids)
+        )
+        query += f", reprice_at = CASE id {schedule_cases} END"
+        for flight_id, (next_reprice_at, seats_read) in zip(ids, reprice_schedule):
+            params.extend((flight_id, seats_read, next_reprice_at))
+    
+    query += f" WHERE id IN ({', '.join(['%s'] * len(ids))})"
+    params.extend(ids)
+    cursor.execute(query, params)
+
+def _columns(rows):
+    """Turn (id, base_price, current_price, total_seats, available_seats,
+    departure_time, demand_index) rows into NumPy columns"""
+    ids, base_prices, current_prices, total_seats, available_seats, departures, demand_index = zip(*rows)
+    
+    now = np.datetime64(datetime.now(), "us")
+    departures = np.array(departures, dtype="datetime64[us]")
+    return {
+        "ids": np.array(ids, dtype=np.int64),
+        "base_prices": np.array(base_prices, dtype=np.float64),
+        "current_prices": np.array(current_prices, dtype=np.float64),
+        "total_seats": np.array(total_seats, dtype=np.float64),
+        "available_seats": np.array(available_seats, dtype=np.int64),
+        "departures": departures,
+        "seconds_until_departure": (departures - now) / np.timedelta64(1, "s"),
+        "demand_index": np.array(demand_index, dtype=np.int64)
+    }
+
+def _chunk_prices(engine, chunk):
+    """Price a chunk produced by _columns"""
+    return engine.calculate_prices(
+        base_prices=chunk["base_prices"],
+        total_seats=chunk["total_seats"],
+        available_seats=chunk["available_seats"].astype(np.float64),
+        seconds_until_departure=chunk["seconds_until_departure"],
+        demand_factors=DEMAND_FACTOR_BY_ENUM_INDEX[chunk["demand_index"]]
+    )
+
+def batch_update_prices_vectorized(cursor, connection, read_chunk=REPRICE_READ_CHUNK,
+                                   write_chunk=REPRICE_WRITE_CHUNK):
+    """Reprice all future flights column-at-a-time with bulk writes
+    
+    Flights are read in id order, `read_chunk` rows at a time, priced with
+    NumPy, and only rows whose price or demand changed are written back in
+    multi-row UPDATEs of at most `write_chunk` flights. Expects a tuple cursor.
+    """
+    engine = PricingEngine()
+    rng = np.random.default_rng()
+    updated_count = 0
+    last_id = 0
+    
+    while True:
+        cursor.execute("""
+            SELECT id, base_price, current_price, total_seats, available_seats,
+                   departure_time, COALESCE(demand_level + 0, 2)
+            FROM flights
+            WHERE departure_time > NOW() AND id > %s
+            ORDER BY id
+            LIMIT %s
+        """, (last_id, read_chunk))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        
+        last_id = rows[-1][0]
+        chunk = _columns(rows)
+        ids = chunk["ids"]
+        demand_index = chunk["demand_index"]
+        
+        # Same 10% random demand shift as batch_update_prices
+        shifted = rng.random(len(ids)) < 0.1
+        new_levels = rng.choice(len(DEMAND_LEVELS), size=int(shifted.sum()), p=DEMAND_SHIFT_WEIGHTS)
+        demand_index[shifted] = new_levels + 1
+        
+        prices = _chunk_prices(engine, chunk)
+        
+        changed = shifted | (prices != chunk["current_prices"])
+        changed_idx = np.flatnonzero(changed)
+        
+        for start in range(0, len(changed_idx), write_chunk):
+            batch = changed_idx[start:start + write_chunk]
+            batch_ids = ids[batch].tolist()
+            demand_updates = {
+                int(ids[i]): DEMAND_LEVELS[demand_index[i] - 1]
+                for i in batch if shifted[i]
+            }
+            _bulk_update_flights(cursor, batch_ids, prices[batch].tolist(), demand_updates)
+        
+        connection.commit()
+        updated_count += len(changed_idx)
+    
+    return updated_count
+
+# Incremental repricing
+#
+# Every flight carries reprice_at, the next moment its price can change on
+# its own: the end of its current time-factor bucket. Anything that changes a
+# pricing input (booking, cancellation, flight update, demand shift) resets
+# reprice_at to NOW(), so a pass only has to visit flights with
+# reprice_at <= NOW() (served by idx_reprice_at).
+
+REPRICE_TIME_BUCKET_SECONDS = 86400   # time factor is re-evaluated once per day
+TIME_FACTOR_FLAT_SECONDS = 30 * 86400  # time factor is constant beyond 30 days
+
+def next_reprice_times(departures: np.ndarray, seconds_until_departure: np.ndarray) -> np.ndarray:
+    """Start of the next time-factor bucket for each flight"""
+    remaining = np.minimum(seconds_until_departure, TIME_FACTOR_FLAT_SECONDS)
+    whole_buckets = np.floor(np.maximum(remaining, 0) / REPRICE_TIME_BUCKET_SECONDS)
+    offsets = (whole_buckets * REPRICE_TIME_BUCKET_SECONDS).astype("timedelta64[s]")
+    return (departures - offsets).astype("datetime64[s]")
+
+def simulate_demand_shifts(cursor, connection, shift_rate=0.1, max_rows=DEMAND_SHIFT_MAX_ROWS):
+    """Randomly re-draw demand for a fraction of future flights and mark them dirty
+    
+    Draws up to `max_rows` random ids from the primary key range and updates
+    them by id, so a pass never scans the flights table. Ids of departed or
+    deleted flights are drawn too and simply skipped.
+    """
+    cursor.execute("SELECT MIN(id), MAX(id) FROM flights")
+    first_id, last_id = cursor.fetchone()
+    if first_id is None:
+        return 0
+    
+    span = last_id - first_id + 1
+    sample_size = min(int(span * shift_rate), max_rows)
+    ids = random.sample(range(first_id, last_id + 1), sample_size)
+    
+    shifted = 0
+    for start in range(0, len(ids), REPRICE_WRITE_CHUNK):
+        batch = ids[start:start + REPRICE_WRITE_CHUNK]
+        placeholders = ", ".join(["%s"] * len(batch))
+        # Ten slots weighted like simulate_demand_shift: 20% low, 50% medium, 20% high, 10% very_high
+        cursor.execute(f"""
+            UPDATE flights
+            SET demand_level = ELT(FLOOR(1 + RAND() * 10),
+                    'low', 'low', 'medium', 'medium', 'medium',
+                    'medium', 'medium', 'high', 'high', 'very_high'),
+                reprice_at = NOW()
+            WHERE id IN ({placeholders}) AND departure_time > NOW()
+        """, batch)
+        shifted += cursor.rowcount
+        connection.commit()
+    return shifted
+
+def incremental_update_prices(cursor, connection, read_chunk=REPRICE_READ_CHUNK,
+                              write_chunk=REPRICE_WRITE_CHUNK, shift_rate=0.1,
+                              id_range=None, on_price_change=None):
+    """Reprice only flights whose pricing inputs changed since their last pass
+    
+    `id_range` = (first_id, last_id) limits the pass to one shard of the
+    flights table. `on_price_change` is called after each committed chunk
+    with the ids whose price moved. Returns a per-pass report with how many
+    future flights were repriced versus skipped. Expects a tuple cursor.
+    """
+    started = datetime.now()
+    engine = PricingEngine()
+    demand_shifted = simulate_demand_shifts(cursor, connection, shift_rate) if shift_rate else 0
+    
+    first_id, end_id = id_range if id_range else (1, 2 ** 63 - 1)
+    touched = 0
+    price_changed = 0
+    last_id = first_id - 1
+    
+    while True:
+        cursor.execute("""
+            SELECT id, base_price, current_price, total_seats, available_seats,
+                   departure_time, COALESCE(demand_level + 0, 2)
+            FROM flights
+            WHERE reprice_at <= NOW() AND departure_time > NOW() AND id > %s AND id <= %s
+            ORDER BY id
+            LIMIT %s
+        """, (last_id, end_id, read_chunk))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        
+        last_id = rows[-1][0]
+        chunk = _columns(rows)
+        prices = _chunk_prices(engine, chunk)
+        next_reprice = next_reprice_times(chunk["departures"], chunk["seconds_until_departure"])
+        
+        for start in range(0, len(rows), write_chunk):
+            end = start + write_chunk
+            _bulk_update_flights(
+                cursor,
+                chunk["ids"][start:end].tolist(),
+                prices[start:end].tolist(),
+                reprice_schedule=list(zip(
+                    next_reprice[start:end].tolist(),
+                    chunk["available_seats"][start:end].tolist()
+                ))
+            )
+        
+        connection.commit()
+        touched += len(rows)
+        
+        changed_ids = chunk["ids"][prices != chunk["current_prices"]]
+        price_changed += len(changed_ids)
+        if on_price_change and len(changed_ids):
+            on_price_change(changed_ids.tolist())
+    
+    cursor.execute(
+        "SELECT COUNT(*) FROM flights WHERE departure_time > NOW() AND id BETWEEN %s AND %s",
+        (first_id, end_id)
+    )
+    future_flights = cursor.fetchone()[0]
+    
+    return {
+        "future_flights": future_flights,
+        "repriced": touched,
+        "skipped": max(future_flights - touched, 0),
+        "price_changed": price_changed,
+        "demand_shifted": demand_shifted,
+        "duration_seconds": round((datetime.now() - started).total_seconds(), 3)
+    }
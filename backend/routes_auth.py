@@ -3,8 +3,15 @@ from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
 from datetime import datetime, timedelta
 from database import get_db_connection
-from auth_utils import hash_password, verify_password, create_access_token, decode_access_token
+from auth_utils import (
+    hash_password, verify_and_update_password, create_access_token, decode_access_token,
+    verified_token_cache
+)
+from password_hasher import PasswordHasherBusy
+from write_behind import record_login
+from cache import TTLCache
 import mysql.connector
+import os
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -25,48 +32,112 @@ class TokenResponse(BaseModel):
     token_type: str
     user: dict
 
+class ProfileUpdate(BaseModel):
+    first_name: Optional[str] = Field(None, min_length=1, max_length=50)
+    last_name: Optional[str] = Field(None, min_length=1, max_length=50)
+    phone: Optional[str] = Field(None, max_length=15)
+
+# Short-lived copies of user profiles keyed by email, dropped on profile change
+user_profile_cache = TTLCache(
+    maxsize=int(os.getenv('AUTH_PROFILE_CACHE_SIZE', 10000)),
+    ttl=float(os.getenv('AUTH_PROFILE_CACHE_TTL_SECONDS', 30))
+)
+
+def load_user_profile(email: str):
+    """Profile row for /me and require_user; None if there is no such user"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        
+        cursor.execute(
+            "SELECT id, email, first_name, last_name, phone, is_active, created_at FROM users WHERE email = %s",
+            (email,)
+        )
+        user = cursor.fetchone()
+        
+        cursor.close()
+    return user
+
+def invalidate_user_profile(email: str):
+    """Call after changing a user's row so the next lookup reads it fresh"""
+    user_profile_cache.invalidate(email)
+
+def require_user(authorization: Optional[str] = Header(None)) -> dict:
+    """Dependency resolving the bearer token to the current user's profile
+
+    Token verification and the profile lookup are both cached, so routes
+    using Depends(require_user) normally make no database round trip.
+    Treat the returned dict as read-only; it is shared with other requests.
+    """
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    token = authorization.replace("Bearer ", "")
+    payload = decode_access_token(token)
+    
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    try:
+        user = user_profile_cache.get_or_load(
+            payload['sub'], lambda: load_user_profile(payload['sub'])
+        )
+    except mysql.connector.Error as err:
+        raise HTTPException(status_code=500, detail=f"Database error: {err}")
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not user['is_active']:
+        raise HTTPException(status_code=403, detail="Account is inactive")
+    return user
+
+def auth_cache_stats():
+    return {
+        "verified_tokens": verified_token_cache.stats(),
+        "user_profiles": user_profile_cache.stats()
+    }
+
 # Signup
 @router.post("/signup", status_code=201)
 def signup(user_data: UserSignup):
     """Register a new user"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Check if user already exists
-        cursor.execute("SELECT id FROM users WHERE email = %s", (user_data.email,))
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
         # Truncate password if needed (bcrypt max is 72 bytes)
         password = user_data.password
         if len(password.encode('utf-8')) > 72:
             password = password[:72]
 
-        # Hash password
+        # Hash password on the argon2 pool before taking a DB connection
         password_hash = hash_password(password)
         
-        # Insert user
-        query = """
-            INSERT INTO users (email, password_hash, first_name, last_name, phone)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        cursor.execute(query, (
-            user_data.email,
-            password_hash,
-            user_data.first_name,
-            user_data.last_name,
-            user_data.phone
-        ))
-        
-        user_id = cursor.lastrowid
-        conn.commit()
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
         
-        # Create access token
-        token = create_access_token(data={"sub": user_data.email, "user_id": user_id})
+            # Check if user already exists
+            cursor.execute("SELECT id FROM users WHERE email = %s", (user_data.email,))
+            if cursor.fetchone():
+                raise HTTPException(status_code=400, detail="Email already registered")
         
-        cursor.close()
-        conn.close()
+            # Insert user
+            query = """
+                INSERT INTO users (email, password_hash, first_name, last_name, phone)
+                VALUES (%s, %s, %s, %s, %s)
+            """
+            cursor.execute(query, (
+                user_data.email,
+                password_hash,
+                user_data.first_name,
+                user_data.last_name,
+                user_data.phone
+            ))
+        
+            user_id = cursor.lastrowid
+            conn.commit()
+            invalidate_user_profile(user_data.email)
+        
+            # Create access token
+            token = create_access_token(data={"sub": user_data.email, "user_id": user_id})
+        
+            cursor.close()
         
         return {
             "success": True,
@@ -81,6 +152,8 @@ def signup(user_data: UserSignup):
             }
         }
     
+    except PasswordHasherBusy as err:
+        raise HTTPException(status_code=503, detail=str(err), headers={"Retry-After": "1"})
     except mysql.connector.Error as err:
         raise HTTPException(status_code=500, detail=f"Database error: {err}")
 
@@ -89,15 +162,17 @@ def signup(user_data: UserSignup):
 def login(credentials: UserLogin):
     """Login user"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
         
-        # Get user by email
-        cursor.execute(
-            "SELECT id, email, password_hash, first_name, last_name, is_active FROM users WHERE email = %s",
-            (credentials.email,)
-        )
-        user = cursor.fetchone()
+            # Get user by email
+            cursor.execute(
+                "SELECT id, email, password_hash, first_name, last_name, is_active FROM users WHERE email = %s",
+                (credentials.email,)
+            )
+            user = cursor.fetchone()
+        
+            cursor.close()
         
         if not user:
             raise HTTPException(status_code=401, detail="Invalid email or password")
@@ -105,23 +180,28 @@ def login(credentials: UserLogin):
         if not user['is_active']:
             raise HTTPException(status_code=403, detail="Account is inactive")
         
-        # Verify password
-        if not verify_password(credentials.password, user['password_hash']):
+        # Verify password on the argon2 pool, with no DB connection held
+        verified, new_hash = verify_and_update_password(credentials.password, user['password_hash'])
+        if not verified:
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        # Update last login
-        cursor.execute(
-            "UPDATE users SET last_login = NOW() WHERE id = %s",
-            (user['id'],)
-        )
-        conn.commit()
+        # Re-store the hash if its argon2 cost is outdated
+        if new_hash:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE users SET password_hash = %s WHERE id = %s",
+                    (new_hash, user['id'])
+                )
+                conn.commit()
+                cursor.close()
+        
+        # last_login is written behind, in bulk, off the response path
+        record_login(user['id'])
         
         # Create access token
         token = create_access_token(data={"sub": user['email'], "user_id": user['id']})
         
-        cursor.close()
-        conn.close()
-        
         return {
             "success": True,
             "access_token": token,
@@ -134,41 +214,50 @@ def login(credentials: UserLogin):
             }
         }
     
+    except PasswordHasherBusy as err:
+        raise HTTPException(status_code=503, detail=str(err), headers={"Retry-After": "1"})
     except mysql.connector.Error as err:
         raise HTTPException(status_code=500, detail=f"Database error: {err}")
 
 # Get Current User
 @router.get("/me")
-def get_current_user(authorization: Optional[str] = Header(None)):
+def get_current_user(user: dict = Depends(require_user)):
     """Get current logged-in user details"""
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    token = authorization.replace("Bearer ", "")
-    payload = decode_access_token(token)
+    return {
+        "success": True,
+        "user": user
+    }
+
+# Update Current User
+@router.put("/me")
+def update_current_user(update: ProfileUpdate, user: dict = Depends(require_user)):
+    """Update the logged-in user's name or phone"""
+    changes = update.model_dump(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="No fields to update")
     
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    # Names are NOT NULL; only phone may be cleared
+    for field in ("first_name", "last_name"):
+        if field in changes and changes[field] is None:
+            raise HTTPException(status_code=400, detail=f"{field} cannot be null")
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute(
-            "SELECT id, email, first_name, last_name, phone, created_at FROM users WHERE email = %s",
-            (payload['sub'],)
-        )
-        user = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
-        
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            
+            assignments = ", ".join(f"{field} = %s" for field in changes)
+            cursor.execute(
+                f"UPDATE users SET {assignments} WHERE id = %s",
+                (*changes.values(), user['id'])
+            )
+            conn.commit()
+            
+            cursor.close()
         
+        invalidate_user_profile(user['email'])
         return {
             "success": True,
-            "user": user
+            "user": {**user, **changes}
         }
     
     except mysql.connector.Error as err:
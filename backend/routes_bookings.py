@@ -1,15 +1,28 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Header
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from database import get_db_connection
 from pricing_engine import PricingEngine
+from cache import invalidate_flight_searches
+from idempotency import record_outcome, run_idempotent, request_fingerprint
+from ndjson import ndjson_response
+from fast_json import FastJSONResponse, row_layout, rows_as_dicts
+from pnr_allocator import pnr_allocator
+from seat_allocator import (
+    load_seat_map, claim_seats, release_seats, invalidate_seat_map, seat_index, seat_label
+)
+from metrics import BOOKINGS, PAYMENTS
 import mysql.connector
+import base64
+import functools
 import random
-import string
 
 router = APIRouter(prefix="/bookings", tags=["Bookings"])
 
+# Largest party accepted by POST /bookings/group
+MAX_GROUP_SIZE = 9
+
 # Pydantic Models
 class PassengerInfo(BaseModel):
     first_name: str = Field(..., min_length=1, max_length=50)
@@ -23,61 +36,156 @@ class BookingCreate(BaseModel):
     flight_id: int
     passenger: PassengerInfo
     seat_number: Optional[str] = None
+    seat_preference: Optional[str] = Field(None, pattern="^(window|aisle|middle)$")
+    payment_method: str = Field(..., pattern="^(credit_card|debit_card|upi|net_banking)$")
+
+class GroupBookingCreate(BaseModel):
+    flight_id: int
+    passengers: List[PassengerInfo] = Field(..., min_length=1, max_length=MAX_GROUP_SIZE)
     payment_method: str = Field(..., pattern="^(credit_card|debit_card|upi|net_banking)$")
 
+# Unique key on bookings (flight_id, active_seat) that arbitrates seat claims
+SEAT_UNIQUE_KEY = "uq_flight_active_seat"
+# Attempts at claiming a seat before giving up when concurrent bookers keep
+# taking the chosen one first
+SEAT_CLAIM_ATTEMPTS = 10
+# Allocated PNRs are unique among themselves but may hit a random PNR issued
+# before the allocator existed; such inserts are retried with the next one
+PNR_INSERT_ATTEMPTS = 5
+# GET /bookings page sizes
+BOOKINGS_PAGE_SIZE = 100
+MAX_BOOKINGS_PAGE_SIZE = 1000
+
 # Helper Functions
 def generate_pnr() -> str:
-    """Generate unique 6-character PNR"""
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+    """Allocate a unique 6-character PNR (no database lookup)"""
+    return pnr_allocator.next_pnr()
 
-def generate_seat_number(flight_id: int, cursor) -> str:
-    """Generate or assign available seat number"""
-    cursor.execute(
-        """
-        SELECT total_seats, 
-               (SELECT COUNT(*) FROM bookings WHERE flight_id = %s AND status != 'cancelled') as booked
-        FROM flights WHERE id = %s
-        """,
-        (flight_id, flight_id)
-    )
-    result = cursor.fetchone()
-    
-    if not result:
-        return None
-    
-    total_seats, booked = result
-    seats_per_row = 6
-    seat_letters = ['A', 'B', 'C', 'D', 'E', 'F']
-    
-    cursor.execute(
-        "SELECT seat_number FROM bookings WHERE flight_id = %s AND status != 'cancelled'",
-        (flight_id,)
-    )
-    booked_seats = {row[0] for row in cursor.fetchall() if row[0]}
-    
-    for seat_num in range(1, total_seats + 1):
-        row = (seat_num - 1) // seats_per_row + 1
-        seat_letter = seat_letters[(seat_num - 1) % seats_per_row]
-        seat = f"{row}{seat_letter}"
-        
-        if seat not in booked_seats:
-            return seat
-    
-    return None
+def is_duplicate_pnr(err: mysql.connector.Error) -> bool:
+    """True for a unique-key violation on bookings.pnr"""
+    message = str(err)
+    return err.errno == 1062 and ("'bookings.pnr'" in message or "key 'pnr'" in message)
 
 def simulate_payment(payment_method: str) -> tuple:
     """Simulate payment processing"""
     success = random.random() < 0.95
     
     if success:
+        PAYMENTS.inc(result="success")
         transaction_id = f"TXN{datetime.now().strftime('%Y%m%d%H%M%S')}{random.randint(1000, 9999)}"
         return True, transaction_id
     else:
+        PAYMENTS.inc(result="failure")
         return False, "PAYMENT_FAILED"
 
+def count_booking_outcomes(kind: str):
+    """Count a booking handler's results in bookings_total by outcome
+
+    confirmed on return, payment_failed on a 402, failed on anything else
+    (validation, sold-out, seat conflicts and database errors).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                result = func(*args, **kwargs)
+            except HTTPException as err:
+                outcome = "payment_failed" if err.status_code == 402 else "failed"
+                BOOKINGS.inc(kind=kind, outcome=outcome)
+                raise
+            except Exception:
+                BOOKINGS.inc(kind=kind, outcome="failed")
+                raise
+            BOOKINGS.inc(kind=kind, outcome="confirmed")
+            return result
+        return wrapper
+    return decorator
+
+def insert_booking(cursor, booking: BookingCreate, seat_number: str,
+                   booking_price, transaction_id: str) -> tuple:
+    """Insert a confirmed booking under a new PNR; returns (booking_id, pnr)
+
+    A failed INSERT only rolls back that statement, so a PNR collision can be
+    retried inside the caller's transaction.
+    """
+    for attempt in range(PNR_INSERT_ATTEMPTS):
+        pnr = generate_pnr()
+        try:
+            cursor.execute(
+                """
+                INSERT INTO bookings 
+                (pnr, flight_id, passenger_first_name, passenger_last_name, 
+                 passenger_email, passenger_phone, passenger_age, passenger_gender,
+                 seat_number, booking_price, status, payment_status, transaction_id)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                (
+                    pnr, booking.flight_id,
+                    booking.passenger.first_name, booking.passenger.last_name,
+                    booking.passenger.email, booking.passenger.phone,
+                    booking.passenger.age, booking.passenger.gender,
+                    seat_number, booking_price,
+                    'confirmed', 'completed', transaction_id
+                )
+            )
+            return cursor.lastrowid, pnr
+        except mysql.connector.IntegrityError as err:
+            if not is_duplicate_pnr(err) or attempt == PNR_INSERT_ATTEMPTS - 1:
+                raise
+
+def insert_group_bookings(cursor, flight_id: int, passengers, seat_numbers,
+                          booking_price, transaction_id: str) -> list:
+    """Insert one booking per passenger in a single statement; returns [(id, pnr)]"""
+    row_placeholder = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    for attempt in range(PNR_INSERT_ATTEMPTS):
+        pnrs = [generate_pnr() for _ in passengers]
+        params = []
+        for pnr, passenger, seat_number in zip(pnrs, passengers, seat_numbers):
+            params.extend((
+                pnr, flight_id,
+                passenger.first_name, passenger.last_name,
+                passenger.email, passenger.phone,
+                passenger.age, passenger.gender,
+                seat_number, booking_price,
+                'confirmed', 'completed', transaction_id
+            ))
+        try:
+            cursor.execute(
+                """
+                INSERT INTO bookings 
+                (pnr, flight_id, passenger_first_name, passenger_last_name, 
+                 passenger_email, passenger_phone, passenger_age, passenger_gender,
+                 seat_number, booking_price, status, payment_status, transaction_id)
+                VALUES """ + ", ".join([row_placeholder] * len(passengers)),
+                params
+            )
+            break
+        except mysql.connector.IntegrityError as err:
+            if not is_duplicate_pnr(err) or attempt == PNR_INSERT_ATTEMPTS - 1:
+                raise
+    
+    cursor.execute(
+        f"SELECT id, pnr FROM bookings WHERE pnr IN ({', '.join(['%s'] * len(pnrs))})",
+        pnrs
+    )
+    ids = {row['pnr']: row['id'] for row in cursor.fetchall()}
+    return [(ids[pnr], pnr) for pnr in pnrs]
+
 # POST - Create booking
 @router.post("/", status_code=201)
-def create_booking(booking: BookingCreate):
+def create_booking(booking: BookingCreate,
+                   idempotency_key: Optional[str] = Header(None, max_length=128)):
+    """Create a new booking; a retry with the same Idempotency-Key replays the first outcome"""
+    try:
+        return run_idempotent(
+            "create_booking", idempotency_key, request_fingerprint(booking),
+            lambda: create_booking_sync(booking), status_code=201
+        )
+    except mysql.connector.Error as err:
+        raise HTTPException(status_code=500, detail=f"Database error: {err}")
+
+@count_booking_outcomes("standard")
+def create_booking_sync(booking: BookingCreate):
     """Create a new booking with concurrency control"""
     conn = None
     cursor = None
@@ -112,30 +220,32 @@ def create_booking(booking: BookingCreate):
             conn.rollback()
             raise HTTPException(status_code=400, detail="Flight has already departed")
         
-        # Assign seat number
-        seat_number = booking.seat_number
-        if not seat_number:
-            cursor_temp = conn.cursor()
-            seat_number = generate_seat_number(booking.flight_id, cursor_temp)
-            cursor_temp.close()
+        # Assign seat from the flight's occupancy bitmap (flight row is locked above)
+        seat_cursor = conn.cursor()
+        seat_map = load_seat_map(seat_cursor, booking.flight_id, flight['total_seats'])
+        
+        if booking.seat_number:
+            try:
+                seat = seat_index(booking.seat_number)
+            except ValueError as err:
+                conn.rollback()
+                raise HTTPException(status_code=400, detail=str(err))
+            
+            if seat >= flight['total_seats']:
+                conn.rollback()
+                raise HTTPException(status_code=400, detail="Invalid seat number")
             
-            if not seat_number:
+            if not seat_map.is_free(seat):
+                conn.rollback()
+                raise HTTPException(status_code=400, detail="Seat already booked")
+        else:
+            seat = seat_map.first_free(booking.seat_preference or 'any')
+            
+            if seat is None:
                 conn.rollback()
                 raise HTTPException(status_code=400, detail="Unable to assign seat")
         
-        # Verify seat not taken
-        cursor.execute(
-            """
-            SELECT COUNT(*) as count 
-            FROM bookings 
-            WHERE flight_id = %s AND seat_number = %s AND status != 'cancelled'
-            """,
-            (booking.flight_id, seat_number)
-        )
-        
-        if cursor.fetchone()['count'] > 0:
-            conn.rollback()
-            raise HTTPException(status_code=400, detail="Seat already booked")
+        seat_number = seat_label(seat)
         
         # Process payment
         payment_success, transaction_id = simulate_payment(booking.payment_method)
@@ -144,40 +254,18 @@ def create_booking(booking: BookingCreate):
             conn.rollback()
             raise HTTPException(status_code=402, detail="Payment failed. Please try again.")
         
-        # Generate PNR
-        pnr = generate_pnr()
-        cursor.execute("SELECT COUNT(*) as count FROM bookings WHERE pnr = %s", (pnr,))
-        while cursor.fetchone()['count'] > 0:
-            pnr = generate_pnr()
-            cursor.execute("SELECT COUNT(*) as count FROM bookings WHERE pnr = %s", (pnr,))
-        
         booking_price = flight['current_price']
         
-        # Insert booking
-        cursor.execute(
-            """
-            INSERT INTO bookings 
-            (pnr, flight_id, passenger_first_name, passenger_last_name, 
-             passenger_email, passenger_phone, passenger_age, passenger_gender,
-             seat_number, booking_price, status, payment_status, transaction_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                pnr, booking.flight_id,
-                booking.passenger.first_name, booking.passenger.last_name,
-                booking.passenger.email, booking.passenger.phone,
-                booking.passenger.age, booking.passenger.gender,
-                seat_number, booking_price,
-                'confirmed', 'completed', transaction_id
-            )
-        )
+        # Insert booking under an allocated PNR
+        booking_id, pnr = insert_booking(cursor, booking, seat_number, booking_price, transaction_id)
         
-        booking_id = cursor.lastrowid
+        claim_seats(seat_cursor, booking.flight_id, seat_map, [seat])
+        seat_cursor.close()
         
         # Update flight available seats
         new_available_seats = flight['available_seats'] - 1
         cursor.execute(
-            "UPDATE flights SET available_seats = %s WHERE id = %s",
+            "UPDATE flights SET available_seats = %s, reprice_at = NOW() WHERE id = %s",
             (new_available_seats, booking.flight_id)
         )
         
@@ -196,11 +284,181 @@ def create_booking(booking: BookingCreate):
             (new_pricing['current_price'], booking.flight_id)
         )
         
+        result = {
+            "success": True,
+            "message": "Booking created successfully",
+            "booking": {
+                "id": booking_id,
+                "pnr": pnr,
+                "flight_number": flight['flight_number'],
+                "passenger_name": f"{booking.passenger.first_name} {booking.passenger.last_name}",
+                "seat_number": seat_number,
+                "booking_price": booking_price,
+                "status": "confirmed",
+                "transaction_id": transaction_id
+            }
+        }
+        # The Idempotency-Key outcome commits with the booking itself
+        record_outcome(cursor, result)
+        
         conn.commit()
+        invalidate_seat_map(booking.flight_id)
+        invalidate_flight_searches([booking.flight_id])
         
         cursor.close()
         conn.close()
         
+        return result
+    
+    except mysql.connector.IntegrityError as err:
+        if conn:
+            conn.rollback()
+        if SEAT_UNIQUE_KEY in str(err):
+            raise HTTPException(status_code=400, detail="Seat already booked")
+        raise HTTPException(status_code=500, detail=f"Database error: {err}")
+    
+    except mysql.connector.Error as err:
+        if conn:
+            conn.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {err}")
+    
+    except HTTPException:
+        if conn:
+            conn.rollback()
+        raise
+    
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+# POST - Create booking without locking the flight row
+@router.post("/optimistic", status_code=201)
+@count_booking_outcomes("optimistic")
+def create_booking_optimistic(booking: BookingCreate):
+    """Create a booking using an atomic inventory decrement instead of FOR UPDATE
+
+    The seat count is taken with a single conditional UPDATE and the seat is
+    claimed by inserting the booking under the unique (flight_id,
+    active_seat) key, so concurrent bookings on one flight only contend for
+    the duration of individual statements. Inventory is handed back if the
+    payment or the seat claim fails.
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            seat_cursor = conn.cursor()
+            
+            cursor.execute(
+                """
+                SELECT id, flight_number, departure_time, current_price,
+                       total_seats, base_price
+                FROM flights 
+                WHERE id = %s
+                """,
+                (booking.flight_id,)
+            )
+            flight = cursor.fetchone()
+            
+            if not flight:
+                raise HTTPException(status_code=404, detail="Flight not found")
+            
+            if flight['departure_time'] < datetime.now():
+                raise HTTPException(status_code=400, detail="Flight has already departed")
+            
+            requested_seat = None
+            if booking.seat_number:
+                try:
+                    requested_seat = seat_index(booking.seat_number)
+                except ValueError as err:
+                    raise HTTPException(status_code=400, detail=str(err))
+                if requested_seat >= flight['total_seats']:
+                    raise HTTPException(status_code=400, detail="Invalid seat number")
+            
+            # Take one seat of inventory; LAST_INSERT_ID(expr) hands the new
+            # count back to this connection without a second read
+            cursor.execute(
+                """
+                UPDATE flights
+                SET available_seats = LAST_INSERT_ID(available_seats - 1),
+                    reprice_at = NOW()
+                WHERE id = %s AND available_seats > 0
+                """,
+                (booking.flight_id,)
+            )
+            if cursor.rowcount == 0:
+                raise HTTPException(status_code=400, detail="No seats available")
+            new_available_seats = cursor.lastrowid
+            
+            try:
+                payment_success, transaction_id = simulate_payment(booking.payment_method)
+                
+                if not payment_success:
+                    raise HTTPException(status_code=402, detail="Payment failed. Please try again.")
+                
+                booking_price = flight['current_price']
+                seat_map = load_seat_map(seat_cursor, booking.flight_id, flight['total_seats'])
+                booking_id = seat = pnr = None
+                
+                for _ in range(SEAT_CLAIM_ATTEMPTS):
+                    if requested_seat is not None:
+                        seat = requested_seat
+                        if not seat_map.is_free(seat):
+                            raise HTTPException(status_code=400, detail="Seat already booked")
+                    else:
+                        seat = seat_map.first_free(booking.seat_preference or 'any')
+                        if seat is None:
+                            raise HTTPException(status_code=400, detail="Unable to assign seat")
+                    
+                    try:
+                        conn.start_transaction()
+                        booking_id, pnr = insert_booking(
+                            cursor, booking, seat_label(seat), booking_price, transaction_id
+                        )
+                        claim_seats(seat_cursor, booking.flight_id, seat_map, [seat])
+                        conn.commit()
+                        break
+                    except mysql.connector.IntegrityError as err:
+                        conn.rollback()
+                        if SEAT_UNIQUE_KEY not in str(err):
+                            raise
+                        # Another booker claimed this seat first
+                        seat_map.claim([seat])
+                        booking_id = None
+                
+                if booking_id is None:
+                    raise HTTPException(status_code=409, detail="Seat assignment contention, please retry")
+            
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                # Hand the seat of inventory back
+                cursor.execute(
+                    "UPDATE flights SET available_seats = available_seats + 1, reprice_at = NOW() WHERE id = %s",
+                    (booking.flight_id,)
+                )
+                raise
+            
+            engine = PricingEngine()
+            new_pricing = engine.calculate_price(
+                base_price=flight['base_price'],
+                total_seats=flight['total_seats'],
+                available_seats=new_available_seats,
+                departure_time=flight['departure_time'],
+                demand_level="medium"
+            )
+            cursor.execute(
+                "UPDATE flights SET current_price = %s WHERE id = %s",
+                (new_pricing['current_price'], booking.flight_id)
+            )
+            
+            seat_cursor.close()
+            cursor.close()
+        
+        invalidate_seat_map(booking.flight_id)
+        invalidate_flight_searches([booking.flight_id])
+        
         return {
             "success": True,
             "message": "Booking created successfully",
@@ -209,13 +467,140 @@ def create_booking(booking: BookingCreate):
                 "pnr": pnr,
                 "flight_number": flight['flight_number'],
                 "passenger_name": f"{booking.passenger.first_name} {booking.passenger.last_name}",
-                "seat_number": seat_number,
+                "seat_number": seat_label(seat),
                 "booking_price": booking_price,
                 "status": "confirmed",
                 "transaction_id": transaction_id
             }
         }
     
+    except mysql.connector.Error as err:
+        raise HTTPException(status_code=500, detail=f"Database error: {err}")
+
+# POST - Create a group booking
+@router.post("/group", status_code=201)
+@count_booking_outcomes("group")
+def create_group_booking(group: GroupBookingCreate):
+    """Book several passengers on one flight in a single transaction
+
+    Seats are assigned side by side where a row allows it, the party is
+    charged once, and the flight is repriced once for the whole group.
+    """
+    conn = None
+    cursor = None
+    party_size = len(group.passengers)
+    
+    try:
+        conn = get_db_connection()
+        conn.autocommit = False
+        cursor = conn.cursor(dictionary=True)
+        
+        # Lock flight row for update (concurrency control)
+        cursor.execute(
+            """
+            SELECT id, flight_number, departure_time, current_price,
+                   available_seats, total_seats, base_price
+            FROM flights 
+            WHERE id = %s 
+            FOR UPDATE
+            """,
+            (group.flight_id,)
+        )
+        
+        flight = cursor.fetchone()
+        
+        if not flight:
+            raise HTTPException(status_code=404, detail="Flight not found")
+        
+        if flight['available_seats'] < party_size:
+            conn.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Only {flight['available_seats']} seats available"
+            )
+        
+        if flight['departure_time'] < datetime.now():
+            conn.rollback()
+            raise HTTPException(status_code=400, detail="Flight has already departed")
+        
+        # Adjacent seats from the occupancy bitmap in one lookup
+        seat_cursor = conn.cursor()
+        seat_map = load_seat_map(seat_cursor, group.flight_id, flight['total_seats'])
+        seats = seat_map.first_free_block(party_size)
+        
+        if seats is None:
+            conn.rollback()
+            raise HTTPException(status_code=400, detail="Unable to assign seats")
+        
+        seat_numbers = [seat_label(seat) for seat in seats]
+        
+        # One payment for the whole party
+        payment_success, transaction_id = simulate_payment(group.payment_method)
+        
+        if not payment_success:
+            conn.rollback()
+            raise HTTPException(status_code=402, detail="Payment failed. Please try again.")
+        
+        booking_price = flight['current_price']
+        booked = insert_group_bookings(
+            cursor, group.flight_id, group.passengers, seat_numbers,
+            booking_price, transaction_id
+        )
+        
+        claim_seats(seat_cursor, group.flight_id, seat_map, seats)
+        seat_cursor.close()
+        
+        # One inventory update and one reprice for the group
+        new_available_seats = flight['available_seats'] - party_size
+        engine = PricingEngine()
+        new_pricing = engine.calculate_price(
+            base_price=flight['base_price'],
+            total_seats=flight['total_seats'],
+            available_seats=new_available_seats,
+            departure_time=flight['departure_time'],
+            demand_level="medium"
+        )
+        cursor.execute(
+            """
+            UPDATE flights
+            SET available_seats = %s, current_price = %s, reprice_at = NOW()
+            WHERE id = %s
+            """,
+            (new_available_seats, new_pricing['current_price'], group.flight_id)
+        )
+        
+        conn.commit()
+        invalidate_seat_map(group.flight_id)
+        invalidate_flight_searches([group.flight_id])
+        
+        return {
+            "success": True,
+            "message": f"Group booking for {party_size} passengers created successfully",
+            "flight_number": flight['flight_number'],
+            "transaction_id": transaction_id,
+            "total_price": booking_price * party_size,
+            "pnrs": [pnr for _, pnr in booked],
+            "bookings": [
+                {
+                    "id": booking_id,
+                    "pnr": pnr,
+                    "passenger_name": f"{passenger.first_name} {passenger.last_name}",
+                    "seat_number": seat_number,
+                    "booking_price": booking_price,
+                    "status": "confirmed"
+                }
+                for (booking_id, pnr), passenger, seat_number
+                in zip(booked, group.passengers, seat_numbers)
+            ]
+        }
+    
+    except mysql.connector.IntegrityError as err:
+        if conn:
+            conn.rollback()
+        if SEAT_UNIQUE_KEY in str(err):
+            raise HTTPException(status_code=400, detail="Seat already booked")
+        raise HTTPException(status_code=500, detail=f"Database error: {err}")
+    
     except mysql.connector.Error as err:
         if conn:
             conn.rollback()
@@ -237,28 +622,27 @@ def create_booking(booking: BookingCreate):
 def get_booking_by_pnr(pnr: str):
     """Get booking details by PNR"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+        
+            query = """
+                SELECT 
+                    b.id, b.pnr, b.flight_id, 
+                    b.passenger_first_name, b.passenger_last_name,
+                    b.passenger_email, b.passenger_phone,
+                    b.seat_number, b.booking_price, b.status,
+                    b.booking_time, b.payment_status, b.transaction_id,
+                    f.flight_number, f.airline, f.origin, f.destination,
+                    f.departure_time, f.arrival_time
+                FROM bookings b
+                JOIN flights f ON b.flight_id = f.id
+                WHERE b.pnr = %s
+            """
         
-        query = """
-            SELECT 
-                b.id, b.pnr, b.flight_id, 
-                b.passenger_first_name, b.passenger_last_name,
-                b.passenger_email, b.passenger_phone,
-                b.seat_number, b.booking_price, b.status,
-                b.booking_time, b.payment_status, b.transaction_id,
-                f.flight_number, f.airline, f.origin, f.destination,
-                f.departure_time, f.arrival_time
-            FROM bookings b
-            JOIN flights f ON b.flight_id = f.id
-            WHERE b.pnr = %s
-        """
-        
-        cursor.execute(query, (pnr.upper(),))
-        booking = cursor.fetchone()
+            cursor.execute(query, (pnr.upper(),))
+            booking = cursor.fetchone()
         
-        cursor.close()
-        conn.close()
+            cursor.close()
         
         if not booking:
             raise HTTPException(status_code=404, detail="Booking not found")
@@ -272,51 +656,112 @@ def get_booking_by_pnr(pnr: str):
         raise HTTPException(status_code=500, detail=f"Database error: {err}")
 
 # GET - Get all bookings
-@router.get("/")
+def encode_booking_cursor(booking_time: datetime, booking_id: int) -> str:
+    """Opaque cursor for the position after (booking_time, id)"""
+    raw = f"{booking_time.isoformat()}|{booking_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_booking_cursor(cursor: str) -> tuple:
+    """Cursor -> (booking_time, id); 400 if it was not issued by encode_booking_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        booking_time, booking_id = raw.split('|')
+        return datetime.fromisoformat(booking_time), int(booking_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def booking_list_query(email: Optional[str], status: Optional[str],
+                       after: Optional[tuple], limit: Optional[int]) -> tuple:
+    """Keyset query over (booking_time, id) DESC; returns (query, params)
+
+    Each filter has an index ending in booking_time (InnoDB appends the
+    primary key), so MySQL walks the index backwards from the cursor and
+    stops after `limit` rows instead of sorting every booking.
+    """
+    query = """
+        SELECT 
+            b.id, b.pnr, b.flight_id,
+            CONCAT(b.passenger_first_name, ' ', b.passenger_last_name) as passenger_name,
+            b.passenger_email, b.seat_number, b.booking_price,
+            b.status, b.booking_time,
+            f.flight_number, f.airline, f.origin, f.destination,
+            f.departure_time
+        FROM bookings b
+        JOIN flights f ON b.flight_id = f.id
+        WHERE 1=1
+    """
+    params = []
+
+    if email:
+        query += " AND b.passenger_email = %s"
+        params.append(email)
+
+    if status:
+        query += " AND b.status = %s"
+        params.append(status)
+
+    if after:
+        booking_time, booking_id = after
+        query += " AND (b.booking_time < %s OR (b.booking_time = %s AND b.id < %s))"
+        params.extend([booking_time, booking_time, booking_id])
+
+    query += " ORDER BY b.booking_time DESC, b.id DESC"
+
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    return query, params
+
+@router.get("/", response_class=FastJSONResponse)
 def get_bookings(
     email: Optional[str] = None,
-    status: Optional[str] = Query(None, pattern="^(confirmed|cancelled)$")
+    status: Optional[str] = Query(None, pattern="^(confirmed|cancelled)$"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_BOOKINGS_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False
 ):
-    """Get all bookings with optional filters"""
+    """Get bookings newest first, one page at a time, with optional filters
+
+    A page holds `limit` bookings (BOOKINGS_PAGE_SIZE by default), so a
+    response is not every match: keep passing `next_cursor` back as
+    `cursor` until it is null.
+    With `stream=true` every matching booking (up to `limit`, if given) is
+    sent as NDJSON, one booking per line.
+    """
+    after = decode_booking_cursor(cursor) if cursor else None
+
+    if stream:
+        query, params = booking_list_query(email, status, after, limit)
+        try:
+            return ndjson_response(query, params)
+        except mysql.connector.Error as err:
+            raise HTTPException(status_code=500, detail=f"Database error: {err}")
+
+    page_size = limit or BOOKINGS_PAGE_SIZE
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        query = """
-            SELECT 
-                b.id, b.pnr, b.flight_id,
-                CONCAT(b.passenger_first_name, ' ', b.passenger_last_name) as passenger_name,
-                b.passenger_email, b.seat_number, b.booking_price,
-                b.status, b.booking_time,
-                f.flight_number, f.airline, f.origin, f.destination,
-                f.departure_time
-            FROM bookings b
-            JOIN flights f ON b.flight_id = f.id
-            WHERE 1=1
-        """
-        params = []
-        
-        if email:
-            query += " AND b.passenger_email = %s"
-            params.append(email)
-        
-        if status:
-            query += " AND b.status = %s"
-            params.append(status)
-        
-        query += " ORDER BY b.booking_time DESC"
-        
-        cursor.execute(query, params)
-        bookings = cursor.fetchall()
+        with get_db_connection() as conn:
+            db_cursor = conn.cursor()
+            
+            # One extra row tells whether another page follows
+            query, params = booking_list_query(email, status, after, page_size + 1)
+            db_cursor.execute(query, params)
+            bookings = rows_as_dicts(row_layout(db_cursor), db_cursor.fetchall())
+            
+            db_cursor.close()
         
-        cursor.close()
-        conn.close()
+        next_cursor = None
+        if len(bookings) > page_size:
+            bookings = bookings[:page_size]
+            last = bookings[-1]
+            next_cursor = encode_booking_cursor(last["booking_time"], last["id"])
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "count": len(bookings),
-            "bookings": bookings
-        }
+            "bookings": bookings,
+            "next_cursor": next_cursor
+        })
     
     except mysql.connector.Error as err:
         raise HTTPException(status_code=500, detail=f"Database error: {err}")
@@ -348,8 +793,9 @@ def cancel_booking(pnr: str):
             conn.rollback()
             raise HTTPException(status_code=400, detail="Booking already cancelled")
         
+        # Lock the flight row before its seat map, in the same order as create_booking
         cursor.execute(
-            "SELECT departure_time FROM flights WHERE id = %s",
+            "SELECT departure_time, total_seats FROM flights WHERE id = %s FOR UPDATE",
             (booking['flight_id'],)
         )
         
@@ -367,11 +813,25 @@ def cancel_booking(pnr: str):
         )
         
         cursor.execute(
-            "UPDATE flights SET available_seats = available_seats + 1 WHERE id = %s",
+            "UPDATE flights SET available_seats = available_seats + 1, reprice_at = NOW() WHERE id = %s",
             (booking['flight_id'],)
         )
         
+        seat_map = None
+        if booking['seat_number']:
+            seat_cursor = conn.cursor()
+            seat_map = load_seat_map(seat_cursor, booking['flight_id'], flight['total_seats'])
+            try:
+                release_seats(seat_cursor, booking['flight_id'], seat_map,
+                              [seat_index(booking['seat_number'])])
+            except ValueError:
+                pass  # legacy seat number outside the A-F layout
+            seat_cursor.close()
+        
         conn.commit()
+        if seat_map is not None:
+            invalidate_seat_map(booking['flight_id'])
+        invalidate_flight_searches([booking['flight_id']])
         
         cursor.close()
         conn.close()
@@ -0,0 +1,355 @@
+"""
+Bookings Export
+Background jobs that write bookings joined with their flights for a date
+range to CSV or to a columnar .npz archive, for back-office reporting.
+
+Rows are read from an unbuffered server-side cursor in fixed-size batches
+on a dedicated connection (not the request pool), and each batch is written
+out before the next one is fetched, so memory use is one batch regardless
+of the export size.
+
+The .npz format is a zip of numpy arrays, one per column per row group of
+EXPORT_BATCH_SIZE rows, named like "rg00000/pnr". It loads with plain
+numpy: `np.load(path)["rg00000/pnr"]`. Prices are stored as integer
+paise, timestamps as datetime64[s] and missing strings as "".
+"""
+
+import csv
+import os
+import threading
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import mysql.connector
+import numpy as np
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+
+from database import DB_CONFIG
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+EXPORT_CONFIG = {
+    'directory': os.getenv('EXPORT_DIR', 'exports'),
+    'batch_size': int(os.getenv('EXPORT_BATCH_SIZE', 10000)),
+    'workers': int(os.getenv('EXPORT_WORKERS', 2)),
+    'retention_seconds': int(os.getenv('EXPORT_RETENTION_SECONDS', 86400))
+}
+EXPORT_FORMATS = {'csv': 'text/csv', 'npz': 'application/octet-stream'}
+
+# (column, kind); kind decides the numpy dtype in .npz exports
+EXPORT_COLUMNS = (
+    ('booking_id', 'int'),
+    ('pnr', 'str'),
+    ('status', 'str'),
+    ('payment_status', 'str'),
+    ('booking_price', 'money'),
+    ('booking_time', 'datetime'),
+    ('cancelled_at', 'datetime'),
+    ('passenger_first_name', 'str'),
+    ('passenger_last_name', 'str'),
+    ('passenger_email', 'str'),
+    ('seat_number', 'str'),
+    ('transaction_id', 'str'),
+    ('flight_id', 'int'),
+    ('flight_number', 'str'),
+    ('airline', 'str'),
+    ('origin', 'str'),
+    ('destination', 'str'),
+    ('departure_time', 'datetime'),
+    ('arrival_time', 'datetime')
+)
+
+EXPORT_QUERY = """
+    SELECT
+        b.id, b.pnr, b.status, b.payment_status, b.booking_price,
+        b.booking_time, b.cancelled_at,
+        b.passenger_first_name, b.passenger_last_name, b.passenger_email,
+        b.seat_number, b.transaction_id,
+        f.id, f.flight_number, f.airline, f.origin, f.destination,
+        f.departure_time, f.arrival_time
+    FROM bookings b
+    JOIN flights f ON b.flight_id = f.id
+    WHERE b.booking_time >= %s AND b.booking_time < %s
+"""
+EXPORT_COUNT_QUERY = """
+    SELECT COUNT(*) FROM bookings b
+    WHERE b.booking_time >= %s AND b.booking_time < %s
+"""
+
+
+class ExportCreate(BaseModel):
+    start_date: date
+    end_date: date
+    format: str = Field('csv', pattern="^(csv|npz)$")
+    status: Optional[str] = Field(None, pattern="^(confirmed|cancelled|pending)$")
+
+
+class ExportJob:
+    """State of one export, shared between its worker and the status endpoint"""
+
+    def __init__(self, request):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.status = "queued"
+        self.total_rows = None
+        self.rows_written = 0
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.path = os.path.join(EXPORT_CONFIG['directory'], f"bookings_{self.id}.{request.format}")
+
+    def to_dict(self):
+        done = self.status == "completed"
+        progress = None
+        if done:
+            progress = 1.0
+        elif self.total_rows:
+            progress = round(min(self.rows_written / self.total_rows, 1.0), 4)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "format": self.request.format,
+            "start_date": self.request.start_date.isoformat(),
+            "end_date": self.request.end_date.isoformat(),
+            "rows_written": self.rows_written,
+            "total_rows": self.total_rows,
+            "progress": progress,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "file_size": os.path.getsize(self.path) if done and os.path.exists(self.path) else None,
+            "download_url": f"/api/exports/{self.id}/download" if done else None,
+            "error": self.error
+        }
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_shutdown = threading.Event()
+
+_export_executor = None
+_export_executor_lock = threading.Lock()
+
+
+def get_export_executor():
+    """Bounded thread pool running export jobs, separate from the DB executor"""
+    global _export_executor
+    if _export_executor is None:
+        with _export_executor_lock:
+            if _export_executor is None:
+                # A new executor after a shutdown (e.g. app restart in-process) runs jobs again
+                _shutdown.clear()
+                _export_executor = ThreadPoolExecutor(
+                    max_workers=EXPORT_CONFIG['workers'],
+                    thread_name_prefix="export"
+                )
+    return _export_executor
+
+def shutdown_export_executor():
+    """Cancel queued exports and stop running ones after their current batch"""
+    global _export_executor
+    _shutdown.set()
+    if _export_executor is not None:
+        _export_executor.shutdown(wait=True, cancel_futures=True)
+        _export_executor = None
+
+
+# ---------------------------------------------------------------------------
+# Writers: one batch of tuple rows in, nothing kept afterwards
+# ---------------------------------------------------------------------------
+
+class CsvExportWriter:
+    def __init__(self, path):
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.writer(self._file, lineterminator='\n')
+        self._writer.writerow([name for name, _ in EXPORT_COLUMNS])
+
+    def write_batch(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+def _column_array(values, kind):
+    if kind == 'int':
+        return np.array(values, dtype=np.int64)
+    if kind == 'money':
+        return np.array([round(value * 100) for value in values], dtype=np.int64)
+    if kind == 'datetime':
+        return np.array(values, dtype='datetime64[s]')
+    return np.array(['' if value is None else value for value in values], dtype=str)
+
+class NpzExportWriter:
+    """Columnar row groups as deflated .npy members of one zip (.npz)"""
+
+    def __init__(self, path):
+        self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+        self._row_group = 0
+
+    def write_batch(self, rows):
+        columns = zip(*rows)
+        for (name, kind), values in zip(EXPORT_COLUMNS, columns):
+            member = f"rg{self._row_group:05d}/{name}.npy"
+            with self._zip.open(member, 'w', force_zip64=True) as stream:
+                np.lib.format.write_array(stream, _column_array(values, kind), allow_pickle=False)
+        self._row_group += 1
+
+    def close(self):
+        self._zip.close()
+
+EXPORT_WRITERS = {'csv': CsvExportWriter, 'npz': NpzExportWriter}
+
+
+# ---------------------------------------------------------------------------
+# Job execution
+# ---------------------------------------------------------------------------
+
+def _export_filters(request):
+    query, count_query = EXPORT_QUERY, EXPORT_COUNT_QUERY
+    params = [request.start_date, request.end_date + timedelta(days=1)]
+    if request.status:
+        query += " AND b.status = %s"
+        count_query += " AND b.status = %s"
+        params.append(request.status)
+    return query + " ORDER BY b.booking_time, b.id", count_query, params
+
+def run_export(job):
+    """Write the export file batch by batch; runs on the export executor"""
+    job.status = "running"
+    job.started_at = datetime.now()
+    query, count_query, params = _export_filters(job.request)
+    partial_path = job.path + ".part"
+    batch_size = EXPORT_CONFIG['batch_size']
+    connection = None
+    writer = None
+
+    try:
+        connection = mysql.connector.connect(**DB_CONFIG)
+        cursor = connection.cursor()
+        cursor.execute(count_query, params)
+        job.total_rows = cursor.fetchone()[0]
+        cursor.close()
+
+        writer = EXPORT_WRITERS[job.request.format](partial_path)
+        cursor = connection.cursor(buffered=False)
+        cursor.execute(query, params)
+        while True:
+            if _shutdown.is_set():
+                raise RuntimeError("Export cancelled by server shutdown")
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            writer.write_batch(rows)
+            job.rows_written += len(rows)
+        cursor.close()
+
+        writer.close()
+        writer = None
+        os.replace(partial_path, job.path)
+        job.status = "completed"
+        print(f"✅ Export {job.id} wrote {job.rows_written} bookings to {job.path}")
+
+    except Exception as err:
+        # Anything unhandled here would vanish into the unread future and
+        # leave the job "running" forever
+        job.status = "failed"
+        job.error = str(err) or type(err).__name__
+        print(f"❌ Export {job.id} failed: {err!r}")
+        try:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        except OSError as cleanup_err:
+            print(f"❌ Export {job.id} could not remove {partial_path}: {cleanup_err}")
+
+    finally:
+        job.finished_at = datetime.now()
+        if connection is not None:
+            try:
+                connection.close()
+            except mysql.connector.Error:
+                pass
+
+def _prune_jobs():
+    """Forget finished jobs past the retention period and delete their files"""
+    cutoff = datetime.now() - timedelta(seconds=EXPORT_CONFIG['retention_seconds'])
+    with _jobs_lock:
+        expired = [
+            job for job in _jobs.values()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job in expired:
+            del _jobs[job.id]
+    for job in expired:
+        if os.path.exists(job.path):
+            os.remove(job.path)
+
+def _get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+def export_stats():
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    counts = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+    for job in jobs:
+        counts[job.status] += 1
+    return {"workers": EXPORT_CONFIG['workers'], "batch_size": EXPORT_CONFIG['batch_size'], **counts}
+
+
+# ---------------------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------------------
+
+@router.post("/bookings", status_code=202)
+def create_bookings_export(request: ExportCreate):
+    """Start a bookings export for [start_date, end_date] (booking time, inclusive)"""
+    if request.end_date < request.start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+    _prune_jobs()
+    try:
+        os.makedirs(EXPORT_CONFIG['directory'], exist_ok=True)
+    except OSError as err:
+        raise HTTPException(status_code=500, detail=f"Export directory unavailable: {err}")
+
+    job = ExportJob(request)
+    with _jobs_lock:
+        _jobs[job.id] = job
+    get_export_executor().submit(run_export, job)
+
+    return {
+        "success": True,
+        "job": job.to_dict(),
+        "status_url": f"/api/exports/{job.id}"
+    }
+
+@router.get("/{job_id}")
+def get_export(job_id: str):
+    """Poll an export's progress"""
+    return {"success": True, "job": _get_job(job_id).to_dict()}
+
+@router.get("/{job_id}/download")
+def download_export(job_id: str):
+    """Download a completed export file"""
+    job = _get_job(job_id)
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Export is {job.status}")
+    if not os.path.exists(job.path):
+        raise HTTPException(status_code=410, detail="Export file is no longer available")
+    return FileResponse(
+        job.path,
+        media_type=EXPORT_FORMATS[job.request.format],
+        filename=os.path.basename(job.path)
+    )
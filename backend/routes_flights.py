@@ -1,10 +1,22 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from database import get_db_connection
+from ndjson import ndjson_response
+from fast_json import FastJSONResponse, row_layout, rows_as_dicts
 from pydantic import BaseModel, Field
 import mysql.connector
-from flight_generator import FlightGenerator
+import base64
+import json
+import threading
+from flight_generator import FlightGenerator, bulk_insert_flights
+from seat_allocator import SEAT_PREFERENCES, cached_seat_map, seat_label
+from metrics import GENERATED_FLIGHTS
+from cache import (
+    flight_search_cache, search_cache_key, search_tags,
+    invalidate_flight_searches, invalidate_route_searches
+)
 from datetime import datetime, date
 
 router = APIRouter(prefix="/flights", tags=["Flights"])
@@ -29,125 +41,277 @@ class FlightUpdate(BaseModel):
     available_seats: Optional[int] = None
 
 
+def day_bounds(departure_date):
+    """Half-open [start, end) datetime range covering one calendar day"""
+    if isinstance(departure_date, str):
+        departure_date = date.fromisoformat(departure_date)
+    start = datetime.combine(departure_date, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+def route_filters(origin=None, destination=None, departure_date=None):
+    """Sargable WHERE conditions for a route/date search (uses idx_route_departure)"""
+    conditions = []
+    params = []
+    
+    # Codes are stored upper-case; normalize the input instead of UPPER(column)
+    if origin:
+        conditions.append("origin = %s")
+        params.append(origin.upper())
+    
+    if destination:
+        conditions.append("destination = %s")
+        params.append(destination.upper())
+    
+    # Range on departure_time instead of DATE(departure_time)
+    if departure_date:
+        day_start, day_end = day_bounds(departure_date)
+        conditions.append("departure_time >= %s AND departure_time < %s")
+        params.extend([day_start, day_end])
+    
+    return conditions, params
+
+# In-process single-flight for on-demand generation: striped locks keyed by
+# (origin, destination, date) so memory stays bounded however many dates are searched
+GENERATION_LOCK_STRIPES = [threading.Lock() for _ in range(64)]
+GENERATION_DB_LOCK_TIMEOUT = 10  # seconds to wait for another process's generation
+
+def _count_flights(cursor, origin, destination, departure_date):
+    conditions, params = route_filters(origin, destination, departure_date)
+    cursor.execute(
+        "SELECT COUNT(*) as count FROM flights WHERE " + " AND ".join(conditions),
+        params
+    )
+    return cursor.fetchone()['count']
+
+def _generate_route(cursor, conn, generator, origin, destination, date_str, num_flights):
+    """Generate one (route, date) unless it already has flights; returns rows inserted
+    
+    An in-process lock serializes threads of this worker and a MySQL named
+    lock serializes other workers; the count is re-checked under both. The
+    lock key is the same whichever search triggered generation.
+    """
+    lock_key = f"{origin}:{destination}:{date_str}"
+    
+    with GENERATION_LOCK_STRIPES[hash(lock_key) % len(GENERATION_LOCK_STRIPES)]:
+        cursor.execute(
+            "SELECT GET_LOCK(%s, %s) as acquired",
+            (f"flight_gen:{lock_key}", GENERATION_DB_LOCK_TIMEOUT)
+        )
+        if cursor.fetchone()['acquired'] != 1:
+            return 0  # another worker is still generating; serve what exists
+        
+        try:
+            if _count_flights(cursor, origin, destination, date_str) > 0:
+                return 0  # generated while we waited for the lock
+            
+            new_flights = generator.generate_flights_for_route(
+                origin, destination, date_str, num_flights=num_flights
+            )
+            
+            # One multi-row INSERT instead of a round trip per flight
+            inserted = bulk_insert_flights(cursor, new_flights)
+            conn.commit()
+            if inserted:
+                # Every filter combination the new flights match, including
+                # origin-only and destination-only searches for the date
+                invalidate_route_searches(origin, destination, date_str)
+            return inserted
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s) as released", (f"flight_gen:{lock_key}",))
+            cursor.fetchone()
+
 def check_and_generate_flights(cursor, conn, origin=None, destination=None, departure_date=None):
-    """Check if flights exist for date, if not generate them"""
+    """Check if flights exist for date, if not generate them
+    
+    Generation is locked and re-checked per (route, date), so a date-only
+    search and a route search for the same day never both generate a route.
+    """
     
     if not departure_date:
         return  # Don't generate if no date specified
     
-    # Check if flights already exist for this date
-    query = "SELECT COUNT(*) as count FROM flights WHERE DATE(departure_time) = %s"
-    params = [departure_date]
+    # Fast path: flights already exist for this date
+    if _count_flights(cursor, origin, destination, departure_date) > 0:
+        return
     
-    if origin:
-        query += " AND UPPER(origin) = UPPER(%s)"
-        params.append(origin)
+    date_str = departure_date.strftime('%Y-%m-%d') if isinstance(departure_date, date) else departure_date
+    generator = FlightGenerator()
+    inserted = 0
+    for route_origin, route_destination, num_flights in generator.routes_for_date(date_str, origin, destination):
+        inserted += _generate_route(
+            cursor, conn, generator, route_origin, route_destination, date_str, num_flights
+        )
     
-    if destination:
-        query += " AND UPPER(destination) = UPPER(%s)"
-        params.append(destination)
+    if not inserted:
+        return
+    GENERATED_FLIGHTS.inc(inserted, source="on_demand")
+    print(f"✅ Generated {inserted} flights for {departure_date}")
+
+# Sort keys for flight search; ties are broken on id in the same direction
+SEARCH_SORT_COLUMNS = {
+    "price": "current_price",
+    "duration": "TIMESTAMPDIFF(MINUTE, departure_time, arrival_time)",
+    "departure": "departure_time"
+}
+SEARCH_SORT_FIELDS = {
+    "price": "current_price",
+    "duration": "duration_minutes",
+    "departure": "departure_time"
+}
+SEARCH_PAGE_SIZE = 50
+MAX_SEARCH_PAGE_SIZE = 500
+
+def encode_search_cursor(sort_by, order, flight):
+    """Opaque cursor for the position after `flight` in this sort"""
+    value = flight[SEARCH_SORT_FIELDS[sort_by]]
+    value = value.isoformat() if isinstance(value, datetime) else str(value)
+    raw = json.dumps([sort_by, order, value, flight["id"]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_search_cursor(cursor, sort_by, order):
+    """Cursor -> (sort value, id); 400 if malformed or issued for another sort"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, cursor_order, value, flight_id = json.loads(raw)
+        if (cursor_sort, cursor_order) != (sort_by, order):
+            raise ValueError("cursor belongs to a different sort")
+        if sort_by == "price":
+            value = Decimal(value)
+        elif sort_by == "duration":
+            value = int(value)
+        else:
+            value = datetime.fromisoformat(value)
+        return value, int(flight_id)
+    except (ValueError, TypeError, ArithmeticError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def build_search_query(origin, destination, departure_date, sort_by, order,
+                       after=None, limit=None):
+    """SQL and parameters for a flight search
+
+    Results are ordered by (sort key, id); `after` continues from a cursor
+    position with a keyset condition instead of an OFFSET.
+    """
+    query = """
+        SELECT 
+            id, flight_number, airline, origin, destination,
+            departure_time, arrival_time, base_price, current_price,
+            total_seats, available_seats, created_at,
+            TIMESTAMPDIFF(MINUTE, departure_time, arrival_time) as duration_minutes
+        FROM flights
+        WHERE departure_time > NOW()
+    """
     
-    cursor.execute(query, params)
-    result = cursor.fetchone()
+    # Add filters
+    conditions, params = route_filters(origin, destination, departure_date)
+    for condition in conditions:
+        query += f" AND {condition}"
     
-    # If no flights exist, generate them
-    if result['count'] == 0:
-        generator = FlightGenerator()
-        new_flights = generator.generate_flights_for_date(
-            departure_date.strftime('%Y-%m-%d') if isinstance(departure_date, date) else departure_date,
-            origin=origin,
-            destination=destination
+    sort_column = SEARCH_SORT_COLUMNS.get(sort_by, "current_price")
+    direction = "DESC" if order.lower() == "desc" else "ASC"
+    
+    # Resume after the cursor row
+    if after:
+        value, flight_id = after
+        comparison = "<" if direction == "DESC" else ">"
+        query += f" AND ({sort_column} {comparison} %s OR ({sort_column} = %s AND id {comparison} %s))"
+        params.extend([value, value, flight_id])
+    
+    # Add sorting
+    query += f" ORDER BY {sort_column} {direction}, id {direction}"
+    
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+    
+    return query, params
+
+def search_flights(origin, destination, departure_date, sort_by, order,
+                   after=None, limit=SEARCH_PAGE_SIZE):
+    """Run one page of a flight search (cache loader for get_flights)"""
+    with get_db_connection() as conn:
+        # Auto-generate flights if searching for future date
+        if departure_date:
+            cursor = conn.cursor(dictionary=True)
+            check_and_generate_flights(cursor, conn, origin, destination, departure_date)
+            cursor.close()
+        
+        # One extra row tells whether another page follows
+        query, params = build_search_query(
+            origin, destination, departure_date, sort_by, order, after, limit + 1
         )
         
-        # Insert generated flights
-        insert_query = """
-            INSERT INTO flights 
-            (flight_number, airline, origin, destination, departure_time, 
-             arrival_time, base_price, current_price, total_seats, available_seats, demand_level)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        for flight in new_flights:
-            cursor.execute(insert_query, (
-                flight['flight_number'],
-                flight['airline'],
-                flight['origin'],
-                flight['destination'],
-                flight['departure_time'],
-                flight['arrival_time'],
-                flight['base_price'],
-                flight['current_price'],
-                flight['total_seats'],
-                flight['available_seats'],
-                flight['demand_level']
-            ))
-        
-        conn.commit()
-        print(f"✅ Generated {len(new_flights)} flights for {departure_date}")
+        # Tuple rows; the dicts are built once here and cached as-is
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        flights = rows_as_dicts(row_layout(cursor), cursor.fetchall())
+        
+        cursor.close()
+    
+    next_cursor = None
+    if len(flights) > limit:
+        flights = flights[:limit]
+        next_cursor = encode_search_cursor(sort_by, order, flights[-1])
+    
+    return {
+        "success": True,
+        "count": len(flights),
+        "flights": flights,
+        "next_cursor": next_cursor
+    }
+
+def stream_search(origin, destination, departure_date, sort_by, order, after=None, limit=None):
+    """Flight search streamed as NDJSON without materializing the result
+    
+    Generation runs on a pooled connection that is returned before the
+    stream starts; ndjson_response owns the stream's own connection and
+    slot, and frees them even if the body is never read.
+    """
+    if departure_date:
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            check_and_generate_flights(cursor, conn, origin, destination, departure_date)
+            cursor.close()
+    
+    query, params = build_search_query(
+        origin, destination, departure_date, sort_by, order, after, limit
+    )
+    return ndjson_response(query, params)
 
 # GET all flights with filtering and sorting
-@router.get("/")
+@router.get("/", response_class=FastJSONResponse)
 def get_flights(
     origin: Optional[str] = Query(None, min_length=3, max_length=3),
     destination: Optional[str] = Query(None, min_length=3, max_length=3),
     departure_date: Optional[date] = None,
     sort_by: Optional[str] = Query("price", pattern="^(price|duration|departure)$"),
-    order: Optional[str] = Query("asc", pattern="^(asc|desc)$")
+    order: Optional[str] = Query("asc", pattern="^(asc|desc)$"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False
 ):
-    """Search flights with filters and auto-generate if needed"""
+    """Search flights with filters and auto-generate if needed
+
+    Returns one page; pass `next_cursor` back as `cursor` for the next one.
+    With `stream=true` all matches (up to `limit`, if given) are sent as NDJSON.
+    """
+    after = decode_search_cursor(cursor, sort_by, order) if cursor else None
+    
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Auto-generate flights if searching for future date
-        if departure_date:
-            check_and_generate_flights(cursor, conn, origin, destination, departure_date)
-        
-        # Base query
-        query = """
-            SELECT 
-                id, flight_number, airline, origin, destination,
-                departure_time, arrival_time, base_price, current_price,
-                total_seats, available_seats, created_at,
-                TIMESTAMPDIFF(MINUTE, departure_time, arrival_time) as duration_minutes
-            FROM flights
-            WHERE departure_time > NOW()
-        """
-        params = []
-        
-        # Add filters
-        if origin:
-            query += " AND UPPER(origin) = UPPER(%s)"
-            params.append(origin)
-        
-        if destination:
-            query += " AND UPPER(destination) = UPPER(%s)"
-            params.append(destination)
-        
-        if departure_date:
-            query += " AND DATE(departure_time) = %s"
-            params.append(departure_date)
-        
-        # Add sorting
-        sort_column_map = {
-            "price": "current_price",
-            "duration": "duration_minutes",
-            "departure": "departure_time"
-        }
-        sort_column = sort_column_map.get(sort_by, "current_price")
-        query += f" ORDER BY {sort_column} {order.upper()}"
-        
-        cursor.execute(query, params)
-        flights = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        return {
-            "success": True,
-            "count": len(flights),
-            "flights": flights
-        }
+        if stream:
+            return stream_search(origin, destination, departure_date, sort_by, order, after, limit)
+        
+        # Identical searches share one cached page; concurrent misses run one query
+        page_size = limit or SEARCH_PAGE_SIZE
+        key = search_cache_key(origin, destination, departure_date, sort_by, order,
+                               cursor=cursor, limit=page_size)
+        result = flight_search_cache.get_or_load(
+            key,
+            lambda: search_flights(origin, destination, departure_date, sort_by, order,
+                                   after, page_size),
+            tags=lambda result: search_tags(key, result)
+        )
+        return FastJSONResponse(result)
     
     except mysql.connector.Error as err:
         raise HTTPException(status_code=500, detail=f"Database error: {err}")
@@ -157,24 +321,23 @@ def get_flights(
 def get_flight_by_id(flight_id: int):
     """Get detailed information about a specific flight"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        query = """
-            SELECT 
-                id, flight_number, airline, origin, destination,
-                departure_time, arrival_time, base_price, current_price,
-                total_seats, available_seats, created_at,
-                TIMESTAMPDIFF(MINUTE, departure_time, arrival_time) as duration_minutes
-            FROM flights
-            WHERE id = %s
-        """
-        
-        cursor.execute(query, (flight_id,))
-        flight = cursor.fetchone()
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+        
+            query = """
+                SELECT 
+                    id, flight_number, airline, origin, destination,
+                    departure_time, arrival_time, base_price, current_price,
+                    total_seats, available_seats, created_at,
+                    TIMESTAMPDIFF(MINUTE, departure_time, arrival_time) as duration_minutes
+                FROM flights
+                WHERE id = %s
+            """
+        
+            cursor.execute(query, (flight_id,))
+            flight = cursor.fetchone()
         
-        cursor.close()
-        conn.close()
+            cursor.close()
         
         if not flight:
             raise HTTPException(status_code=404, detail="Flight not found")
@@ -187,6 +350,38 @@ def get_flight_by_id(flight_id: int):
     except mysql.connector.Error as err:
         raise HTTPException(status_code=500, detail=f"Database error: {err}")
 
+# GET seat availability for a flight
+@router.get("/{flight_id}/seat-availability")
+def get_seat_availability(flight_id: int):
+    """Free seat count and the seat each preference would be assigned"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT total_seats FROM flights WHERE id = %s", (flight_id,))
+            row = cursor.fetchone()
+            if not row:
+                cursor.close()
+                raise HTTPException(status_code=404, detail="Flight not found")
+            
+            seat_map = cached_seat_map(cursor, flight_id, row[0])
+            cursor.close()
+        
+        suggestions = {}
+        for preference in SEAT_PREFERENCES:
+            seat = seat_map.first_free(preference)
+            suggestions[preference] = seat_label(seat) if seat is not None else None
+        
+        return {
+            "success": True,
+            "flight_id": flight_id,
+            "total_seats": seat_map.total_seats,
+            "free_seats": seat_map.free_count,
+            "suggested_seats": suggestions
+        }
+    
+    except mysql.connector.Error as err:
+        raise HTTPException(status_code=500, detail=f"Database error: {err}")
+
 # POST - Create new flight
 @router.post("/", status_code=201)
 def create_flight(flight: FlightCreate):
@@ -204,29 +399,30 @@ def create_flight(flight: FlightCreate):
                 detail="Available seats cannot exceed total seats"
             )
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+        
+            query = """
+                INSERT INTO flights 
+                (flight_number, airline, origin, destination, departure_time, 
+                 arrival_time, base_price, current_price, total_seats, available_seats)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
+        
+            values = (
+                flight.flight_number, flight.airline, flight.origin.upper(),
+                flight.destination.upper(), flight.departure_time, flight.arrival_time,
+                flight.base_price, flight.base_price,
+                flight.total_seats, flight.available_seats
+            )
         
-        query = """
-            INSERT INTO flights 
-            (flight_number, airline, origin, destination, departure_time, 
-             arrival_time, base_price, current_price, total_seats, available_seats)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        values = (
-            flight.flight_number, flight.airline, flight.origin.upper(),
-            flight.destination.upper(), flight.departure_time, flight.arrival_time,
-            flight.base_price, flight.base_price,
-            flight.total_seats, flight.available_seats
-        )
+            cursor.execute(query, values)
+            conn.commit()
         
-        cursor.execute(query, values)
-        conn.commit()
+            flight_id = cursor.lastrowid
+            cursor.close()
         
-        flight_id = cursor.lastrowid
-        cursor.close()
-        conn.close()
+        invalidate_route_searches(flight.origin, flight.destination, flight.departure_time)
         
         return {
             "success": True,
@@ -242,48 +438,58 @@ def create_flight(flight: FlightCreate):
 def update_flight(flight_id: int, flight_update: FlightUpdate):
     """Update flight details"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
         
-        update_fields = []
-        values = []
+            update_fields = []
+            values = []
         
-        if flight_update.airline:
-            update_fields.append("airline = %s")
-            values.append(flight_update.airline)
+            if flight_update.airline:
+                update_fields.append("airline = %s")
+                values.append(flight_update.airline)
         
-        if flight_update.departure_time:
-            update_fields.append("departure_time = %s")
-            values.append(flight_update.departure_time)
+            if flight_update.departure_time:
+                update_fields.append("departure_time = %s")
+                values.append(flight_update.departure_time)
         
-        if flight_update.arrival_time:
-            update_fields.append("arrival_time = %s")
-            values.append(flight_update.arrival_time)
+            if flight_update.arrival_time:
+                update_fields.append("arrival_time = %s")
+                values.append(flight_update.arrival_time)
         
-        if flight_update.base_price:
-            update_fields.append("base_price = %s")
-            values.append(flight_update.base_price)
+            if flight_update.base_price:
+                update_fields.append("base_price = %s")
+                values.append(flight_update.base_price)
         
-        if flight_update.available_seats is not None:
-            update_fields.append("available_seats = %s")
-            values.append(flight_update.available_seats)
+            if flight_update.available_seats is not None:
+                update_fields.append("available_seats = %s")
+                values.append(flight_update.available_seats)
         
-        if not update_fields:
-            raise HTTPException(status_code=400, detail="No fields to update")
+            if not update_fields:
+                raise HTTPException(status_code=400, detail="No fields to update")
         
-        values.append(flight_id)
-        query = f"UPDATE flights SET {', '.join(update_fields)} WHERE id = %s"
+            # Price inputs changed: queue the flight for the next repricing pass
+            if (flight_update.departure_time or flight_update.base_price
+                    or flight_update.available_seats is not None):
+                update_fields.append("reprice_at = NOW()")
         
-        cursor.execute(query, values)
-        conn.commit()
+            values.append(flight_id)
+            query = f"UPDATE flights SET {', '.join(update_fields)} WHERE id = %s"
         
-        if cursor.rowcount == 0:
-            cursor.close()
-            conn.close()
-            raise HTTPException(status_code=404, detail="Flight not found")
+            cursor.execute(query, values)
+            conn.commit()
         
-        cursor.close()
-        conn.close()
+            if cursor.rowcount == 0:
+                cursor.close()
+                raise HTTPException(status_code=404, detail="Flight not found")
+        
+            invalidate_flight_searches([flight_id])
+            if flight_update.departure_time:
+                # The flight may now match searches for a different date
+                cursor.execute("SELECT origin, destination FROM flights WHERE id = %s", (flight_id,))
+                flight_origin, flight_destination = cursor.fetchone()
+                invalidate_route_searches(flight_origin, flight_destination, flight_update.departure_time)
+        
+            cursor.close()
         
         return {
             "success": True,
@@ -298,33 +504,32 @@ def update_flight(flight_id: int, flight_update: FlightUpdate):
 def delete_flight(flight_id: int):
     """Delete a flight"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT COUNT(*) as count FROM bookings WHERE flight_id = %s",
-            (flight_id,)
-        )
-        result = cursor.fetchone()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
         
-        if result[0] > 0:
-            cursor.close()
-            conn.close()
-            raise HTTPException(
-                status_code=400,
-                detail="Cannot delete flight with existing bookings"
+            cursor.execute(
+                "SELECT COUNT(*) as count FROM bookings WHERE flight_id = %s",
+                (flight_id,)
             )
+            result = cursor.fetchone()
+        
+            if result[0] > 0:
+                cursor.close()
+                raise HTTPException(
+                    status_code=400,
+                    detail="Cannot delete flight with existing bookings"
+                )
         
-        cursor.execute("DELETE FROM flights WHERE id = %s", (flight_id,))
-        conn.commit()
+            cursor.execute("DELETE FROM flights WHERE id = %s", (flight_id,))
+            conn.commit()
+        
+            if cursor.rowcount == 0:
+                cursor.close()
+                raise HTTPException(status_code=404, detail="Flight not found")
         
-        if cursor.rowcount == 0:
             cursor.close()
-            conn.close()
-            raise HTTPException(status_code=404, detail="Flight not found")
         
-        cursor.close()
-        conn.close()
+        invalidate_flight_searches([flight_id])
         
         return {
             "success": True,
@@ -1,8 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
-from database import get_db_connection
+from database import get_db_connection, run_db
+from cache import TTLCache
+from idempotency import record_outcome, run_idempotent, request_fingerprint
+from fast_json import FastJSONResponse, row_layout, rows_as_dicts
 import mysql.connector
+import os
+import random
+import re
+import threading
+import time
 
 router = APIRouter()
 
@@ -22,12 +31,145 @@ class SeatReservation(BaseModel):
 class ReserveSeatsRequest(BaseModel):
     seats: List[SeatReservation]
 
-# Get all seats for a specific flight
-@router.get("/flights/{flight_id}/seats")
-async def get_flight_seats(flight_id: int):
-    try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
+# Encoded seat maps keyed by (flight_id, version); a reservation bumps the
+# version, so stale entries are never served and simply age out
+encoded_seat_maps = TTLCache(
+    maxsize=int(os.getenv('SEAT_MAP_PAYLOAD_CACHE_SIZE', 1024)),
+    ttl=float(os.getenv('SEAT_MAP_PAYLOAD_CACHE_TTL_SECONDS', 300))
+)
+
+# Retry policy for reserve_seats when InnoDB aborts or times out on row locks
+RESERVATION_RETRY_CONFIG = {
+    'max_attempts': int(os.getenv('SEAT_RESERVATION_MAX_ATTEMPTS', 4)),
+    'backoff_seconds': float(os.getenv('SEAT_RESERVATION_RETRY_BACKOFF', 0.02))
+}
+RETRYABLE_LOCK_ERRORS = {
+    1213: "deadlocks",            # ER_LOCK_DEADLOCK
+    1205: "lock_wait_timeouts"    # ER_LOCK_WAIT_TIMEOUT
+}
+
+_reservation_stats = {
+    "reservations": 0,
+    "attempts": 0,
+    "retries": 0,
+    "deadlocks": 0,
+    "lock_wait_timeouts": 0,
+    "retries_exhausted": 0,
+    "failures": 0
+}
+_reservation_stats_lock = threading.Lock()
+
+def _record_reservation(counter):
+    with _reservation_stats_lock:
+        _reservation_stats[counter] += 1
+
+def seat_reservation_stats():
+    """Reservation counters, including deadlock/lock-wait retries"""
+    with _reservation_stats_lock:
+        return dict(_reservation_stats)
+
+_SEAT_NUMBER = re.compile(r"^(\d+)([A-Z])$")
+
+def _runs(values):
+    """Run-length encode a sequence into [value, count] pairs"""
+    runs = []
+    for value in values:
+        if runs and runs[-1][0] == value:
+            runs[-1][1] += 1
+        else:
+            runs.append([value, 1])
+    return runs
+
+def _layout(seat_numbers):
+    """Row/letter template reproducing `seat_numbers` in order, or None"""
+    parsed = [_SEAT_NUMBER.match(number or '') for number in seat_numbers]
+    if not parsed or not all(parsed):
+        return None
+    letters = ''.join(sorted({match.group(2) for match in parsed}))
+    first_row = int(parsed[0].group(1))
+    for index, match in enumerate(parsed):
+        row, letter = divmod(index, len(letters))
+        if int(match.group(1)) != first_row + row or match.group(2) != letters[letter]:
+            return None
+    return {"first_row": first_row, "letters": letters}
+
+def encode_seat_map(flight_id, version, rows):
+    """Compact seat map for rows of (seat_id, seat_number, seat_type, price, is_available)
+
+    Seats are listed in seat_id order: ids as [start, count] runs, numbers as
+    a row/letter template (explicit list if irregular), types as runs with a
+    per-type price table, and availability as alternating run lengths
+    starting with available seats.
+    """
+    seat_ids = []
+    for seat_id, *_ in rows:
+        if seat_ids and seat_ids[-1][0] + seat_ids[-1][1] == seat_id:
+            seat_ids[-1][1] += 1
+        else:
+            seat_ids.append([seat_id, 1])
+
+    seat_numbers = [row[1] for row in rows]
+    layout = _layout(seat_numbers)
+
+    prices = {}
+    price_overrides = {}
+    for index, (_, _, seat_type, price, _) in enumerate(rows):
+        price = float(price)
+        if prices.setdefault(seat_type, price) != price:
+            price_overrides[index] = price
+
+    availability = [0]
+    run_available = True
+    for row in rows:
+        if bool(row[4]) != run_available:
+            availability.append(0)
+            run_available = not run_available
+        availability[-1] += 1
+
+    payload = {
+        "success": True,
+        "flight_id": flight_id,
+        "version": version,
+        "count": len(rows),
+        "seat_ids": seat_ids,
+        "layout": layout,
+        "types": _runs(row[2] for row in rows),
+        "prices": prices,
+        "availability": availability
+    }
+    if layout is None:
+        payload["seat_numbers"] = seat_numbers
+    if price_overrides:
+        payload["price_overrides"] = price_overrides
+    return payload
+
+def seat_map_etag(flight_id, version):
+    return f'"seatmap-{flight_id}-{version}"'
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or any(
+        (tag[2:] if tag.startswith('W/') else tag) == etag for tag in candidates
+    )
+
+def bump_seat_map_versions(cursor, flight_ids):
+    """Advance the seat map version of each flight inside the caller's transaction"""
+    for flight_id in sorted(set(flight_ids)):
+        cursor.execute(
+            """
+            INSERT INTO seat_map_versions (flight_id, version) VALUES (%s, 1)
+            ON DUPLICATE KEY UPDATE version = version + 1
+            """,
+            (flight_id,)
+        )
+
+# Blocking data access, run on the shared DB executor via run_db
+def fetch_flight_seats(flight_id: int):
+    """Fetch every seat of a flight"""
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
         
         query = """
             SELECT 
@@ -42,17 +184,114 @@ async def get_flight_seats(flight_id: int):
             ORDER BY seat_number
         """
         
+        cursor.execute(query, (flight_id,))
+        seats = rows_as_dicts(row_layout(cursor), cursor.fetchall())
+        
+        cursor.close()
+    return seats
+
+def fetch_available_seats(flight_id: int):
+    """Fetch the unreserved seats of a flight"""
+    with get_db_connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        
+        query = """
+            SELECT * FROM seats 
+            WHERE flight_id = %s AND is_available = TRUE 
+            ORDER BY seat_number
+        """
+        
         cursor.execute(query, (flight_id,))
         seats = cursor.fetchall()
         
         cursor.close()
-        connection.close()
+    return seats
+
+def fetch_seat_map(flight_id: int, if_none_match: Optional[str] = None):
+    """Return (etag, encoded map); the map is None when the client's copy is current"""
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
         
-        return {
+        cursor.execute(
+            "SELECT version FROM seat_map_versions WHERE flight_id = %s",
+            (flight_id,)
+        )
+        row = cursor.fetchone()
+        version = row[0] if row else 0
+        etag = seat_map_etag(flight_id, version)
+        
+        if _etag_matches(if_none_match, etag):
+            cursor.close()
+            return etag, None
+        
+        payload = encoded_seat_maps.get((flight_id, version))
+        if payload is None:
+            # Read after the version, so the map is never older than its tag
+            cursor.execute(
+                """
+                SELECT seat_id, seat_number, seat_type, price, is_available
+                FROM seats
+                WHERE flight_id = %s
+                ORDER BY seat_id
+                """,
+                (flight_id,)
+            )
+            payload = encode_seat_map(flight_id, version, cursor.fetchall())
+            encoded_seat_maps.set((flight_id, version), payload)
+        
+        cursor.close()
+    return etag, payload
+
+def fetch_booking_seats(booking_id: int):
+    """Fetch the seats attached to a booking"""
+    with get_db_connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        
+        query = """
+            SELECT 
+                bs.booking_seat_id,
+                bs.passenger_name,
+                s.seat_number,
+                s.seat_type,
+                s.price
+            FROM booking_seats bs
+            JOIN seats s ON bs.seat_id = s.seat_id
+            WHERE bs.booking_id = %s
+        """
+        
+        cursor.execute(query, (booking_id,))
+        seats = cursor.fetchall()
+        
+        cursor.close()
+    return seats
+
+# Get all seats for a specific flight
+@router.get("/flights/{flight_id}/seats", response_class=FastJSONResponse)
+async def get_flight_seats(flight_id: int):
+    try:
+        seats = await run_db(fetch_flight_seats, flight_id)
+        
+        return FastJSONResponse({
             "success": True,
             "seats": seats,
             "count": len(seats)
-        }
+        })
+        
+    except mysql.connector.Error as err:
+        raise HTTPException(status_code=500, detail=f"Database error: {err}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Compact seat map with ETag revalidation
+@router.get("/flights/{flight_id}/seats/map")
+async def get_seat_map(flight_id: int, if_none_match: Optional[str] = Header(None)):
+    try:
+        etag, payload = await run_db(fetch_seat_map, flight_id, if_none_match)
+        
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if payload is None:
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(content=payload, headers=headers)
         
     except mysql.connector.Error as err:
         raise HTTPException(status_code=500, detail=f"Database error: {err}")
@@ -63,20 +302,7 @@ async def get_flight_seats(flight_id: int):
 @router.get("/flights/{flight_id}/seats/available")
 async def get_available_seats(flight_id: int):
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        query = """
-            SELECT * FROM seats 
-            WHERE flight_id = %s AND is_available = TRUE 
-            ORDER BY seat_number
-        """
-        
-        cursor.execute(query, (flight_id,))
-        seats = cursor.fetchall()
-        
-        cursor.close()
-        connection.close()
+        seats = await run_db(fetch_available_seats, flight_id)
         
         return {
             "success": True,
@@ -90,123 +316,139 @@ async def get_available_seats(flight_id: int):
 
 # Reserve seats for a booking
 @router.post("/bookings/{booking_id}/seats")
-async def reserve_seats(booking_id: int, request: ReserveSeatsRequest):
-    connection = None
-    cursor = None
-    
+async def reserve_seats(booking_id: int, request: ReserveSeatsRequest,
+                        idempotency_key: Optional[str] = Header(None, max_length=128)):
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        # Start transaction
-        connection.start_transaction()
-        
-        if not request.seats or len(request.seats) == 0:
-            raise HTTPException(status_code=400, detail="No seats provided")
+        return await run_db(
+            run_idempotent, f"reserve_seats:{booking_id}", idempotency_key,
+            request_fingerprint(booking_id, request),
+            lambda: reserve_seats_sync(booking_id, request)
+        )
+    except mysql.connector.Error as err:
+        raise HTTPException(status_code=500, detail=f"Database error: {err}")
+
+def reserve_seats_sync(booking_id: int, request: ReserveSeatsRequest):
+    """Transactional seat reservation (blocking, runs on the DB executor)
+
+    Retried with jittered backoff when MySQL reports a deadlock or a lock
+    wait timeout; every attempt starts a fresh transaction.
+    """
+    if not request.seats or len(request.seats) == 0:
+        raise HTTPException(status_code=400, detail="No seats provided")
+    
+    seat_ids = [seat.seatId for seat in request.seats]
+    if len(set(seat_ids)) != len(seat_ids):
+        raise HTTPException(status_code=400, detail="Duplicate seats in request")
+    
+    max_attempts = max(1, RESERVATION_RETRY_CONFIG['max_attempts'])
+    for attempt in range(1, max_attempts + 1):
+        _record_reservation("attempts")
+        try:
+            result = _reserve_seats_once(booking_id, request)
+            _record_reservation("reservations")
+            return result
         
-        total_seat_price = 0.0
+        except mysql.connector.Error as err:
+            retryable = err.errno in RETRYABLE_LOCK_ERRORS
+            if retryable:
+                _record_reservation(RETRYABLE_LOCK_ERRORS[err.errno])
+            if retryable and attempt < max_attempts:
+                _record_reservation("retries")
+                backoff = RESERVATION_RETRY_CONFIG['backoff_seconds'] * 2 ** (attempt - 1)
+                time.sleep(backoff * random.uniform(0.5, 1.5))
+                continue
+            _record_reservation("retries_exhausted" if retryable else "failures")
+            raise HTTPException(status_code=500, detail=f"Database error: {err}")
+
+def _reserve_seats_once(booking_id: int, request: ReserveSeatsRequest):
+    """One reservation attempt: 4-5 statements regardless of the seat count"""
+    with get_db_connection() as connection:
+        cursor = connection.cursor(dictionary=True)
         
-        # Lock and check seat availability
-        for seat in request.seats:
-            # Check if seat is available (with row lock)
-            check_query = """
-                SELECT * FROM seats 
-                WHERE seat_id = %s AND is_available = TRUE 
+        try:
+            connection.start_transaction()
+            
+            # Lock every requested seat in one statement, in seat_id order, so
+            # overlapping reservations always acquire row locks in the same order
+            seat_ids = sorted(seat.seatId for seat in request.seats)
+            placeholders = ", ".join(["%s"] * len(seat_ids))
+            cursor.execute(
+                f"""
+                SELECT seat_id, flight_id, price, is_available
+                FROM seats
+                WHERE seat_id IN ({placeholders})
+                ORDER BY seat_id
                 FOR UPDATE
-            """
-            cursor.execute(check_query, (seat.seatId,))
-            seat_data = cursor.fetchone()
+                """,
+                seat_ids
+            )
+            locked = {row['seat_id']: row for row in cursor.fetchall()}
             
-            if not seat_data:
-                connection.rollback()
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Seat {seat.seatId} is not available"
-                )
+            for seat_id in seat_ids:
+                seat_data = locked.get(seat_id)
+                if not seat_data or not seat_data['is_available']:
+                    connection.rollback()
+                    raise HTTPException(
+                        status_code=400, 
+                        detail=f"Seat {seat_id} is not available"
+                    )
             
-            total_seat_price += float(seat_data['price'])
+            total_seat_price = sum(float(row['price']) for row in locked.values())
             
-            # Mark seat as unavailable
-            update_seat_query = """
-                UPDATE seats 
-                SET is_available = FALSE 
-                WHERE seat_id = %s
-            """
-            cursor.execute(update_seat_query, (seat.seatId,))
+            # Mark seats as unavailable
+            cursor.execute(
+                f"UPDATE seats SET is_available = FALSE WHERE seat_id IN ({placeholders})",
+                seat_ids
+            )
             
             # Add to booking_seats
-            insert_booking_seat_query = """
-                INSERT INTO booking_seats (booking_id, seat_id, passenger_name) 
-                VALUES (%s, %s, %s)
-            """
             cursor.execute(
-                insert_booking_seat_query, 
-                (booking_id, seat.seatId, seat.passengerName)
+                "INSERT INTO booking_seats (booking_id, seat_id, passenger_name) VALUES "
+                + ", ".join(["(%s, %s, %s)"] * len(request.seats)),
+                [
+                    value
+                    for seat in request.seats
+                    for value in (booking_id, seat.seatId, seat.passengerName)
+                ]
             )
+            
+            # Update booking total price
+            update_booking_query = """
+                UPDATE bookings 
+                SET booking_price = booking_price + %s 
+                WHERE id = %s
+            """
+            cursor.execute(update_booking_query, (total_seat_price, booking_id))
+            
+            # Invalidate cached seat maps (ETags) of every affected flight
+            bump_seat_map_versions(cursor, (row['flight_id'] for row in locked.values()))
+            
+            result = {
+                "success": True,
+                "message": "Seats reserved successfully",
+                "total_seat_price": total_seat_price,
+                "seats_reserved": len(request.seats)
+            }
+            # The Idempotency-Key outcome commits with the reservation itself
+            record_outcome(cursor, result)
+            
+            connection.commit()
         
-        # Update booking total price
-        update_booking_query = """
-            UPDATE bookings 
-            SET booking_price = booking_price + %s 
-            WHERE id = %s
-        """
-        cursor.execute(update_booking_query, (total_seat_price, booking_id))
-        
-        # Commit transaction
-        connection.commit()
-        
-        cursor.close()
-        connection.close()
-        
-        return {
-            "success": True,
-            "message": "Seats reserved successfully",
-            "total_seat_price": total_seat_price,
-            "seats_reserved": len(request.seats)
-        }
+        except BaseException:
+            if connection.in_transaction:
+                connection.rollback()
+            raise
         
-    except HTTPException as he:
-        if connection:
-            connection.rollback()
-        raise he
-    except mysql.connector.Error as err:
-        if connection:
-            connection.rollback()
-        raise HTTPException(status_code=500, detail=f"Database error: {err}")
-    except Exception as e:
-        if connection:
-            connection.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if cursor:
+        finally:
             cursor.close()
-        if connection:
-            connection.close()
+    
+    return result
 
 # Get seats for a specific booking
 @router.get("/bookings/{booking_id}/seats")
 async def get_booking_seats(booking_id: int):
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        query = """
-            SELECT 
-                bs.booking_seat_id,
-                bs.passenger_name,
-                s.seat_number,
-                s.seat_type,
-                s.price
-            FROM booking_seats bs
-            JOIN seats s ON bs.seat_id = s.seat_id
-            WHERE bs.booking_id = %s
-        """
-        
-        cursor.execute(query, (booking_id,))
-        seats = cursor.fetchall()
-        
-        cursor.close()
-        connection.close()
+        seats = await run_db(fetch_booking_seats, booking_id)
         
         return {
             "success": True,
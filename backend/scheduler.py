@@ -0,0 +1,270 @@
+"""
+Background Repricing Scheduler
+Runs incremental repricing on a fixed cadence inside the API process
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import schedule
+
+from cache import invalidate_flight_searches
+from database import get_db_connection
+from idempotency import IDEMPOTENCY_CONFIG, purge_expired_keys
+from metrics import GENERATED_FLIGHTS, REPRICED_FLIGHTS, REPRICING_PASS_SECONDS
+from pricing_engine import incremental_update_prices, simulate_demand_shifts
+from pregenerate_flights import pregenerate_schedule
+
+# Scheduler configuration
+SCHEDULER_CONFIG = {
+    'enabled': os.getenv('REPRICING_ENABLED', 'true').lower() == 'true',
+    'interval_seconds': int(os.getenv('REPRICING_INTERVAL_SECONDS', 300)),
+    'workers': int(os.getenv('REPRICING_WORKERS', 4)),
+    'demand_shift_rate': float(os.getenv('REPRICING_DEMAND_SHIFT_RATE', 0.1)),
+    'pregeneration_days': int(os.getenv('PREGENERATION_DAYS', 90)),   # 0 disables
+    'pregeneration_at': os.getenv('PREGENERATION_AT', '02:00')        # daily, local time
+}
+
+# MySQL named locks so only one API process runs each job at a time
+REPRICING_LOCK_NAME = "flight_booking.repricing"
+PREGENERATION_LOCK_NAME = "flight_booking.pregeneration"
+
+
+def shard_id_range(first_id, last_id, shards):
+    """Split [first_id, last_id] into at most `shards` contiguous id ranges"""
+    if first_id is None or last_id is None:
+        return []
+    span = last_id - first_id + 1
+    shards = max(1, min(shards, span))
+    step = -(-span // shards)  # ceiling division
+    return [
+        (start, min(start + step - 1, last_id))
+        for start in range(first_id, last_id + 1, step)
+    ]
+
+
+class RepricingScheduler:
+    """Run incremental repricing passes in a background thread"""
+
+    def __init__(self, interval_seconds=300, workers=4, demand_shift_rate=0.1,
+                 pregeneration_days=90, pregeneration_at="02:00",
+                 idempotency_purge_seconds=3600):
+        self.interval_seconds = interval_seconds
+        self.workers = workers
+        self.demand_shift_rate = demand_shift_rate
+        self.pregeneration_days = pregeneration_days
+        self.pregeneration_at = pregeneration_at
+        self.idempotency_purge_seconds = idempotency_purge_seconds
+        self._last_pregeneration = None
+        self._last_idempotency_purge = None
+
+        self._scheduler = schedule.Scheduler()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pass_lock = threading.Lock()
+        self._executor = None
+
+        self._stats = {
+            "runs": 0,
+            "overlaps_skipped": 0,
+            "failures": 0,
+            "last_started_at": None,
+            "last_duration_seconds": None,
+            "last_rows_updated": None,
+            "last_rows_skipped": None,
+            "last_shards": None,
+            "last_overran_interval": None,
+            "last_error": None
+        }
+
+    def start(self):
+        """Start the background loop (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="repricing"
+        )
+        self._scheduler.every(self.interval_seconds).seconds.do(self.run_pass)
+        if self.pregeneration_days:
+            self._scheduler.every().day.at(self.pregeneration_at).do(self.run_pregeneration)
+        if self.idempotency_purge_seconds:
+            self._scheduler.every(self.idempotency_purge_seconds).seconds.do(self.run_idempotency_purge)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="repricing-scheduler", daemon=True)
+        self._thread.start()
+        print(f"✅ Repricing scheduler started (every {self.interval_seconds}s, {self.workers} workers)")
+
+    def stop(self):
+        """Stop the loop and wait for a running pass to finish"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self._scheduler.clear()
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self._scheduler.run_pending()
+            except Exception as err:
+                # Jobs record their own failures; this keeps the thread alive
+                # if one slips through, so later jobs still run
+                self._stats["failures"] += 1
+                self._stats["last_error"] = str(err)
+                print(f"❌ Scheduled job failed: {err}")
+            self._stop_event.wait(1)
+
+    def run_pass(self):
+        """Run one sharded pass unless another one is still in progress"""
+        if not self._pass_lock.acquire(blocking=False):
+            self._stats["overlaps_skipped"] += 1
+            return None
+
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT GET_LOCK(%s, 0)", (REPRICING_LOCK_NAME,))
+                if cursor.fetchone()[0] != 1:
+                    # Another API process holds the lock for this interval
+                    self._stats["overlaps_skipped"] += 1
+                    cursor.close()
+                    return None
+
+                try:
+                    return self._run_locked_pass(cursor, conn)
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (REPRICING_LOCK_NAME,))
+                    cursor.fetchone()
+                    cursor.close()
+
+        except Exception as err:
+            self._stats["failures"] += 1
+            self._stats["last_error"] = str(err)
+            print(f"❌ Repricing pass failed: {err}")
+            return None
+
+        finally:
+            self._pass_lock.release()
+
+    def run_pregeneration(self):
+        """Extend the pre-generated schedule to the rolling horizon"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT GET_LOCK(%s, 0)", (PREGENERATION_LOCK_NAME,))
+                if cursor.fetchone()[0] != 1:
+                    cursor.close()
+                    return None
+
+                try:
+                    report = pregenerate_schedule(days=self.pregeneration_days, verbose=False)
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (PREGENERATION_LOCK_NAME,))
+                    cursor.fetchone()
+                    cursor.close()
+
+        except Exception as err:
+            self._last_pregeneration = {"error": str(err)}
+            print(f"❌ Schedule pre-generation failed: {err}")
+            return None
+
+        self._last_pregeneration = report
+        GENERATED_FLIGHTS.inc(report['rows_inserted'], source="pregeneration")
+        print(f"✅ Pre-generated {report['rows_inserted']} flights through {report['end_date']}")
+        return report
+
+    def run_idempotency_purge(self):
+        """Delete idempotency keys past their TTL"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                removed = purge_expired_keys(cursor, conn)
+                cursor.close()
+
+        except Exception as err:
+            self._last_idempotency_purge = {"error": str(err)}
+            print(f"❌ Idempotency key purge failed: {err}")
+            return None
+
+        self._last_idempotency_purge = {
+            "at": datetime.now().isoformat(timespec='seconds'),
+            "keys_removed": removed
+        }
+        return removed
+
+    def _run_locked_pass(self, cursor, conn):
+        started = time.monotonic()
+        self._stats["last_started_at"] = datetime.now().isoformat()
+
+        if self.demand_shift_rate:
+            simulate_demand_shifts(cursor, conn, self.demand_shift_rate)
+
+        cursor.execute(
+            "SELECT MIN(id), MAX(id) FROM flights WHERE departure_time > NOW()"
+        )
+        first_id, last_id = cursor.fetchone()
+        shards = shard_id_range(first_id, last_id, self.workers)
+
+        reports = list(self._executor.map(self._run_shard, shards))
+        rows_updated = sum(report["repriced"] for report in reports)
+        rows_skipped = sum(report["skipped"] for report in reports)
+        duration = time.monotonic() - started
+
+        self._stats["runs"] += 1
+        self._stats["last_duration_seconds"] = round(duration, 3)
+        self._stats["last_rows_updated"] = rows_updated
+        self._stats["last_rows_skipped"] = rows_skipped
+        self._stats["last_shards"] = len(shards)
+        self._stats["last_overran_interval"] = duration > self.interval_seconds
+        self._stats["last_error"] = None
+        REPRICING_PASS_SECONDS.observe(duration)
+        REPRICED_FLIGHTS.inc(rows_updated)
+
+        return {
+            "repriced": rows_updated,
+            "skipped": rows_skipped,
+            "shards": len(shards),
+            "duration_seconds": round(duration, 3)
+        }
+
+    def _run_shard(self, id_range):
+        """Reprice one id range on its own pooled connection"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            report = incremental_update_prices(
+                cursor, conn,
+                shift_rate=0,
+                id_range=id_range,
+                on_price_change=invalidate_flight_searches
+            )
+            cursor.close()
+        return report
+
+    def stats(self):
+        """Scheduler health: cadence, last pass duration and rows touched"""
+        return {
+            "enabled": self._thread is not None and self._thread.is_alive(),
+            "interval_seconds": self.interval_seconds,
+            "workers": self.workers,
+            "running": self._pass_lock.locked(),
+            **self._stats,
+            "last_pregeneration": self._last_pregeneration,
+            "last_idempotency_purge": self._last_idempotency_purge
+        }
+
+
+repricing_scheduler = RepricingScheduler(
+    interval_seconds=SCHEDULER_CONFIG['interval_seconds'],
+    workers=SCHEDULER_CONFIG['workers'],
+    demand_shift_rate=SCHEDULER_CONFIG['demand_shift_rate'],
+    pregeneration_days=SCHEDULER_CONFIG['pregeneration_days'],
+    pregeneration_at=SCHEDULER_CONFIG['pregeneration_at'],
+    idempotency_purge_seconds=IDEMPOTENCY_CONFIG['purge_interval_seconds']
+)
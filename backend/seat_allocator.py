@@ -0,0 +1,241 @@
+"""
+Seat Allocator
+Per-flight seat occupancy bitmaps with constant-time first-free lookup and
+seat preferences, persisted in flight_seat_maps and cached in memory
+"""
+
+import functools
+import os
+
+from cache import TTLCache
+
+# Cabin layout used for generated seat numbers: rows of A-F, aisle between C and D
+SEAT_LETTERS = 'ABCDEF'
+SEATS_PER_ROW = len(SEAT_LETTERS)
+SEAT_PREFERENCES = ('any', 'window', 'aisle', 'middle')
+_PREFERENCE_COLUMNS = {
+    'window': (0, 5),
+    'aisle': (2, 3),
+    'middle': (1, 4)
+}
+
+# Read-only copies for callers that do not hold the flight row lock; dropped
+# by invalidate_seat_map() whenever a booking or cancellation commits
+seat_map_cache = TTLCache(
+    maxsize=int(os.getenv('SEAT_MAP_CACHE_SIZE', 4096)),
+    ttl=float(os.getenv('SEAT_MAP_CACHE_TTL_SECONDS', 10))
+)
+
+
+def seat_label(index):
+    """Seat index (0-based) -> label such as '12C'"""
+    return f"{index // SEATS_PER_ROW + 1}{SEAT_LETTERS[index % SEATS_PER_ROW]}"
+
+def seat_index(label):
+    """Label such as '12C' -> seat index; raises ValueError if malformed"""
+    label = label.strip().upper()
+    row, letter = label[:-1], label[-1:]
+    if not letter or letter not in SEAT_LETTERS or not row.isdigit() or int(row) < 1:
+        raise ValueError(f"Invalid seat number: {label}")
+    return (int(row) - 1) * SEATS_PER_ROW + SEAT_LETTERS.index(letter)
+
+@functools.lru_cache(maxsize=64)
+def _layout_masks(total_seats):
+    """Bit masks for every seat and for each preference on this aircraft size"""
+    masks = {'any': (1 << total_seats) - 1}
+    for preference, columns in _PREFERENCE_COLUMNS.items():
+        mask = 0
+        for index in range(total_seats):
+            if index % SEATS_PER_ROW in columns:
+                mask |= 1 << index
+        masks[preference] = mask
+    return masks
+
+@functools.lru_cache(maxsize=256)
+def _block_start_mask(total_seats, size):
+    """Seats where a block of `size` adjacent seats can start without wrapping rows"""
+    mask = 0
+    for index in range(total_seats - size + 1):
+        if index % SEATS_PER_ROW + size <= SEATS_PER_ROW:
+            mask |= 1 << index
+    return mask
+
+def _lowest_bit(bits):
+    return (bits & -bits).bit_length() - 1
+
+
+class SeatMap:
+    """Occupancy of one flight as an integer bitmap (bit i set = seat i taken)
+
+    Lookups are a handful of word operations on a ~24-byte integer,
+    independent of how many seats are already booked.
+    """
+
+    __slots__ = ('total_seats', 'occupied')
+
+    def __init__(self, total_seats, occupied=0):
+        self.total_seats = total_seats
+        self.occupied = occupied & _layout_masks(total_seats)['any']
+
+    @classmethod
+    def from_bytes(cls, total_seats, data):
+        return cls(total_seats, int.from_bytes(data or b'', 'little'))
+
+    @classmethod
+    def from_labels(cls, total_seats, labels):
+        occupied = 0
+        for label in labels:
+            try:
+                index = seat_index(label)
+            except ValueError:
+                continue
+            if index < total_seats:
+                occupied |= 1 << index
+        return cls(total_seats, occupied)
+
+    def to_bytes(self):
+        return self.occupied.to_bytes((self.total_seats + 7) // 8, 'little')
+
+    @property
+    def free_count(self):
+        return self.total_seats - self.occupied.bit_count()
+
+    def free_bits(self, preference='any'):
+        masks = _layout_masks(self.total_seats)
+        return ~self.occupied & masks[preference]
+
+    def is_free(self, index):
+        return 0 <= index < self.total_seats and not self.occupied >> index & 1
+
+    def first_free(self, preference='any'):
+        """Lowest free seat index, preferring `preference`; None when full"""
+        for choice in (preference, 'any'):
+            free = self.free_bits(choice)
+            if free:
+                return _lowest_bit(free)
+        return None
+
+    def first_free_block(self, size):
+        """First run of `size` adjacent free seats in one row, or None
+
+        When no row has such a run the group is split across the lowest
+        free seats, so a request only fails when the flight is too full.
+        """
+        if size <= 0 or size > self.free_count:
+            return None
+        if size <= SEATS_PER_ROW:
+            free = self.free_bits()
+            starts = free & _block_start_mask(self.total_seats, size)
+            for offset in range(1, size):
+                starts &= free >> offset
+            if starts:
+                start = _lowest_bit(starts)
+                return list(range(start, start + size))
+        seats = []
+        free = self.free_bits()
+        while len(seats) < size:
+            seat = _lowest_bit(free)
+            seats.append(seat)
+            free &= free - 1
+        return seats
+
+    def claim(self, indexes):
+        for index in indexes:
+            self.occupied |= 1 << index
+
+    def release(self, indexes):
+        for index in indexes:
+            self.occupied &= ~(1 << index)
+
+
+# ---------------------------------------------------------------------------
+# Persistence (flight_seat_maps). Claims and releases are applied with
+# bitwise OR / AND NOT on the stored VARBINARY (MySQL 8 binary-string bit
+# operations), so they are safe without the flights row lock; the unique
+# (flight_id, active_seat) key on bookings remains the final arbiter.
+#
+# Masks must reach MySQL as binary strings: the connector quotes bytes as a
+# plain '...' literal, which the server reads as utf8mb4 text, and a
+# VARBINARY combined with a nonbinary string switches |, & and ~ to 64-bit
+# integer arithmetic. Every mask placeholder therefore carries _binary.
+# ---------------------------------------------------------------------------
+
+def _rebuild_from_bookings(cursor, flight_id, total_seats):
+    """Seat map derived from active bookings, for flights without a stored map"""
+    cursor.execute(
+        "SELECT seat_number FROM bookings WHERE flight_id = %s AND status != 'cancelled'",
+        (flight_id,)
+    )
+    return SeatMap.from_labels(total_seats, [row[0] for row in cursor.fetchall() if row[0]])
+
+def load_seat_map(cursor, flight_id, total_seats):
+    """Read a flight's seat map (one primary-key lookup), rebuilding it if missing
+
+    `cursor` must be a tuple cursor.
+    """
+    cursor.execute(
+        "SELECT occupancy FROM flight_seat_maps WHERE flight_id = %s",
+        (flight_id,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return _rebuild_from_bookings(cursor, flight_id, total_seats)
+    return SeatMap.from_bytes(total_seats, row[0])
+
+def _seat_mask(total_seats, indexes):
+    return SeatMap(total_seats, sum(1 << index for index in set(indexes))).to_bytes()
+
+def claim_seats(cursor, flight_id, seat_map, indexes):
+    """Mark seats taken in `seat_map` and OR them into the stored bitmap
+
+    The stored row is updated with a bitwise OR rather than overwritten, so
+    concurrent claims on one flight never erase each other's bits.
+    """
+    seat_map.claim(indexes)
+    cursor.execute(
+        """
+        INSERT INTO flight_seat_maps (flight_id, occupancy)
+        VALUES (%s, _binary %s)
+        ON DUPLICATE KEY UPDATE occupancy = occupancy | _binary %s
+        """,
+        (flight_id, seat_map.to_bytes(), _seat_mask(seat_map.total_seats, indexes))
+    )
+
+def release_seats(cursor, flight_id, seat_map, indexes):
+    """Mark seats free in `seat_map` and clear their bits in the stored bitmap"""
+    seat_map.release(indexes)
+    cursor.execute(
+        """
+        INSERT INTO flight_seat_maps (flight_id, occupancy)
+        VALUES (%s, _binary %s)
+        ON DUPLICATE KEY UPDATE occupancy = occupancy & ~_binary %s
+        """,
+        (flight_id, seat_map.to_bytes(), _seat_mask(seat_map.total_seats, indexes))
+    )
+
+def invalidate_seat_map(flight_id):
+    """Drop the in-memory copy after a transaction that changed the map commits
+
+    The writer's own copy is not republished: optimistic bookings claim
+    seats without the flight row lock, so a copy read earlier in any
+    transaction may be missing their bits. The next reader loads the
+    stored bitmap instead.
+    """
+    seat_map_cache.invalidate(flight_id)
+
+def cached_seat_map(cursor, flight_id, total_seats):
+    """Seat map for read-only callers: cached copy or a fresh unlocked read
+
+    Loads go through get_or_load, so a map read while claim_seats or
+    release_seats invalidates the flight is not cached.
+    """
+    seat_map = seat_map_cache.get_or_load(
+        flight_id, lambda: load_seat_map(cursor, flight_id, total_seats)
+    )
+    if seat_map.total_seats != total_seats:
+        # Cached before the aircraft changed size
+        seat_map_cache.invalidate(flight_id)
+        seat_map = seat_map_cache.get_or_load(
+            flight_id, lambda: load_seat_map(cursor, flight_id, total_seats)
+        )
+    return seat_map
@@ -0,0 +1,311 @@
+"""
+Synthetic Data Generator
+Builds large, reproducible flight and booking datasets for load testing as
+CSV files plus a LOAD DATA script, splitting the date range across processes.
+
+Usage: python synthetic_data.py --days 365 --load-factor 0.8 --processes 8
+       mysql --local-infile=1 flight_booking_db < synthetic_data/load_data.sql
+
+Ids continue after the rows already in the database (or --first-flight-id /
+--first-booking-id), so a load never overwrites or re-parents existing rows.
+"""
+
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+
+from database import get_db_connection
+from flight_generator import FLIGHT_INSERT_COLUMNS, FlightGenerator
+
+DEFAULT_OUT_DIR = "synthetic_data"
+DEFAULT_DAYS_PER_PART = 30
+
+FLIGHT_CSV_COLUMNS = ('id',) + FLIGHT_INSERT_COLUMNS
+BOOKING_CSV_COLUMNS = (
+    'id', 'pnr', 'flight_id', 'passenger_first_name', 'passenger_last_name',
+    'passenger_email', 'passenger_phone', 'passenger_age', 'passenger_gender',
+    'seat_number', 'booking_price', 'status', 'payment_status',
+    'transaction_id', 'booking_time'
+)
+
+# Booking ids are first_booking_id + (flight offset * SEATS_PER_FLIGHT_ID) +
+# seat index, so they are unique without coordination between processes
+# (largest aircraft has 189)
+SEATS_PER_FLIGHT_ID = 200
+SEAT_LETTERS = np.array(list('ABCDEF'))
+PNR_ALPHABET = np.array(list('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+
+FIRST_NAMES = np.array([
+    'Aarav', 'Vivaan', 'Aditya', 'Arjun', 'Sai', 'Ishaan', 'Rohan', 'Kabir',
+    'Ananya', 'Diya', 'Priya', 'Saanvi', 'Meera', 'Kavya', 'Riya', 'Neha'
+])
+LAST_NAMES = np.array([
+    'Sharma', 'Verma', 'Iyer', 'Reddy', 'Nair', 'Gupta', 'Patel', 'Singh',
+    'Rao', 'Menon', 'Das', 'Joshi', 'Kulkarni', 'Mehta', 'Bose', 'Khan'
+])
+GENDERS = np.array(['male', 'female', 'other'])
+
+
+def _datetime_strings(values):
+    """datetime64 column -> 'YYYY-MM-DD HH:MM:SS' strings MySQL accepts"""
+    return np.char.replace(np.datetime_as_string(values, unit='s'), 'T', ' ')
+
+def _base36(values, width=6):
+    """Fixed-width base-36 codes for non-negative integers"""
+    digits = []
+    for _ in range(width):
+        digits.append(PNR_ALPHABET[values % 36])
+        values = values // 36
+    code = digits[-1]
+    for digit in reversed(digits[:-1]):
+        code = np.char.add(code, digit)
+    return code
+
+def generate_booking_columns(flights, day_index, seed=0, first_flight_id=1,
+                             first_booking_id=1, booked_by=None):
+    """Bookings filling the occupied seats of one day's flight columns
+
+    Booking times are drawn before departure but never after `booked_by`
+    (a datetime64), so flights far in the future are not booked in the future.
+    """
+    rng = np.random.default_rng([seed, day_index, 1])
+    booked = flights['total_seats'] - flights['available_seats']
+    count = int(booked.sum())
+
+    flight_id = np.repeat(flights['id'], booked)
+    # Seat index within its flight: 0..booked-1 for every flight
+    seat_idx = np.arange(count) - np.repeat(np.cumsum(booked) - booked, booked)
+    booking_id = first_booking_id + (flight_id - first_flight_id) * SEATS_PER_FLIGHT_ID + seat_idx
+
+    first = FIRST_NAMES[rng.integers(0, len(FIRST_NAMES), count)]
+    last = LAST_NAMES[rng.integers(0, len(LAST_NAMES), count)]
+    id_text = booking_id.astype(str)
+    email = np.char.add(np.char.add(np.char.lower(first), '.'), np.char.lower(last))
+    email = np.char.add(np.char.add(email, id_text), '@example.com')
+
+    seat_number = np.char.add((seat_idx // 6 + 1).astype(str), SEAT_LETTERS[seat_idx % 6])
+    fare = np.repeat(flights['current_price'], booked)
+    booking_price = np.round(fare * rng.uniform(0.9, 1.3, count), 2)
+
+    departure = np.repeat(flights['departure_time'], booked)
+    booked_before = rng.integers(60, 60 * 24 * 60, count).astype('timedelta64[m]')
+    booking_time = departure - booked_before
+    if booked_by is not None:
+        booking_time = np.minimum(booking_time, booked_by)
+
+    return {
+        'id': booking_id,
+        'pnr': _base36(booking_id),
+        'flight_id': flight_id,
+        'passenger_first_name': first,
+        'passenger_last_name': last,
+        'passenger_email': email,
+        'passenger_phone': rng.integers(6_000_000_000, 10_000_000_000, count),
+        'passenger_age': rng.integers(18, 76, count),
+        'passenger_gender': GENDERS[rng.integers(0, len(GENDERS), count)],
+        'seat_number': seat_number,
+        'booking_price': booking_price,
+        'status': np.full(count, 'confirmed'),
+        'payment_status': np.full(count, 'completed'),
+        'transaction_id': np.char.add('TXN', id_text),
+        'booking_time': booking_time
+    }
+
+def _write_rows(writer, columns, names):
+    values = []
+    for name in names:
+        column = columns[name]
+        if np.issubdtype(column.dtype, np.datetime64):
+            column = _datetime_strings(column)
+        values.append(column.tolist())
+    writer.writerows(zip(*values))
+
+def generate_part(part, start_date, first_day, days, out_dir,
+                  flights_per_route=5, seed=0, load_factor=None,
+                  first_flight_id=1, first_booking_id=1):
+    """Write flights (and bookings with a load factor) for one day range
+
+    Runs in a worker process; ids come from the absolute day index so any
+    split of the date range produces identical rows.
+    """
+    generator = FlightGenerator()
+    booked_by = np.datetime64(start_date.isoformat(), 'm')
+    flights_per_day = len(generator.routes) * flights_per_route
+    flights_path = os.path.join(out_dir, f"flights_{part:04d}.csv")
+    bookings_path = os.path.join(out_dir, f"bookings_{part:04d}.csv")
+    flight_rows = 0
+    booking_rows = 0
+
+    with open(flights_path, 'w', newline='') as flights_file:
+        flight_writer = csv.writer(flights_file, lineterminator='\n')
+        flight_writer.writerow(FLIGHT_CSV_COLUMNS)
+
+        booking_file = open(bookings_path, 'w', newline='') if load_factor is not None else None
+        try:
+            if booking_file:
+                booking_writer = csv.writer(booking_file, lineterminator='\n')
+                booking_writer.writerow(BOOKING_CSV_COLUMNS)
+
+            for day_index in range(first_day, first_day + days):
+                flights = generator.generate_flight_columns(
+                    start_date + timedelta(days=day_index), day_index,
+                    flights_per_route=flights_per_route, seed=seed,
+                    load_factor=load_factor,
+                    first_id=first_flight_id + day_index * flights_per_day
+                )
+                _write_rows(flight_writer, flights, FLIGHT_CSV_COLUMNS)
+                flight_rows += len(flights['id'])
+
+                if booking_file:
+                    bookings = generate_booking_columns(
+                        flights, day_index, seed, first_flight_id, first_booking_id, booked_by
+                    )
+                    _write_rows(booking_writer, bookings, BOOKING_CSV_COLUMNS)
+                    booking_rows += len(bookings['id'])
+        finally:
+            if booking_file:
+                booking_file.close()
+
+    return {
+        "part": part,
+        "flights_file": flights_path,
+        "bookings_file": bookings_path if load_factor is not None else None,
+        "flights": flight_rows,
+        "bookings": booking_rows
+    }
+
+def write_load_script(out_dir, parts):
+    """SQL script bulk-loading every part with LOAD DATA LOCAL INFILE
+
+    No IGNORE: a duplicate id means the dataset was generated for another
+    database state, and the load should stop rather than skip flights and
+    attach their bookings to unrelated rows.
+    """
+    def load_statement(path, table, columns):
+        return (
+            f"LOAD DATA LOCAL INFILE '{os.path.abspath(path)}' INTO TABLE {table}\n"
+            f"  FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"'\n"
+            f"  LINES TERMINATED BY '\\n' IGNORE 1 LINES\n"
+            f"  ({', '.join(columns)});\n"
+        )
+
+    script_path = os.path.join(out_dir, "load_data.sql")
+    with open(script_path, 'w') as script:
+        script.write("SET unique_checks = 0;\nSET foreign_key_checks = 0;\n\n")
+        for part in parts:
+            script.write(load_statement(part["flights_file"], "flights", FLIGHT_CSV_COLUMNS))
+        for part in parts:
+            if part["bookings_file"]:
+                script.write(load_statement(part["bookings_file"], "bookings", BOOKING_CSV_COLUMNS))
+        script.write("\nSET foreign_key_checks = 1;\nSET unique_checks = 1;\n")
+    return script_path
+
+def next_free_ids():
+    """(first_flight_id, first_booking_id) following the rows already loaded"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM flights")
+        first_flight_id = cursor.fetchone()[0]
+        cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM bookings")
+        first_booking_id = cursor.fetchone()[0]
+        cursor.close()
+    return first_flight_id, first_booking_id
+
+def generate_dataset(start_date, days, out_dir=DEFAULT_OUT_DIR, flights_per_route=5,
+                     seed=0, load_factor=None, processes=None,
+                     days_per_part=DEFAULT_DAYS_PER_PART,
+                     first_flight_id=1, first_booking_id=1):
+    """Generate the whole date range as CSV parts across a process pool"""
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.monotonic()
+
+    ranges = [
+        (part, first_day, min(days_per_part, days - first_day))
+        for part, first_day in enumerate(range(0, days, days_per_part))
+    ]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(
+                generate_part, part, start_date, first_day, part_days, out_dir,
+                flights_per_route, seed, load_factor, first_flight_id, first_booking_id
+            )
+            for part, first_day, part_days in ranges
+        ]
+        parts = [future.result() for future in futures]
+
+    script_path = write_load_script(out_dir, parts)
+    elapsed = time.monotonic() - started
+    rows = sum(part["flights"] + part["bookings"] for part in parts)
+    return {
+        "start_date": start_date.isoformat(),
+        "days": days,
+        "first_flight_id": first_flight_id,
+        "first_booking_id": first_booking_id,
+        "parts": len(parts),
+        "flights": sum(part["flights"] for part in parts),
+        "bookings": sum(part["bookings"] for part in parts),
+        "load_script": script_path,
+        "duration_seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic flight/booking dataset")
+    parser.add_argument("--start-date", type=date.fromisoformat, default=date.today(),
+                        help="first date, YYYY-MM-DD (default: today)")
+    parser.add_argument("--days", type=int, default=365,
+                        help="number of days to generate (default: 365)")
+    parser.add_argument("--flights-per-route", type=int, default=5,
+                        help="flights per route per day, 1-10 (default: 5)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="dataset seed; the same seed reproduces the same rows")
+    parser.add_argument("--load-factor", type=float,
+                        help="also generate bookings at this occupancy, e.g. 0.8")
+    parser.add_argument("--processes", type=int,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--days-per-part", type=int, default=DEFAULT_DAYS_PER_PART,
+                        help="days written per CSV part (default: 30)")
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR,
+                        help="output directory (default: synthetic_data)")
+    parser.add_argument("--first-flight-id", type=int,
+                        help="first flight id (default: after MAX(id) in the database)")
+    parser.add_argument("--first-booking-id", type=int,
+                        help="first booking id (default: after MAX(id) in the database)")
+    args = parser.parse_args()
+
+    if args.load_factor is not None and not 0 <= args.load_factor <= 1:
+        parser.error("--load-factor must be between 0 and 1")
+
+    first_flight_id, first_booking_id = args.first_flight_id, args.first_booking_id
+    if first_flight_id is None or first_booking_id is None:
+        next_flight_id, next_booking_id = next_free_ids()
+        first_flight_id = first_flight_id or next_flight_id
+        first_booking_id = first_booking_id or next_booking_id
+
+    print("=" * 50)
+    print(f"Generating {args.days} days of synthetic data...")
+    print("=" * 50)
+    report = generate_dataset(
+        start_date=args.start_date,
+        days=args.days,
+        out_dir=args.out_dir,
+        flights_per_route=args.flights_per_route,
+        seed=args.seed,
+        load_factor=args.load_factor,
+        processes=args.processes,
+        days_per_part=args.days_per_part,
+        first_flight_id=first_flight_id,
+        first_booking_id=first_booking_id
+    )
+
+    for key, value in report.items():
+        print(f"{key:<20} {value}")
+    print("=" * 50)
+
+if __name__ == "__main__":
+    main()
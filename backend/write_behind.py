@@ -0,0 +1,208 @@
+"""
+Write-Behind Buffers
+Non-critical column updates (e.g. users.last_login) collected in memory,
+coalesced per row and written in bulk on an interval and at shutdown, so
+request paths do not wait on them
+"""
+
+import os
+import threading
+import time
+
+import mysql.connector
+
+from database import get_db_connection
+
+WRITE_BEHIND_CONFIG = {
+    'flush_interval_seconds': float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL_SECONDS', 5)),
+    # Pending rows that trigger an early flush
+    'max_pending': int(os.getenv('WRITE_BEHIND_MAX_PENDING', 5000)),
+    # Hard cap while flushes fail; updates for further rows are dropped
+    'max_buffered': int(os.getenv('WRITE_BEHIND_MAX_BUFFERED', 50000))
+}
+FLUSH_CHUNK_SIZE = 500
+MAX_RETRY_SECONDS = 60   # longest wait between flush attempts while the database fails
+
+
+class WriteBehindBuffer:
+    """Latest value per row for one column, flushed with CASE-based bulk UPDATEs
+
+    Updates for the same row coalesce to the newest value. A failed flush
+    puts its rows back (unless newer values arrived meanwhile) and the next
+    attempt backs off exponentially; beyond `max_buffered` rows, updates
+    for rows not already pending are dropped. Values still pending when the
+    process dies are lost, so only use this for columns that tolerate that.
+
+    With `db_time`, values are time.monotonic() readings and are written as
+    NOW() minus their age, so timestamps follow the database clock and time
+    zone rather than the API host's.
+    """
+
+    def __init__(self, table, column, key_column='id', flush_interval=5.0,
+                 max_pending=5000, max_buffered=50000, db_time=False):
+        self.table = table
+        self.column = column
+        self.key_column = key_column
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_buffered = max(max_buffered, max_pending)
+        self.db_time = db_time
+
+        self._pending = {}
+        self._failure_streak = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self._stats = {
+            "updates": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "rows_written": 0,
+            "failures": 0,
+            "last_flush_seconds": None,
+            "last_error": None
+        }
+
+    def set(self, key, value):
+        """Queue `column = value` for the row with this key"""
+        with self._lock:
+            if key in self._pending:
+                self._stats["coalesced"] += 1
+            elif len(self._pending) >= self.max_buffered:
+                self._stats["dropped"] += 1
+                return
+            self._pending[key] = value
+            self._stats["updates"] += 1
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def _write(self, cursor, rows):
+        if self.db_time:
+            now = time.monotonic()
+            when = "WHEN %s THEN NOW(6) - INTERVAL %s MICROSECOND"
+            rows = [(key, int((now - value) * 1_000_000)) for key, value in rows]
+        else:
+            when = "WHEN %s THEN %s"
+        cases = " ".join([when] * len(rows))
+        placeholders = ", ".join(["%s"] * len(rows))
+        params = [item for row in rows for item in row]
+        params.extend(key for key, _ in rows)
+        cursor.execute(
+            f"""
+            UPDATE {self.table}
+            SET {self.column} = CASE {self.key_column} {cases} END
+            WHERE {self.key_column} IN ({placeholders})
+            """,
+            params
+        )
+
+    def flush(self):
+        """Write every pending row now; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            started = time.monotonic()
+            rows = list(batch.items())
+            try:
+                with get_db_connection() as conn:
+                    cursor = conn.cursor()
+                    for start in range(0, len(rows), FLUSH_CHUNK_SIZE):
+                        self._write(cursor, rows[start:start + FLUSH_CHUNK_SIZE])
+                        conn.commit()
+                    cursor.close()
+
+            except mysql.connector.Error as err:
+                with self._lock:
+                    # Keep values that arrived during the failed flush
+                    self._pending = {**batch, **self._pending}
+                    self._failure_streak += 1
+                    self._stats["failures"] += 1
+                    self._stats["last_error"] = str(err)
+                print(f"❌ Write-behind flush of {self.table}.{self.column} failed: {err}")
+                return 0
+
+            with self._lock:
+                self._failure_streak = 0
+                self._stats["flushes"] += 1
+                self._stats["rows_written"] += len(rows)
+                self._stats["last_flush_seconds"] = round(time.monotonic() - started, 4)
+            return len(rows)
+
+    def start(self):
+        """Start the background flush loop (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name=f"write-behind-{self.table}.{self.column}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the loop and flush whatever is still pending"""
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _retry_delay(self):
+        """Seconds before the next attempt after consecutive failed flushes"""
+        return min(self.flush_interval * 2 ** self._failure_streak, MAX_RETRY_SECONDS)
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            if self._failure_streak:
+                # Back off while the database fails; set() wake-ups are ignored
+                self._stop_event.wait(self._retry_delay())
+            else:
+                self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "table": self.table,
+                "column": self.column,
+                "pending": len(self._pending),
+                "max_buffered": self.max_buffered,
+                "flush_interval_seconds": self.flush_interval,
+                "failure_streak": self._failure_streak,
+                **self._stats
+            }
+
+
+last_login_buffer = WriteBehindBuffer(
+    "users", "last_login",
+    flush_interval=WRITE_BEHIND_CONFIG['flush_interval_seconds'],
+    max_pending=WRITE_BEHIND_CONFIG['max_pending'],
+    max_buffered=WRITE_BEHIND_CONFIG['max_buffered'],
+    db_time=True
+)
+WRITE_BEHIND_BUFFERS = (last_login_buffer,)
+
+def record_login(user_id):
+    """Note a successful login; users.last_login is written by the next flush"""
+    last_login_buffer.set(user_id, time.monotonic())
+
+def start_write_behind():
+    for buffer in WRITE_BEHIND_BUFFERS:
+        buffer.start()
+
+def stop_write_behind():
+    """Stop every buffer's loop and flush it; call before the pool closes"""
+    for buffer in WRITE_BEHIND_BUFFERS:
+        buffer.stop()
+
+def write_behind_stats():
+    return [buffer.stats() for buffer in WRITE_BEHIND_BUFFERS]
@@ -38,7 +38,8 @@ export const bookingAPI = {
     return api.get(`/bookings/${pnr}`);
   },
 
-  // Get all bookings
+  // Get bookings, newest first, one page at a time: pass the response's
+  // next_cursor back as params.cursor until it is null
   getAllBookings: (params = {}) => {
     return api.get('/bookings', { params });
   },
@@ -11,6 +11,11 @@ function FlightSearch() {
   const [flights, setFlights] = useState([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+
+  // Search results come a page at a time; nextCursor fetches the following page
+  const [nextCursor, setNextCursor] = useState(null);
+  const [searchParams, setSearchParams] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   
   // Trip type
   const [tripType, setTripType] = useState('round-trip'); // 'one-way' or 'round-trip'
@@ -67,6 +72,9 @@ function FlightSearch() {
       setAvailableAirlines(airlines);
       
       setFlights(flightData);
+      // Later pages must use the same filters and sort as the first one
+      setSearchParams({ ...filters });
+      setNextCursor(response.data.next_cursor || null);
     } catch (err) {
       setError('Failed to fetch flights. Please try again.');
       console.error('Error:', err);
@@ -75,6 +83,25 @@ function FlightSearch() {
     }
   };
 
+  const loadMoreFlights = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    
+    try {
+      const response = await flightAPI.getFlights({ ...searchParams, cursor: nextCursor });
+      const flightData = [...flights, ...response.data.flights];
+      
+      setAvailableAirlines([...new Set(flightData.map(f => f.airline))]);
+      setFlights(flightData);
+      setNextCursor(response.data.next_cursor || null);
+    } catch (err) {
+      setError('Failed to fetch more flights. Please try again.');
+      console.error('Error:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Autocomplete handlers
   const handleOriginChange = (e) => {
     const value = e.target.value;
@@ -387,6 +414,16 @@ function FlightSearch() {
                   </div>
                 ))
               )}
+              
+              {nextCursor && (
+                <button
+                  className="btn btn-secondary load-more-btn"
+                  onClick={loadMoreFlights}
+                  disabled={loadingMore}
+                >
+                  {loadingMore ? 'Loading...' : 'Load more flights'}
+                </button>
+              )}
             </div>
           )}
         </div>
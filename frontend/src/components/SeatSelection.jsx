@@ -16,10 +16,28 @@ const SeatSelectionModal = ({ flightId, onClose, onSeatsSelected }) => {
     fetchSeats();
   }, [flightId]);
 
+  // Expand the compact seat map (layout template + availability runs)
+  const decodeSeatMap = (map) => {
+    const numbers = map.seat_numbers || Array.from({ length: map.count }, (_, i) => {
+      const letters = map.layout.letters;
+      return `${map.layout.first_row + Math.floor(i / letters.length)}${letters[i % letters.length]}`;
+    });
+    const decoded = [];
+    let available = true;
+    map.availability.forEach((run) => {
+      for (let i = 0; i < run; i++) {
+        decoded.push({ seat_number: numbers[decoded.length], is_available: available });
+      }
+      available = !available;
+    });
+    return decoded;
+  };
+
   const fetchSeats = async () => {
     try {
-      const response = await axios.get(`http://localhost:8000/api/flights/${flightId}/seats`);
-      setSeats(response.data.seats);
+      // ETag revalidation is handled by the browser cache (304 when unchanged)
+      const response = await axios.get(`http://localhost:8000/api/flights/${flightId}/seats/map`);
+      setSeats(decodeSeatMap(response.data));
       setLoading(false);
     } catch (error) {
       console.error('Error fetching seats:', error);
@@ -1,4 +1,9 @@
 -- Flight Booking Simulator - Complete Database Schema
+DROP TABLE IF EXISTS idempotency_keys;
+DROP TABLE IF EXISTS pnr_sequence;
+DROP TABLE IF EXISTS seat_map_versions;
+DROP TABLE IF EXISTS flight_seat_maps;
+DROP TABLE IF EXISTS schedule_pregeneration;
 DROP TABLE IF EXISTS bookings;
 DROP TABLE IF EXISTS flights;
 
@@ -17,12 +22,15 @@ CREATE TABLE flights (
     available_seats INT NOT NULL,
     demand_level ENUM('low', 'medium', 'high', 'very_high') DEFAULT 'medium',
     status ENUM('scheduled', 'delayed', 'cancelled', 'completed') DEFAULT 'scheduled',
+    reprice_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     
-    INDEX idx_origin (origin),
+    INDEX idx_route_departure (origin, destination, departure_time),
     INDEX idx_destination (destination),
-    INDEX idx_flight_number (flight_number)
+    INDEX idx_flight_number (flight_number),
+    INDEX idx_reprice_at (reprice_at),
+    UNIQUE KEY uq_route_flight_departure (origin, destination, departure_time, flight_number)
 );
 
 -- Bookings Table
@@ -48,12 +56,65 @@ CREATE TABLE bookings (
     booking_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     cancelled_at TIMESTAMP NULL,
     
+    -- seat_number while the booking is live; NULL once cancelled
+    active_seat VARCHAR(10) AS (IF(status = 'cancelled', NULL, seat_number)) STORED,
+    
     FOREIGN KEY (flight_id) REFERENCES flights(id) ON DELETE RESTRICT,
+    UNIQUE KEY uq_flight_active_seat (flight_id, active_seat),
     
     INDEX idx_pnr (pnr),
     INDEX idx_flight_id (flight_id),
-    INDEX idx_passenger_email (passenger_email),
-    INDEX idx_booking_time (booking_time)
+    INDEX idx_booking_time (booking_time),
+    INDEX idx_email_booking_time (passenger_email, booking_time),
+    INDEX idx_status_booking_time (status, booking_time)
+);
+
+-- Schedule pre-generation checkpoints (backend/pregenerate_flights.py)
+CREATE TABLE schedule_pregeneration (
+    flight_date DATE PRIMARY KEY,
+    flights_inserted INT NOT NULL,
+    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Seat occupancy bitmaps (backend/seat_allocator.py)
+CREATE TABLE flight_seat_maps (
+    flight_id INT PRIMARY KEY,
+    occupancy VARBINARY(64) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (flight_id) REFERENCES flights(id) ON DELETE CASCADE
+);
+
+-- Seat map versions, the ETag of the compact seat map (backend/routes_seats.py)
+CREATE TABLE seat_map_versions (
+    flight_id INT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (flight_id) REFERENCES flights(id) ON DELETE CASCADE
+);
+
+-- PNR sequence blocks (backend/pnr_allocator.py)
+CREATE TABLE pnr_sequence (
+    name VARCHAR(32) PRIMARY KEY,
+    next_value BIGINT NOT NULL
+);
+
+INSERT INTO pnr_sequence (name, next_value) VALUES ('pnr', 0);
+
+-- Outcomes of write requests sent with an Idempotency-Key header
+CREATE TABLE idempotency_keys (
+    scope VARCHAR(64) NOT NULL,
+    idem_key VARCHAR(128) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    claim_token CHAR(32) NULL,
+    status ENUM('in_progress', 'completed') NOT NULL DEFAULT 'in_progress',
+    status_code SMALLINT NULL,
+    response MEDIUMTEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at DATETIME NOT NULL,
+    PRIMARY KEY (scope, idem_key),
+    INDEX idx_expires_at (expires_at)
 );
 
 -- Insert Sample Flights